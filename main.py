@@ -7,17 +7,42 @@ import os
 import copy
 import json
 import hashlib
+import time
 from src.util import TileJsonLoader
 from src.character import Character
 from src.spritesheet import Spritesheet
 from src.camera import Camera
 from src.mini_map import MiniMap
 from src.map import Map
+from src.room import TILE_GENERATOR_WFC
+from src.world_chunks import CHUNK_SIZE
+from src.renderer import DirtyRectRenderer, PrescaledRenderer, present_scaled
+from src.telemetry import configure_telemetry
+from src.save_game import save_game, encode_save, write_save, load_game, SAVE_PATH
+from src.profiler import parse_profiling_options, SessionProfiler, SpikeRecorder
+from src.memory_tracker import parse_memory_option, MemoryTracker
+from src.scheduler import TaskScheduler, call_steps, PRIORITY_HIGH
 
 BASE_RESOLUTION = (800, 600)
 MAP_DIMENSIONS = (100, 100)  # Dimensions of the entire map in rooms
 TILE_SIZE = 16
 BASE_RANDOM_SEED = 91231  # Define the base random seed
+CHUNKED_WORLD = False  # Generate the world map lazily in chunks instead of all at startup
+ROOM_TILE_GENERATOR = TILE_GENERATOR_WFC  # TILE_GENERATOR_AUTOTILE generates rooms in one pass without WFC
+MINIMAP_WINDOW = (CHUNK_SIZE * 2, CHUNK_SIZE * 2)  # Rooms shown by the minimap in chunked mode
+MINIMAP_MARGIN = CHUNK_SIZE // 2  # Rooms from the window's edge at which the chunked minimap is recentered
+MINIMAP_FOG_OF_WAR = False  # Hide rooms on the minimap until they have been visited
+DIRTY_RECT_RENDERING = False  # Only redraw and present the regions that changed since the last frame
+PRESCALED_RENDERING = False  # Draw at output resolution with pre-scaled sprites instead of scaling each frame
+SIMULATION_TICK_RATE = 60  # Fixed simulation steps per second, independent of the frame rate
+SIMULATION_STEP = 1.0 / SIMULATION_TICK_RATE  # Seconds of game time per simulation step
+MAX_SIMULATION_STEPS = 5  # Most steps run in one frame to catch up; older time is dropped
+TARGET_FPS = 60  # Frame rate the loop is capped at
+IDLE_TIME_GENERATION = True  # Generate neighboring rooms in the time left at the end of each frame
+ROOM_GENERATION_BUDGET = 0.004  # Seconds per frame spent generating neighboring rooms without IDLE_TIME_GENERATION
+SAVE_FLUSH_DEADLINE = 0.25  # Seconds within which a save taken with F5 is written to disk
+TELEMETRY_PATH = None  # JSON-lines file that room generation telemetry is appended to; None disables it
+WORLD_ARCHIVE_PATH = None  # World archive baked with `python -m src.world_baker` to serve rooms from; None generates them
 
 def main():
     pygame.init()
@@ -26,9 +51,25 @@ def main():
     pygame.display.set_caption("Thornwood")
 
     clock = pygame.time.Clock()
+    # Summarise a session with `python -m src.telemetry <file>`
+    telemetry = configure_telemetry(TELEMETRY_PATH)
+    # `--profile[=path]` profiles the session and `--spike-ms=<ms>` records slow frames; see src.profiler
+    profile_path, spike_ms = parse_profiling_options(sys.argv[1:], os.environ)
+    session_profiler = SessionProfiler(profile_path) if profile_path else None
+    spike_recorder = SpikeRecorder(spike_ms, profile_frames=session_profiler is None)
+    # `--memory[=path]` accounts memory to rooms and writes a report with leaks on exit
+    memory_report_path = parse_memory_option(sys.argv[1:], os.environ)
+    memory_tracker = MemoryTracker() if memory_report_path else None
+    # Background work runs in what is left of each frame instead of the clock sleeping it away
+    scheduler = TaskScheduler(1.0 / TARGET_FPS) if IDLE_TIME_GENERATION else None
     
     # Initialize the Map with the base seed
-    game_map = Map(MAP_DIMENSIONS[0], MAP_DIMENSIONS[1], base_seed=BASE_RANDOM_SEED)
+    game_map = Map(MAP_DIMENSIONS[0], MAP_DIMENSIONS[1], base_seed=BASE_RANDOM_SEED, chunked=CHUNKED_WORLD,
+                   tile_generator=ROOM_TILE_GENERATOR)
+    if WORLD_ARCHIVE_PATH:
+        game_map.open_archive(WORLD_ARCHIVE_PATH)
+    game_map.memory_tracker = memory_tracker
+    game_map.scheduler = scheduler
     current_room = game_map.get_current_room()
 
     # Initialize the character and camera
@@ -64,23 +105,43 @@ def main():
     show_debug = True  # Toggle to show debug info
 
     # Initialize the minimap with the goal room coordinates
-    mini_map = MiniMap(game_map.noise.get_noise_map(), MAP_DIMENSIONS[0], MAP_DIMENSIONS[1], goal_room_coords=game_map.goal_room_coords)
+    def build_minimap():
+        if not game_map.chunked:
+            return MiniMap(game_map.noise.get_noise_map(), MAP_DIMENSIONS[0], MAP_DIMENSIONS[1], goal_room_coords=game_map.goal_room_coords,
+                           explored_rooms=game_map.visited_rooms, fog_of_war=MINIMAP_FOG_OF_WAR)
+        # In chunked mode only a window around the current room is shown
+        room_x, room_y = game_map.get_current_room_coordinates()
+        origin = (room_x - MINIMAP_WINDOW[0] // 2, room_y - MINIMAP_WINDOW[1] // 2)
+        noise_window = game_map.noise.get_noise_window(origin[0], origin[1], MINIMAP_WINDOW[0], MINIMAP_WINDOW[1])
+        return MiniMap(noise_window, MINIMAP_WINDOW[0], MINIMAP_WINDOW[1], goal_room_coords=game_map.goal_room_coords, origin=origin,
+                       explored_rooms=game_map.visited_rooms, fog_of_war=MINIMAP_FOG_OF_WAR)
+
+    # Built lazily in chunked mode so that startup never touches chunks around the player
+    mini_map = None if game_map.chunked else build_minimap()
 
     # Update the update_room function to handle enemies
-    def update_room(new_room, entry_direction):
+    def update_room(new_room, entry_direction, position=None):
         nonlocal current_room, world_width, world_height
         current_room = new_room
+        if mini_map is not None:
+            # Only the minimap overlay changes when the player changes rooms
+            mini_map.mark_explored(game_map.get_current_room_coordinates())
         world_width = current_room.tile_map.width * TILE_SIZE
         world_height = current_room.tile_map.height * TILE_SIZE
         character.world_width = world_width
         character.world_height = world_height
-        if entry_direction is not None:
+        if position is not None:
+            # Restored from a save
+            new_position = position
+        elif entry_direction is not None:
             # Adjust character position based on entry direction
             new_position = get_entry_position(current_room.tile_map, entry_direction)
         else:
             # Find a valid spawn position in the room
             new_position = find_spawn_position(current_room.tile_map)
         character.position = pygame.Vector2(new_position)
+        character.store_previous_position()  # Do not interpolate across the room change
+        current_room.enemy_manager.store_previous_positions()  # Nor the enemies of the new room
         character.rect.topleft = new_position
         character.collision_rect.topleft = (
             character.position.x + character.collision_rect_offset[0],
@@ -89,6 +150,24 @@ def main():
         camera.world_width = world_width
         camera.world_height = world_height
 
+    # Replaces the world with a saved one; rooms are only generated when they are entered
+    def load_saved_game():
+        nonlocal game_map, mini_map
+        # The rooms of the replaced world are released, so that leaks show in the memory report
+        for coords in list(game_map.rooms):
+            game_map.release_room(coords)
+        if scheduler is not None:
+            scheduler.cancel(game_map)
+        game_map, player = load_game(SAVE_PATH)
+        if WORLD_ARCHIVE_PATH:
+            game_map.open_archive(WORLD_ARCHIVE_PATH)
+        game_map.memory_tracker = memory_tracker
+        game_map.scheduler = scheduler
+        mini_map = None if game_map.chunked else build_minimap()
+        update_room(game_map.get_current_room(), None, player['position'] if player else None)
+        if player is not None:
+            character.health = player['health']
+
     # Function to get the entry position based on entry direction
     def get_entry_position(tile_map, entry_direction):
         # Determine the initial position based on entry direction
@@ -130,24 +209,86 @@ def main():
                         tile = tile_map.tile_map[check_y][check_x]
                         if not tile.collidable:
                             # Check for objects at this position
-                            object_here = False
-                            for obj in current_room.objects:
-                                if obj.pos_x == check_x and obj.pos_y == check_y:
-                                    object_here = True
-                                    break
-                            if not object_here:
+                            if not current_room.entities.is_occupied(check_x, check_y):
                                 # Return the position in pixels
                                 return (check_x * TILE_SIZE, check_y * TILE_SIZE)
         # If no suitable position found, return original position
         return (x, y)
 
+    # Fonts are created once instead of every frame
+    debug_font = pygame.font.SysFont(None, 24)
+    message_font = pygame.font.SysFont(None, 72)
+
+    # Draws the whole frame, or only what overlaps region (in base-resolution pixels)
+    def render_scene(surface, region=None):
+        surface.fill((0, 0, 0), region)
+        current_room.tile_map.draw(surface, camera, region)
+        current_room.draw_objects(surface, camera, region)  # Draw objects before the character
+        character.draw(surface, camera, interpolation)
+
+        # Draw the minimap if toggled on
+        if show_minimap:
+            mini_map.draw(surface, game_map.get_current_room_coordinates())
+
+        # Draw debug info
+        if show_debug:
+            surface.blit(debug_text_surface, (10, 10))
+
+        # Draw enemies
+        current_room.draw_enemies(surface, camera, interpolation)
+
+        # If win condition is met, display "YOU WIN!" message; if game over, display "GAME OVER"
+        if message_surface is not None:
+            surface.blit(message_surface, message_surface.get_rect(center=(BASE_RESOLUTION[0] // 2, BASE_RESOLUTION[1] // 2)))
+
+        # Draw health bar
+        character.draw_health_bar(surface)
+
+    # Tracks what moved or changed this frame, redraws only those regions and presents them
+    def render_dirty_regions():
+        center = (BASE_RESOLUTION[0] // 2, BASE_RESOLUTION[1] // 2)
+        # The static scene (terrain and objects) only changes with the room or its entities
+        renderer.begin_frame(camera, screen, (id(current_room), current_room.entities.version))
+        character_position = character.get_render_position(interpolation)
+        character_rect = character.image.get_rect(topleft=(character_position.x - camera.x, character_position.y - camera.y))
+        renderer.track('character', character_rect, character.image)
+        for enemy in current_room.entities.enemies():
+            enemy_position = enemy.get_render_position(interpolation)
+            enemy_rect = enemy.image.get_rect(topleft=(enemy_position.x - camera.x, enemy_position.y - camera.y))
+            renderer.track(('enemy', enemy.entity_id), enemy_rect, enemy.image)
+        renderer.track('health_bar', (10, 10, 100, 10), character.health)
+        if show_debug:
+            renderer.track('debug_text', debug_text_surface.get_rect(topleft=(10, 10)), debug_text)
+        if show_minimap:
+            minimap_width, minimap_height = mini_map.minimap_size
+            minimap_rect = pygame.Rect((BASE_RESOLUTION[0] - minimap_width) // 2, (BASE_RESOLUTION[1] - minimap_height) // 2,
+                                       minimap_width, minimap_height)
+            renderer.track('minimap', minimap_rect, (game_map.get_current_room_coordinates(), id(mini_map)))
+        if message_surface is not None:
+            renderer.track('message', message_surface.get_rect(center=center), message)
+        renderer.render(render_scene)
+        renderer.present(screen)
+
+    renderer = DirtyRectRenderer(BASE_RESOLUTION) if DIRTY_RECT_RENDERING else None
+    prescaled_renderer = PrescaledRenderer(BASE_RESOLUTION, TILE_SIZE) if PRESCALED_RENDERING else None
+    offscreen_surface = pygame.Surface(BASE_RESOLUTION)
+    debug_text_surface = None
+    debug_text = None
+    message_surface = None
+    message = None
+
     win_condition_met = False
     win_timer = 0  # Timer to track when to close the game after winning
     game_over = False  # Initialize game_over variable
 
+    accumulator = 0.0  # Frame time not yet simulated
+    interpolation = 1.0  # Fraction of a simulation step between the last step and now
+
     running = True
     while running:
-        dt = clock.tick(60) / 1000.0  # Amount of seconds between each loop
+        frame_time = clock.tick(TARGET_FPS) / 1000.0  # Amount of seconds between each loop
+        frame_start = time.perf_counter()
+        spike_recorder.begin_frame()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -164,17 +305,28 @@ def main():
                         else:
                             screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
                             fullscreen = True
+                    if event.key == pygame.K_F5:
+                        if scheduler is None:
+                            save_game(game_map, SAVE_PATH, character)
+                        else:
+                            # Encoded now so the save is of this moment, written to disk in idle time
+                            scheduler.add("save", call_steps(write_save, encode_save(game_map, character), SAVE_PATH),
+                                          priority=PRIORITY_HIGH, deadline=SAVE_FLUSH_DEADLINE, tag=SAVE_PATH)
+                    if event.key == pygame.K_F9:
+                        if scheduler is not None:
+                            # A save still waiting to be written is the one to load
+                            scheduler.finish(SAVE_PATH)
+                        if os.path.exists(SAVE_PATH):
+                            load_saved_game()
                     if event.key == pygame.K_x:
                         # Check for interaction with objects using the interaction rectangle
                         interacted = False
-                        for obj in current_room.objects[:]:  # Iterate over a copy since we may modify the list
+                        # Only the objects on the tiles under the interaction rect are checked
+                        for obj in current_room.entities.query_rect(character.interaction_rect, TILE_SIZE):
                             if character.interaction_rect.colliderect(obj.rect):
                                 if obj.object_type in ['rock1', 'rock2']:
-                                    # Destroy the rock
-                                    current_room.objects.remove(obj)
-                                    # Also remove from collidable tiles
-                                    if obj in current_room.tile_map.collidable_tiles:
-                                        current_room.tile_map.collidable_tiles.remove(obj)
+                                    # Destroy the rock; this also frees its tile for collision
+                                    current_room.entities.remove(obj.entity_id)
                                     interacted = True
                                     break  # Only destroy one object per key press
                                 elif obj.object_type == 'flower':
@@ -183,10 +335,10 @@ def main():
                                     win_timer = 0  # Reset the win timer
                                     interacted = True
                                     break
-                        for enemy in current_room.enemies[:]:
+                        for enemy in list(current_room.entities.enemies()):
                             if character.enemy_interaction_rect.colliderect(enemy.collision_rect):
                                 # Kill the enemy
-                                current_room.enemies.remove(enemy)
+                                current_room.entities.remove(enemy.entity_id)
                                 # Restore some life to the player
                                 character.restore_health(1)  # Adjust the amount as needed
                                 break
@@ -194,168 +346,174 @@ def main():
                             # No interaction occurred
                             pass
 
-        # Only process movement if the game is not over
-        if not game_over and not win_condition_met:
-            keys = pygame.key.get_pressed()
-            dx, dy = 0, 0
-            if keys[pygame.K_LEFT]:
-                dx -= 1
-            if keys[pygame.K_RIGHT]:
-                dx += 1
-            if keys[pygame.K_UP]:
-                dy -= 1
-            if keys[pygame.K_DOWN]:
-                dy += 1
-
-            # Normalize diagonal movement
-            if dx != 0 and dy != 0:
-                dx *= math.sqrt(0.5)
-                dy *= math.sqrt(0.5)
-
-            character.move(dx, dy, dt, current_room.tile_map)
-            camera.update(character)
-        else:
-            # If game is over, no movement
-            dx, dy = 0, 0
+        spike_recorder.lap('events')
 
-        # Update enemies even if the game is over (optional)
-        for enemy in current_room.enemies:
-            enemy.update(dt, character, current_room.tile_map)
+        # Advance the simulation in fixed steps; a slow frame runs more steps instead of one long one
+        accumulator += min(frame_time, MAX_SIMULATION_STEPS * SIMULATION_STEP)
+        while accumulator >= SIMULATION_STEP:
+            accumulator -= SIMULATION_STEP
+            character.store_previous_position()
+            current_room.enemy_manager.store_previous_positions()
+
+            # Only process movement if the game is not over
+            if not game_over and not win_condition_met:
+                keys = pygame.key.get_pressed()
+                dx, dy = 0, 0
+                if keys[pygame.K_LEFT]:
+                    dx -= 1
+                if keys[pygame.K_RIGHT]:
+                    dx += 1
+                if keys[pygame.K_UP]:
+                    dy -= 1
+                if keys[pygame.K_DOWN]:
+                    dy += 1
+
+                # Normalize diagonal movement
+                if dx != 0 and dy != 0:
+                    dx *= math.sqrt(0.5)
+                    dy *= math.sqrt(0.5)
+
+                character.move(dx, dy, SIMULATION_STEP, current_room.tile_map)
+                camera.update(character)
+            else:
+                # If game is over, no movement
+                dx, dy = 0, 0
+
+            # Update enemies even if the game is over (optional); all enemies move in one pass, those
+            # far from the view coarsely, and the enemies of recently left rooms in the background
+            view = pygame.Rect(camera.x, camera.y, camera.width, camera.height)
+            touching_enemies = current_room.enemy_manager.update(SIMULATION_STEP, character, current_room.tile_map,
+                                                                 view=view)
+            game_map.simulate_background_rooms(SIMULATION_STEP)
 
             # Check for collision with the character only if the game is not over
             if not game_over and not win_condition_met:
-                if character.collision_rect.colliderect(enemy.collision_rect):
-                    # Player takes damage
+                for _ in range(touching_enemies):
+                    # Player takes damage from every enemy touching it
                     character.take_damage(1)  # Adjust the damage amount as needed
 
-        # Check for game over
-        if character.health <= 0:
-            win_condition_met = False  # Ensure win condition is not met
-            game_over = True
-            win_timer += dt
-            if win_timer >= 5:
-                running = False
+            # Check for game over
+            if character.health <= 0:
+                win_condition_met = False  # Ensure win condition is not met
+                game_over = True
+                win_timer += SIMULATION_STEP
+                if win_timer >= 5:
+                    running = False
 
-        # Handle room transition only if the game is not over
-        if not game_over and not win_condition_met:
-            if character.room_transition_direction:
-                # Attempt to move to the adjacent room
-                direction = character.room_transition_direction
-                dx, dy = 0, 0
-                if direction == 'left':
-                    dx = -1
-                elif direction == 'right':
-                    dx = 1
-                elif direction == 'up':
-                    dy = -1
-                elif direction == 'down':
-                    dy = 1
-                new_room = game_map.move_to_room(dx, dy)
-                if new_room:
-                    update_room(new_room, entry_direction=direction)
-                    # Reset room transition direction
-                    character.room_transition_direction = None
-                else:
-                    # If there is no room in that direction, reset the character's position to within the room boundaries
+            # Handle room transition only if the game is not over
+            if not game_over and not win_condition_met:
+                if character.room_transition_direction:
+                    # Attempt to move to the adjacent room
+                    direction = character.room_transition_direction
+                    dx, dy = 0, 0
                     if direction == 'left':
-                        character.position.x = 0
+                        dx = -1
                     elif direction == 'right':
-                        character.position.x = world_width - TILE_SIZE
+                        dx = 1
                     elif direction == 'up':
-                        character.position.y = 0
+                        dy = -1
                     elif direction == 'down':
-                        character.position.y = world_height - TILE_SIZE
-                    character.collision_rect.topleft = (
-                        character.position.x + character.collision_rect_offset[0],
-                        character.position.y + character.collision_rect_offset[1]
-                    )
-                    character.rect.topleft = character.position
-                    # Reset room transition direction
-                    character.room_transition_direction = None
-
-            character.move(dx, dy, dt, current_room.tile_map)
-            # Update character
-            character.update(dt)
-            camera.update(character)
-        else:
-            # Still update character for animations if needed
-            character.update(dt)
-            camera.update(character)
-
-        if win_condition_met:
-            win_timer += dt
-            if win_timer >= 5:  # 5 seconds have passed
-                running = False  # Exit the game loop
-
-        # Draw everything to an off-screen surface first
-        offscreen_surface = pygame.Surface(BASE_RESOLUTION)
-        offscreen_surface.fill((0, 0, 0))
-        current_room.tile_map.draw(offscreen_surface, camera)
-        current_room.draw_objects(offscreen_surface, camera)  # Draw objects before the character
-        character.draw(offscreen_surface, camera)
-
-        # Draw the minimap if toggled on
-        if show_minimap:
-            current_room_coords = game_map.get_current_room_coordinates()
-            mini_map.draw(offscreen_surface, current_room_coords)
-
-        # Draw debug info
-        if show_debug:
-            font = pygame.font.SysFont(None, 24)
-            room_coords = game_map.get_current_room_coordinates()
-            debug_text = f"Room Coordinates: {room_coords}"
-            text_surface = font.render(debug_text, True, (255, 255, 255))
-            offscreen_surface.blit(text_surface, (10, 10))
-
-        # Draw enemies
-        current_room.draw_enemies(offscreen_surface, camera)
-
-        # If win condition is met, display "YOU WIN!" message
-        if win_condition_met:
-            font = pygame.font.SysFont(None, 72)
-            win_text = "YOU WIN!"
-            text_surface = font.render(win_text, True, (255, 255, 0))
-            text_rect = text_surface.get_rect(center=(BASE_RESOLUTION[0] // 2, BASE_RESOLUTION[1] // 2))
-            offscreen_surface.blit(text_surface, text_rect)
-
-        # If game over, display "GAME OVER" message
+                        dy = 1
+                    new_room = game_map.move_to_room(dx, dy)
+                    if new_room:
+                        update_room(new_room, entry_direction=direction)
+                        # Reset room transition direction
+                        character.room_transition_direction = None
+                    else:
+                        # If there is no room in that direction, reset the character's position to within the room boundaries
+                        if direction == 'left':
+                            character.position.x = 0
+                        elif direction == 'right':
+                            character.position.x = world_width - TILE_SIZE
+                        elif direction == 'up':
+                            character.position.y = 0
+                        elif direction == 'down':
+                            character.position.y = world_height - TILE_SIZE
+                        character.collision_rect.topleft = (
+                            character.position.x + character.collision_rect_offset[0],
+                            character.position.y + character.collision_rect_offset[1]
+                        )
+                        character.rect.topleft = character.position
+                        # Reset room transition direction
+                        character.room_transition_direction = None
+
+                character.move(dx, dy, SIMULATION_STEP, current_room.tile_map)
+                # Update character
+                character.update(SIMULATION_STEP)
+                camera.update(character)
+            else:
+                # Still update character for animations if needed
+                character.update(SIMULATION_STEP)
+                camera.update(character)
+
+            if win_condition_met:
+                win_timer += SIMULATION_STEP
+                if win_timer >= 5:  # 5 seconds have passed
+                    running = False  # Exit the game loop
+
+        spike_recorder.lap('simulation')
+
+        # Generate the rooms next to the current one a few milliseconds at a time, so that
+        # entering them does not stall a frame
+        if scheduler is None:
+            game_map.generate_pending(ROOM_GENERATION_BUDGET)
+            spike_recorder.lap('room_generation')
+
+        # Draw entities between the last two simulation steps, and the camera centered on the player
+        interpolation = accumulator / SIMULATION_STEP
+        render_position = character.get_render_position(interpolation)
+        camera.center_on(int(render_position.x) + character.rect.width // 2, int(render_position.y) + character.rect.height // 2)
+
+        # Recenter the chunked minimap before drawing only when the player nears the edge of its
+        # window; within it, room changes only mark the overlay
+        current_room_coords = game_map.get_current_room_coordinates()
+        if show_minimap and game_map.chunked and (mini_map is None or not (
+                MINIMAP_MARGIN <= current_room_coords[0] - mini_map.origin[0] < MINIMAP_WINDOW[0] - MINIMAP_MARGIN and
+                MINIMAP_MARGIN <= current_room_coords[1] - mini_map.origin[1] < MINIMAP_WINDOW[1] - MINIMAP_MARGIN)):
+            mini_map = build_minimap()
+
+        # HUD text is only re-rendered when it changes
+        new_debug_text = f"Room Coordinates: {current_room_coords}"
+        goal_distance = game_map.distance_to_goal()
+        if goal_distance is not None and goal_distance >= 0:
+            new_debug_text += f"  Goal: {goal_distance} rooms away"
+        if show_debug and debug_text != new_debug_text:
+            debug_text = new_debug_text
+            debug_text_surface = debug_font.render(debug_text, True, (255, 255, 255))
         if character.health <= 0:
-            font = pygame.font.SysFont(None, 72)
-            game_over_text = "GAME OVER"
-            text_surface = font.render(game_over_text, True, (255, 0, 0))
-            text_rect = text_surface.get_rect(center=(BASE_RESOLUTION[0] // 2, BASE_RESOLUTION[1] // 2))
-            offscreen_surface.blit(text_surface, text_rect)
-
-        # Draw health bar
-        character.draw_health_bar(offscreen_surface)
-
-        # Get the current screen size
-        screen_width, screen_height = screen.get_size()
-
-        # Calculate scale factor while maintaining aspect ratio
-        scale_x = screen_width / BASE_RESOLUTION[0]
-        scale_y = screen_height / BASE_RESOLUTION[1]
-        scale = min(scale_x, scale_y)
-
-        # Calculate the size of the scaled surface
-        scaled_width = int(BASE_RESOLUTION[0] * scale)
-        scaled_height = int(BASE_RESOLUTION[1] * scale)
-
-        # Scale the off-screen surface
-        scaled_surface = pygame.transform.scale(offscreen_surface, (scaled_width, scaled_height))
-
-        # Calculate the position to center the scaled surface on the screen
-        x = (screen_width - scaled_width) // 2
-        y = (screen_height - scaled_height) // 2
-
-        # Fill the screen with black to handle letterboxing
-        screen.fill((0, 0, 0))
-
-        # Blit the scaled surface to the screen
-        screen.blit(scaled_surface, (x, y))
-
-        pygame.display.flip()
-
+            new_message = ("GAME OVER", (255, 0, 0))
+        elif win_condition_met:
+            new_message = ("YOU WIN!", (255, 255, 0))
+        else:
+            new_message = None
+        if new_message != message:
+            message = new_message
+            message_surface = message_font.render(message[0], True, message[1]) if message else None
+
+        if renderer is not None:
+            render_dirty_regions()
+        elif prescaled_renderer is not None:
+            # Draw straight to the window; only a resize rebuilds the zoom and the scaled sprites
+            render_scene(prescaled_renderer.begin_frame(screen))
+            prescaled_renderer.present()
+        else:
+            # Draw everything to an off-screen surface, then scale it to the window
+            render_scene(offscreen_surface)
+            present_scaled(screen, offscreen_surface)
+        spike_recorder.lap('render')
+        if scheduler is not None:
+            # Spend the rest of the frame on background work; the clock sleeps whatever is left
+            scheduler.run(frame_start)
+            spike_recorder.lap('background')
+        spike_recorder.end_frame()
+        if memory_tracker is not None:
+            memory_tracker.sample()
+
+    if session_profiler is not None:
+        session_profiler.stop()
+    if memory_tracker is not None:
+        memory_tracker.write_report(memory_report_path)
+    telemetry.close()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,344 @@
+import hashlib
+import os
+import pickle
+import sys
+import time
+from src.util import TileJsonLoader
+
+DATA_PATH = os.path.join("assets", "data")
+CACHE_PATH = os.path.join("assets", "cache", "compiled_assets.bin")
+CACHE_MAGIC = b"TWAC"
+CACHE_VERSION = 1
+
+ASSET_FILES = {
+    'tileset': "tileset.json",
+    'tile_constraints': "tile_constraints.json",
+    'directions': "directions.json",
+    'reverse_directions': "reverse_directions.json",
+    'character_tileset': "character_tileset.json",
+}
+
+
+class AssetRegistry:
+    """
+    Loads the JSON data files once, validates them and compiles them into lookup tables.
+
+    The compiled form is cached in a binary file keyed by a SHA-256 hash of the source files,
+    so later starts skip JSON parsing and compilation until one of the files changes.
+
+    Attributes:
+        tileset (Dict[str, Dict]): The raw tileset, keyed by tile name.
+        tile_constraints (Dict[str, Dict]): The raw adjacency preferences, keyed by tile name.
+        directions (Dict[str, List[int]]): Direction name to (dx, dy) offset.
+        reverse_directions (Dict[str, str]): Direction name to its opposite.
+        character_tileset (Dict[str, List]): Character animation frame positions.
+        tile_names (List[str]): Tile names sorted alphabetically; the index is the tile id.
+        tile_ids (Dict[str, int]): Tile name to tile id.
+        weights (List[float]): Tile weight per tile id.
+        positions (List[Tuple[int, int]]): Spritesheet position per tile id.
+        adjacency (Dict[str, List[int]]): For each direction, a bitmask per tile id of the tile ids
+            allowed next to it in that direction.
+        collidable_mask (int): Bitmask of collidable tile ids.
+        generatable_mask (int): Bitmask of tile ids that objects may be generated on.
+        content_hash (bytes): SHA-256 of the source files and the cache format version, as the
+            cache is keyed by.
+        loaded_from_cache (bool): Whether the compiled tables came from the binary cache.
+        load_time (float): Seconds spent loading the assets.
+    """
+
+    def __init__(self, data_dir=DATA_PATH, cache_path=CACHE_PATH):
+        """
+        Initializes the AssetRegistry and loads the assets.
+
+        Args:
+            data_dir (str): Directory containing the JSON data files.
+            cache_path (str, optional): Path of the binary cache. None disables caching.
+        """
+        self.data_dir = data_dir
+        self.cache_path = cache_path
+        self.json_loader = TileJsonLoader(data_dir)
+        self.loaded_from_cache = False
+
+        start_time = time.perf_counter()
+        self.load()
+        self.load_time = time.perf_counter() - start_time
+
+    def load(self):
+        """
+        Loads the compiled tables from the cache, or parses and compiles the JSON files.
+        """
+        sources = {}
+        for file_name in ASSET_FILES.values():
+            with open(os.path.join(self.data_dir, file_name), 'rb') as file:
+                sources[file_name] = file.read()
+        content_hash = self.hash_sources(sources)
+        self.content_hash = content_hash
+
+        compiled = self.read_cache(content_hash)
+        if compiled is not None:
+            self.loaded_from_cache = True
+        else:
+            raw = {key: self.json_loader.load_json(file_name) for key, file_name in ASSET_FILES.items()}
+            self.validate(raw)
+            compiled = self.compile(raw)
+            self.write_cache(content_hash, compiled)
+
+        for key, value in compiled.items():
+            setattr(self, key, value)
+
+    def hash_sources(self, sources):
+        """
+        Hashes the source files together with the cache format version.
+
+        Args:
+            sources (Dict[str, bytes]): File name to file contents.
+
+        Returns:
+            bytes: The SHA-256 digest.
+        """
+        digest = hashlib.sha256(CACHE_VERSION.to_bytes(4, 'little'))
+        for file_name in sorted(sources):
+            digest.update(file_name.encode('utf-8'))
+            digest.update(len(sources[file_name]).to_bytes(8, 'little'))
+            digest.update(sources[file_name])
+        return digest.digest()
+
+    def validate(self, raw):
+        """
+        Checks the parsed JSON data for structural errors and dangling references.
+
+        Args:
+            raw (Dict[str, Dict]): The parsed data files keyed as in ASSET_FILES.
+
+        Raises:
+            ValueError: If any file is malformed.
+        """
+        tileset = raw['tileset']
+        directions = raw['directions']
+        reverse_directions = raw['reverse_directions']
+
+        for tile_name, tile_info in tileset.items():
+            position = tile_info.get('position')
+            if not (isinstance(position, list) and len(position) == 2 and all(isinstance(v, int) for v in position)):
+                raise ValueError(f"Tile '{tile_name}' has an invalid position: {position!r}")
+            weight = tile_info.get('weight')
+            if not isinstance(weight, (int, float)) or weight < 0:
+                raise ValueError(f"Tile '{tile_name}' has an invalid weight: {weight!r}")
+
+        for direction, offset in directions.items():
+            if not (isinstance(offset, list) and len(offset) == 2):
+                raise ValueError(f"Direction '{direction}' has an invalid offset: {offset!r}")
+            reverse = reverse_directions.get(direction)
+            if reverse not in directions or reverse_directions.get(reverse) != direction:
+                raise ValueError(f"Direction '{direction}' has no consistent reverse direction.")
+
+        for tile_name, rules in raw['tile_constraints'].items():
+            if tile_name not in tileset:
+                raise ValueError(f"Constraints reference unknown tile '{tile_name}'.")
+            for direction, allowed_tiles in rules.items():
+                if direction not in directions:
+                    raise ValueError(f"Constraints for '{tile_name}' use unknown direction '{direction}'.")
+                for other_tile, preference in allowed_tiles.items():
+                    if other_tile not in tileset:
+                        raise ValueError(f"Constraints for '{tile_name}' reference unknown tile '{other_tile}'.")
+                    if not isinstance(preference, (int, float)):
+                        raise ValueError(f"Constraint '{tile_name}' {direction} '{other_tile}' is not a number.")
+
+        for animation, frames in raw['character_tileset'].items():
+            if not all(isinstance(frame, list) and len(frame) == 2 for frame in frames):
+                raise ValueError(f"Character animation '{animation}' has invalid frame positions.")
+
+    def compile(self, raw):
+        """
+        Compiles the parsed data into lookup tables.
+
+        Args:
+            raw (Dict[str, Dict]): The parsed data files keyed as in ASSET_FILES.
+
+        Returns:
+            Dict[str, object]: The raw data plus the compiled tables.
+        """
+        tileset = raw['tileset']
+        tile_constraints = raw['tile_constraints']
+        tile_names = sorted(tileset.keys())
+        tile_ids = {tile_name: tile_id for tile_id, tile_name in enumerate(tile_names)}
+        adjacency = compile_adjacency(tile_names, tile_constraints, raw['directions'])
+
+        collidable_mask = 0
+        generatable_mask = 0
+        for tile_name, tile_id in tile_ids.items():
+            if tileset[tile_name].get('collidable', False):
+                collidable_mask |= 1 << tile_id
+            if tileset[tile_name].get('generatable', False):
+                generatable_mask |= 1 << tile_id
+
+        compiled = dict(raw)
+        compiled.update(
+            tile_names=tile_names,
+            tile_ids=tile_ids,
+            weights=[tileset[tile_name]['weight'] for tile_name in tile_names],
+            positions=[tuple(tileset[tile_name]['position']) for tile_name in tile_names],
+            adjacency=adjacency,
+            collidable_mask=collidable_mask,
+            generatable_mask=generatable_mask,
+        )
+        return compiled
+
+    def read_cache(self, content_hash):
+        """
+        Reads the compiled tables from the cache if it matches the source hash.
+
+        Args:
+            content_hash (bytes): The hash of the current source files.
+
+        Returns:
+            Dict[str, object] or None: The compiled tables, or None on a miss.
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'rb') as file:
+                header = file.read(len(CACHE_MAGIC) + len(content_hash))
+                if header != CACHE_MAGIC + content_hash:
+                    return None
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def write_cache(self, content_hash, compiled):
+        """
+        Writes the compiled tables to the cache. Failures are ignored.
+
+        Args:
+            content_hash (bytes): The hash of the current source files.
+            compiled (Dict[str, object]): The compiled tables.
+        """
+        if not self.cache_path:
+            return
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                file.write(CACHE_MAGIC + content_hash)
+                pickle.dump(compiled, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def tile_mask(self, tile_names):
+        """
+        Converts tile names to a bitmask of tile ids.
+
+        Args:
+            tile_names (Iterable[str]): The tile names.
+
+        Returns:
+            int: The bitmask.
+        """
+        mask = 0
+        for tile_name in tile_names:
+            mask |= 1 << self.tile_ids[tile_name]
+        return mask
+
+    def mask_tiles(self, mask):
+        """
+        Converts a bitmask of tile ids to a sorted list of tile names.
+
+        Args:
+            mask (int): The bitmask.
+
+        Returns:
+            List[str]: The tile names, sorted alphabetically.
+        """
+        return [tile_name for tile_id, tile_name in enumerate(self.tile_names) if mask >> tile_id & 1]
+
+
+def compile_adjacency(tile_names, tile_constraints, directions):
+    """
+    Compiles adjacency constraints into bitmasks of tile ids.
+
+    Args:
+        tile_names (List[str]): The tile names; the index is the tile id.
+        tile_constraints (Dict[str, Dict]): The adjacency preferences, keyed by tile name.
+        directions (Iterable[str]): The direction names.
+
+    Returns:
+        Dict[str, List[int]]: For each direction, a bitmask per tile id of the tile ids it
+        allows next to it in that direction.
+    """
+    tile_ids = {tile_name: tile_id for tile_id, tile_name in enumerate(tile_names)}
+    adjacency = {}
+    for direction in sorted(directions):
+        masks = []
+        for tile_name in tile_names:
+            mask = 0
+            for other_tile, preference in tile_constraints.get(tile_name, {}).get(direction, {}).items():
+                if preference > 0:
+                    mask |= 1 << tile_ids[other_tile]
+            masks.append(mask)
+        adjacency[direction] = masks
+    return adjacency
+
+
+_assets = None
+
+
+def get_assets():
+    """
+    Returns the shared AssetRegistry, loading it on first use.
+
+    Returns:
+        AssetRegistry: The process-wide asset registry.
+    """
+    global _assets
+    if _assets is None:
+        _assets = AssetRegistry()
+    return _assets
+
+
+def measure_imports(modules, repeats=5):
+    """
+    Measures cold-start and warm-start import times in fresh interpreters.
+
+    Cold runs delete the binary cache first; warm runs reuse it. Timings come from
+    `python -X importtime` and are reported per module as the median over the repeats.
+
+    Args:
+        modules (List[str]): The modules whose import times to report.
+        repeats (int): Number of interpreter runs per mode.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Mode to module to cumulative import time in milliseconds.
+    """
+    # Imported here so that normal startup does not pay for them
+    import re
+    import statistics
+    import subprocess
+
+    pattern = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+    results = {}
+    for mode in ('cold', 'warm'):
+        samples = {}
+        for _ in range(repeats):
+            if mode == 'cold' and os.path.exists(CACHE_PATH):
+                os.remove(CACHE_PATH)
+            output = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+                capture_output=True, text=True, check=True,
+                env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1'),
+            ).stderr
+            for match in pattern.finditer(output):
+                module = match.group(3)
+                if module in modules or module.startswith('src.'):
+                    samples.setdefault(module, []).append(int(match.group(2)) / 1000)
+        results[mode] = {module: statistics.median(times) for module, times in samples.items()}
+    return results
+
+
+if __name__ == "__main__":
+    # Report cold-start and warm-start import timings, e.g. `python -m src.assets`
+    timings = measure_imports(['main'])
+    print(f"{'module':<24}{'cold (ms)':>12}{'warm (ms)':>12}")
+    for module in sorted(timings['cold'], key=lambda name: -timings['cold'][name]):
+        print(f"{module:<24}{timings['cold'][module]:>12.2f}{timings['warm'].get(module, 0.0):>12.2f}")
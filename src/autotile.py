@@ -0,0 +1,185 @@
+import sys
+import time
+import random
+
+BLOCK_SIZE = 5  # Tiles per side of the blocks the terrain is laid out in
+NOISE_SCALE = 2  # Blocks between the lattice points of the terrain noise
+BUSH_THRESHOLD = 0.5  # Bush noise above which a block holds a bush
+PATH_THRESHOLD = 0.45  # Path noise above which a block that holds no bush holds a path
+MIN_PATCH = 2  # Smallest patch side; the tileset has no tiles for one tile wide strips
+GRASS_SMALL_CHANCE = 0.5  # Chance that a grass tile is 'grass_small' rather than 'grass_plain'
+GRASS = 'grass'
+BUSH = 'bush'
+PATH = 'path'
+
+# Neighbour bits of the autotiling mask: which of the 4 neighbours share the tile's terrain class
+UP = 1
+RIGHT = 2
+DOWN = 4
+LEFT = 8
+# Mask -> tile name suffix of the terrain class. The tileset has edges and convex corners only,
+# so the terrain field is made of rectangular patches, for which every mask is in the table
+AUTOTILE_SUFFIXES = {
+    UP | RIGHT | DOWN | LEFT: 'center',
+    RIGHT | DOWN | LEFT: 'edge_up',
+    UP | RIGHT | LEFT: 'edge_down',
+    UP | RIGHT | DOWN: 'edge_left',
+    UP | DOWN | LEFT: 'edge_right',
+    RIGHT | DOWN: 'edge_up_left',
+    DOWN | LEFT: 'edge_up_right',
+    UP | RIGHT: 'edge_down_left',
+    UP | LEFT: 'edge_down_right',
+}
+
+
+def value_noise(rng, dimensions, scale=NOISE_SCALE):
+    """
+    Generates a smooth noise field in [0, 1) by interpolating random values on a coarse lattice.
+
+    Args:
+        rng (random.Random): The source of the lattice values.
+        dimensions (Tuple[int, int]): The (width, height) of the field.
+        scale (int): Cells between lattice points.
+
+    Returns:
+        List[List[float]]: The field, indexed [y][x].
+    """
+    width, height = dimensions
+    lattice_width = width // scale + 2
+    lattice = [[rng.random() for _ in range(lattice_width)] for _ in range(height // scale + 2)]
+    field = []
+    for y in range(height):
+        row_index, fy = divmod(y, scale)
+        ty = fy / scale
+        top, bottom = lattice[row_index], lattice[row_index + 1]
+        row = []
+        for x in range(width):
+            column, fx = divmod(x, scale)
+            tx = fx / scale
+            upper = top[column] + (top[column + 1] - top[column]) * tx
+            lower = bottom[column] + (bottom[column + 1] - bottom[column]) * tx
+            row.append(upper + (lower - upper) * ty)
+        field.append(row)
+    return field
+
+
+def terrain_classes(rng, dimensions):
+    """
+    Derives the terrain class of every tile from two noise fields, one for bushes and one for paths.
+
+    The room is divided into BLOCK_SIZE blocks. The noise at a block decides whether it holds a
+    bush, a path or only grass; a bush or path is a patch of random size and offset inside the
+    block, at least MIN_PATCH tiles wide and high. The last row and column of a block stay grass,
+    so patches never touch each other.
+
+    Args:
+        rng (random.Random): The room's random generator.
+        dimensions (Tuple[int, int]): The (width, height) of the room in tiles.
+
+    Returns:
+        List[List[str]]: GRASS, BUSH or PATH per tile, indexed [y][x].
+    """
+    width, height = dimensions
+    blocks = ((width + BLOCK_SIZE - 1) // BLOCK_SIZE, (height + BLOCK_SIZE - 1) // BLOCK_SIZE)
+    bush = value_noise(rng, blocks)
+    path = value_noise(rng, blocks)
+    classes = [[GRASS] * width for _ in range(height)]
+    for block_y in range(blocks[1]):
+        for block_x in range(blocks[0]):
+            if bush[block_y][block_x] > BUSH_THRESHOLD:
+                terrain = BUSH
+            elif path[block_y][block_x] > PATH_THRESHOLD:
+                terrain = PATH
+            else:
+                continue
+            left, top = block_x * BLOCK_SIZE, block_y * BLOCK_SIZE
+            # Room for the patch: the block without its last row and column, clipped to the room
+            space_x = min(BLOCK_SIZE - 1, width - left)
+            space_y = min(BLOCK_SIZE - 1, height - top)
+            if space_x < MIN_PATCH or space_y < MIN_PATCH:
+                continue
+            patch_width = rng.randint(MIN_PATCH, space_x)
+            patch_height = rng.randint(MIN_PATCH, space_y)
+            left += rng.randint(0, space_x - patch_width)
+            top += rng.randint(0, space_y - patch_height)
+            for y in range(top, top + patch_height):
+                classes[y][left:left + patch_width] = [terrain] * patch_width
+    return classes
+
+
+def neighbor_mask(classes, x, y):
+    """
+    Returns the autotiling mask of a tile; neighbours outside the room never match.
+    """
+    terrain = classes[y][x]
+    mask = 0
+    if y > 0 and classes[y - 1][x] == terrain:
+        mask |= UP
+    if x < len(classes[y]) - 1 and classes[y][x + 1] == terrain:
+        mask |= RIGHT
+    if y < len(classes) - 1 and classes[y + 1][x] == terrain:
+        mask |= DOWN
+    if x > 0 and classes[y][x - 1] == terrain:
+        mask |= LEFT
+    return mask
+
+
+def autotile_grid(room_seed, dimensions):
+    """
+    Generates a room's tile grid in one pass, as an alternative to the wave function collapse.
+
+    The terrain class of every tile comes from seeded noise; each bush and path tile then takes
+    the edge, corner or center tile of its class from AUTOTILE_SUFFIXES, by which of its
+    neighbours share its class. Nothing is searched or backtracked.
+
+    Args:
+        room_seed (int): The room's seed.
+        dimensions (Tuple[int, int]): The (width, height) of the room in tiles.
+
+    Returns:
+        List[List[str]]: Tile names of the tileset, indexed [y][x], like a collapsed grid.
+    """
+    rng = random.Random(room_seed)
+    classes = terrain_classes(rng, dimensions)
+    grid = []
+    for y, row in enumerate(classes):
+        names = []
+        for x, terrain in enumerate(row):
+            if terrain == GRASS:
+                names.append('grass_small' if rng.random() < GRASS_SMALL_CHANCE else 'grass_plain')
+            else:
+                names.append(f"{terrain}_{AUTOTILE_SUFFIXES[neighbor_mask(classes, x, y)]}")
+        grid.append(names)
+    return grid
+
+
+def benchmark(positions, base_seed=0):
+    """
+    Times the autotile generator against the wave function collapse on the same rooms.
+
+    Returns:
+        Dict[str, float]: Milliseconds per room of 'autotile', 'wfc' (each room collapsed on
+        its own) and 'wfc_batch' (the rooms collapsed together).
+    """
+    from src.room import get_room_seed, create_room_collapse, generate_room_grids, ROOM_DIMENSIONS
+    results = {}
+    start = time.perf_counter()
+    for position in positions:
+        autotile_grid(get_room_seed(base_seed, position), ROOM_DIMENSIONS)
+    results['autotile'] = (time.perf_counter() - start) * 1000 / len(positions)
+    start = time.perf_counter()
+    for position in positions:
+        create_room_collapse([position], base_seed).collapse()
+    results['wfc'] = (time.perf_counter() - start) * 1000 / len(positions)
+    start = time.perf_counter()
+    generate_room_grids(positions, base_seed)
+    results['wfc_batch'] = (time.perf_counter() - start) * 1000 / len(positions)
+    return results
+
+
+if __name__ == "__main__":
+    # Compare the generators, e.g. `python -m src.autotile 20 [base_seed]`
+    room_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    for generator, milliseconds in benchmark([(x, 0) for x in range(room_count)], seed).items():
+        print(f"{generator:>10}: {milliseconds:8.2f} ms/room")
@@ -0,0 +1,469 @@
+import math
+import random
+import time
+from bisect import bisect_left, insort
+from src.cell import EntropyTable, ENTROPY_LOG_WEIGHT, ENTROPY_SHANNON
+from src.wfc import WaveFunctionCollapse, CollapseError, DIRECTIONS, REVERSE_DIRECTIONS
+from src.telemetry import get_telemetry
+from src.assets import get_assets, compile_adjacency
+
+BATCH_SIZE = 16  # Rooms collapsed together by default
+
+
+class BatchWaveFunctionCollapse:
+    """
+    Collapses many rooms of the same size together.
+
+    The domains of all rooms live in one flat (rooms, height, width) array of tile bitmasks,
+    indexed by `room * height * width + y * width + x`. Each step collapses one cell in every
+    room, then drains a single work list of changed cells for the whole batch. The tables the
+    work list uses are shared by every room: neighbor offsets, and for each direction the
+    tiles a domain allows next to it, which are cached per bitmask so that a domain seen in
+    any room of the batch is never resolved twice. Entropies and tile distributions are
+    cached the same way.
+
+    Every room draws from its own `random.Random(seed)` in the same order as
+    `WaveFunctionCollapse` and propagation reaches the same domains, so each room is
+    identical to collapsing it alone. Contradictions are handled per room, as the sequential
+    collapse does: the room's changes are undone and the chosen tile is removed from the
+    cell. A room whose cell runs out of weighted tiles, or that hits more contradictions than
+    `max_backtracks`, leaves the batch and is collapsed sequentially instead, where it
+    restarts from derived sub-seeds exactly as it would have alone.
+
+    `collapse` runs to completion; `run` stops when a step or time budget runs out and
+    resumes on the next call, so rooms can be generated a few milliseconds per frame.
+
+    Attributes:
+        width (int): The width of each room in cells.
+        height (int): The height of each room in cells.
+        random_seeds (List[int]): The seed of each room.
+        grids (List[List[List[str]]]): The collapsed tile names per room after `collapse`.
+        fallback_rooms (List[int]): Indices of the rooms that were collapsed sequentially.
+        seed_indices (List[int]): Per room, which of its seed (0) and fallback sub-seeds the
+            grid was collapsed from, as `WaveFunctionCollapse.restarts`.
+        steps (int): Collapse steps taken by the batch.
+        backtracks (int): Collapse steps undone after contradictions.
+        room_backtracks (List[int]): Collapse steps undone per room.
+        room_iterations (List[int]): Cells collapsed or rejected per room.
+        room_propagations (List[int]): Cells whose neighbors were filtered, per room.
+        room_max_backtrack_depth (List[int]): Most consecutive steps undone per room.
+            The per-room counts follow `WaveFunctionCollapse`; for a room that fell back they
+            are the sequential collapse's, over all its attempts. Propagation visits cells in
+            another order, so room_propagations is close to the sequential count but not equal.
+        elapsed (float): Seconds spent in `run`, over all calls.
+    """
+
+    def __init__(self, grid_size, tileset, tile_constraints, random_seeds, entropy_heuristic=ENTROPY_LOG_WEIGHT,
+                 supports=None, max_backtracks=None, max_restarts=0):
+        """
+        Initializes the BatchWaveFunctionCollapse object.
+
+        Args:
+            grid_size (Tuple[int, int]): The (width, height) of every room.
+            tileset (Dict[str, Dict]): The tileset.
+            tile_constraints (Dict[str, Dict]): The adjacency constraints.
+            random_seeds (Iterable[int]): One seed per room, as passed to `WaveFunctionCollapse`.
+            entropy_heuristic (int): The entropy heuristic version, as passed to `WaveFunctionCollapse`.
+            supports (List[Dict[int, int]], optional): Support sets computed ahead of time for these
+                constraints, per direction in sorted order (see `src.constraint_compiler`).
+            max_backtracks (int, optional): Backtracks per attempt, as passed to `WaveFunctionCollapse`.
+            max_restarts (int): Restarts per room, as passed to `WaveFunctionCollapse`.
+        """
+        self.width, self.height = grid_size
+        self.tileset = tileset
+        self.tile_constraints = tile_constraints
+        self.random_seeds = list(random_seeds)
+        self.rooms = len(self.random_seeds)
+        self.cells = self.width * self.height
+
+        # Tile ids follow the sorted order of Cell.possible_tiles, as in the asset registry
+        assets = get_assets()
+        if tileset is assets.tileset and tile_constraints is assets.tile_constraints:
+            # The registry's tables, compiled once when the assets were loaded
+            self.tile_names, self.tile_ids, self.weights = assets.tile_names, assets.tile_ids, assets.weights
+            adjacency = assets.adjacency
+        else:
+            # Other rules, e.g. the compiled constraints
+            self.tile_names = sorted(tileset.keys())
+            self.tile_ids = {tile_name: tile_id for tile_id, tile_name in enumerate(self.tile_names)}
+            self.weights = [tileset[tile_name]['weight'] for tile_name in self.tile_names]
+            adjacency = compile_adjacency(self.tile_names, tile_constraints, DIRECTIONS)
+        self.entropy_heuristic = entropy_heuristic
+        self.max_backtracks = max_backtracks
+        self.max_restarts = max_restarts
+        self.entropy_table = EntropyTable(tileset) if entropy_heuristic == ENTROPY_SHANNON else None
+        self.allowed_by_tile = self.compile_rules(adjacency)
+        self.neighbors = self.compile_neighbors()
+        # Per direction: domain bitmask -> allowed neighbor tiles
+        self.supports = [dict(known) for known in supports] if supports else [{} for _ in self.allowed_by_tile]
+        self.entropies = {}
+        self.distributions = {}
+
+        self.domains = None
+        self.grids = None
+        self.fallback_rooms = []
+        self.seed_indices = None
+        self.steps = 0
+        self.backtracks = 0
+        self.elapsed = 0.0
+
+    def compile_rules(self, adjacency):
+        """
+        Lists, per direction in sorted order, the tiles each tile allows as its neighbor.
+
+        Args:
+            adjacency (Dict[str, List[int]]): The adjacency bitmasks, as from `compile_adjacency`.
+
+        Returns:
+            List[List[int]]: For each direction, a bitmask per tile id of the tile ids that may sit
+            next to it in that direction, following the neighbor's reverse-direction rules.
+        """
+        rules = []
+        tile_count = len(self.tile_names)
+        for direction in sorted(DIRECTIONS.keys()):
+            # Transpose the neighbors' rules for the reverse direction
+            allowed_by_tile = [0] * tile_count
+            for neighbor_id, neighbor_allows in enumerate(adjacency[REVERSE_DIRECTIONS[direction]]):
+                for tile_id in range(tile_count):
+                    if neighbor_allows >> tile_id & 1:
+                        allowed_by_tile[tile_id] |= 1 << neighbor_id
+            rules.append(allowed_by_tile)
+        return rules
+
+    def compile_neighbors(self):
+        """
+        Lists the in-room neighbors of every cell as (direction index, index offset) pairs.
+        """
+        neighbors = []
+        directions = sorted(DIRECTIONS.keys())
+        for y in range(self.height):
+            for x in range(self.width):
+                cell_neighbors = []
+                for direction_index, direction in enumerate(directions):
+                    dx, dy = DIRECTIONS[direction]
+                    if 0 <= x + dx < self.width and 0 <= y + dy < self.height:
+                        cell_neighbors.append((direction_index, dx + dy * self.width))
+                neighbors.append(tuple(cell_neighbors))
+        return neighbors
+
+    def support(self, direction_index, mask):
+        """
+        Returns the bitmask of tiles allowed in a direction next to a cell with the given domain.
+        """
+        allowed = 0
+        for tile_id, tile_allowed in enumerate(self.allowed_by_tile[direction_index]):
+            if mask >> tile_id & 1:
+                allowed |= tile_allowed
+        self.supports[direction_index][mask] = allowed
+        return allowed
+
+    def entropy(self, mask):
+        """
+        Returns the entropy of a domain, computed exactly as `Cell.calculate_entropy`.
+        """
+        entropy = self.entropies.get(mask)
+        if entropy is None:
+            if self.entropy_table is not None:
+                # The table's sums are exact, so this matches the cells' incremental updates
+                tiles = [tile_name for tile_id, tile_name in enumerate(self.tile_names) if mask >> tile_id & 1]
+                entropy = self.entropy_table.entropy(*self.entropy_table.sums(tiles))
+            else:
+                weights = [self.weights[tile_id] for tile_id in range(len(self.tile_names)) if mask >> tile_id & 1]
+                entropy = math.log(sum(weights))
+            self.entropies[mask] = entropy
+        return entropy
+
+    def select_tile(self, random_gen, mask):
+        """
+        Picks a tile from a domain, drawing from the generator as `WaveFunctionCollapse.select_tile`.
+        """
+        distribution = self.distributions.get(mask)
+        if distribution is None:
+            tiles = [tile_name for tile_id, tile_name in enumerate(self.tile_names) if mask >> tile_id & 1]
+            weights = [self.weights[self.tile_ids[tile]] for tile in tiles]
+            total_weight = sum(weights)
+            distribution = self.distributions[mask] = (tiles, [w / total_weight for w in weights])
+        tiles, probabilities = distribution
+        return random_gen.choices(tiles, probabilities)[0]
+
+    def collapse(self):
+        """
+        Collapses every room, falling back to a sequential collapse for rooms left without a solution.
+        """
+        self.run()
+
+    def start(self):
+        """
+        Sets every cell of every room to the full domain.
+        """
+        full_mask = (1 << len(self.tile_names)) - 1
+        full_entropy = self.entropy(full_mask)
+        size = self.rooms * self.cells
+        self.domains = [full_mask] * size
+        self.cell_entropies = [full_entropy] * size
+        self.collapsed = bytearray(size)
+        # Uncollapsed cells of each room by entropy, in (y, x) order like the sequential scan
+        self.buckets = [{full_entropy: list(range(self.cells))} for _ in range(self.rooms)]
+        self.random_gens = [random.Random(seed) for seed in self.random_seeds]
+        self.retired = [False] * self.rooms
+        self.room_backtracks = [0] * self.rooms
+        self.room_iterations = [0] * self.rooms
+        self.room_propagations = [0] * self.rooms
+        self.room_backtrack_depth = [0] * self.rooms  # Steps undone since the room's last successful collapse
+        self.room_max_backtrack_depth = [0] * self.rooms
+        self.active = list(range(self.rooms))
+        self.fallbacks = {}  # Room -> its resumable sequential collapse
+
+    def run(self, max_steps=None, time_budget=None):
+        """
+        Advances the collapse until a step or time budget runs out. The next call resumes
+        where this one stopped, so generation can be spread over many frames. The sequential
+        collapses of the rooms that left the batch run in the same budgets, one step at a
+        time like the batch, so a heavy seed never takes a whole collapse in one call.
+
+        Args:
+            max_steps (int, optional): The most steps to take. Defaults to no limit.
+            time_budget (float, optional): Seconds after which to stop. Defaults to no limit.
+
+        Returns:
+            bool: True once every room is collapsed and `grids` is available.
+        """
+        if self.grids is not None:
+            return True
+        start_time = time.perf_counter()
+        if self.domains is None:
+            self.start()
+        deadline = None if time_budget is None else start_time + time_budget
+        done_steps = 0
+        while self.active:
+            if max_steps is not None and done_steps >= max_steps:
+                self.elapsed += time.perf_counter() - start_time
+                return False
+            if deadline is not None and time.perf_counter() >= deadline:
+                self.elapsed += time.perf_counter() - start_time
+                return False
+            self.step()
+            done_steps += 1
+        for room in range(self.rooms):
+            if not self.retired[room]:
+                continue
+            wfc = self.fallbacks.get(room)
+            if wfc is None:
+                if self.max_restarts == 0 and self.room_backtracks[room] > self.max_backtracks:
+                    # The sequential collapse would fail the same way, on the same seed
+                    raise CollapseError(f"Backtrack limit of {self.max_backtracks} exceeded")
+                wfc = self.fallbacks[room] = WaveFunctionCollapse(
+                    (self.width, self.height), self.tileset, self.tile_constraints,
+                    random_seed=self.random_seeds[room], entropy_heuristic=self.entropy_heuristic,
+                    max_backtracks=self.max_backtracks, max_restarts=self.max_restarts)
+            if wfc.finished:
+                continue
+            steps_left = None if max_steps is None else max_steps - done_steps
+            time_left = None if deadline is None else deadline - time.perf_counter()
+            if (steps_left is not None and steps_left <= 0) or (time_left is not None and time_left <= 0):
+                self.elapsed += time.perf_counter() - start_time
+                return False
+            iterations = wfc.iterations
+            finished = wfc.run(max_steps=steps_left, time_budget=time_left)
+            done_steps += wfc.iterations - iterations
+            if not finished:
+                self.elapsed += time.perf_counter() - start_time
+                return False
+        self.finish()
+        self.elapsed += time.perf_counter() - start_time
+        get_telemetry().emit('batch_collapse', rooms=self.rooms, stages={'wfc': round(self.elapsed * 1000.0, 3)},
+                             counts={'steps': self.steps, 'backtracks': self.backtracks,
+                                     'fallback_rooms': len(self.fallback_rooms)})
+        return True
+
+    def progress(self):
+        """
+        Returns how far the collapse is.
+
+        Returns:
+            Tuple[int, int]: (collapsed cells, total cells) over all rooms.
+        """
+        total = self.rooms * self.cells
+        if self.grids is not None:
+            return total, total
+        if self.domains is None:
+            return 0, total
+        return self.collapsed.count(1), total
+
+    def finish(self):
+        """
+        Reads the collapsed grids, taking those of the rooms that left the batch from their
+        sequential collapses.
+        """
+        self.grids = []
+        self.seed_indices = [0] * self.rooms
+        for room in range(self.rooms):
+            if self.retired[room]:
+                wfc = self.fallbacks[room]
+                self.grids.append(wfc.get_collapsed_grid())
+                self.seed_indices[room] = wfc.restarts
+                # The fallback reruns the room from its seed, so its counts replace the batch's
+                self.room_iterations[room] = wfc.iterations
+                self.room_backtracks[room] = wfc.backtracks
+                self.room_propagations[room] = wfc.propagations
+                self.room_max_backtrack_depth[room] = wfc.max_backtrack_depth
+                continue
+            base = room * self.cells
+            self.grids.append([
+                [self.tile_names[self.domains[base + y * self.width + x].bit_length() - 1] for x in range(self.width)]
+                for y in range(self.height)
+            ])
+        self.fallback_rooms = [room for room in range(self.rooms) if self.retired[room]]
+
+    def step(self):
+        """
+        Collapses the minimum-entropy cell of every active room, then propagates the batch.
+        """
+        self.steps += 1
+        collapsing = {}  # Room -> (cell index, domain before collapsing, chosen tile id)
+        for room in self.active:
+            self.room_iterations[room] += 1
+            buckets = self.buckets[room]
+            min_entropy = min(buckets)
+            min_entropy_cells = buckets[min_entropy]
+            random_gen = self.random_gens[room]
+            cell = random_gen.choice(min_entropy_cells)
+            index = room * self.cells + cell
+            tile_id = self.tile_ids[self.select_tile(random_gen, self.domains[index])]
+
+            del min_entropy_cells[bisect_left(min_entropy_cells, cell)]
+            if not min_entropy_cells:
+                del buckets[min_entropy]
+            collapsing[room] = (index, self.domains[index], tile_id)
+            self.domains[index] = 1 << tile_id
+            self.collapsed[index] = 1
+
+        conflicts = self.propagate([index for index, _, _ in collapsing.values()])
+        self.backtracks += len(conflicts)
+        for room in collapsing:
+            if room not in conflicts:
+                self.room_backtrack_depth[room] = 0
+        for room in conflicts:
+            self.reject_tile(room, *collapsing[room])
+            self.room_backtracks[room] += 1
+            self.room_backtrack_depth[room] += 1
+            self.room_max_backtrack_depth[room] = max(self.room_max_backtrack_depth[room],
+                                                      self.room_backtrack_depth[room])
+            if self.max_backtracks is not None and self.room_backtracks[room] > self.max_backtracks:
+                # The sequential collapse restarts this room from a sub-seed
+                self.retired[room] = True
+        self.active = [room for room in self.active if self.buckets[room] and not self.retired[room]]
+
+    def propagate(self, queue):
+        """
+        Filters the neighbors of changed cells until no domain in the batch changes, then
+        updates the entropy buckets. The changes of a room in which a domain becomes empty
+        are undone.
+
+        Args:
+            queue (List[int]): Indices of the cells collapsed in this step.
+
+        Returns:
+            Set[int]: The rooms that hit a contradiction.
+        """
+        domains = self.domains
+        collapsed = self.collapsed
+        supports = self.supports
+        neighbors = self.neighbors
+        cells = self.cells
+        changed = {}  # Changed cell index -> domain before this step
+        conflicts = set()
+        propagations = self.room_propagations
+
+        while queue:
+            index = queue.pop()
+            room, cell = divmod(index, cells)
+            if room in conflicts:
+                continue
+            propagations[room] += 1
+            domain = domains[index]
+            for direction_index, offset in neighbors[cell]:
+                neighbor_index = index + offset
+                if collapsed[neighbor_index]:
+                    continue
+                allowed = supports[direction_index].get(domain)
+                if allowed is None:
+                    allowed = self.support(direction_index, domain)
+                neighbor_domain = domains[neighbor_index]
+                filtered = neighbor_domain & allowed
+                if filtered != neighbor_domain:
+                    if not filtered:
+                        conflicts.add(room)
+                        break
+                    if neighbor_index not in changed:
+                        changed[neighbor_index] = neighbor_domain
+                    domains[neighbor_index] = filtered
+                    queue.append(neighbor_index)
+
+        for index, old_domain in changed.items():
+            room, cell = divmod(index, cells)
+            if room in conflicts:
+                domains[index] = old_domain
+                continue
+            old_entropy = self.cell_entropies[index]
+            try:
+                entropy = self.entropy(domains[index])
+            except ValueError:
+                # Only zero-weight tiles are left; the sequential collapse reports this
+                self.retired[room] = True
+                continue
+            if entropy != old_entropy:
+                self.cell_entropies[index] = entropy
+                self.move_to_bucket(room, cell, old_entropy, entropy)
+        return conflicts
+
+    def reject_tile(self, room, index, domain, tile_id):
+        """
+        Handles a contradiction as `WaveFunctionCollapse` does: the cell is uncollapsed with the
+        chosen tile removed from its domain, without propagating the removal.
+        """
+        cell = index - room * self.cells
+        domain &= ~(1 << tile_id)
+        self.domains[index] = domain
+        self.collapsed[index] = 0
+        try:
+            entropy = self.entropy(domain)
+        except ValueError:
+            # No weighted tile is left; leave the room to the sequential collapse
+            self.retired[room] = True
+            return
+        self.cell_entropies[index] = entropy
+        insort(self.buckets[room].setdefault(entropy, []), cell)
+
+    def move_to_bucket(self, room, cell, old_entropy, entropy):
+        """
+        Moves an uncollapsed cell between entropy buckets, keeping them in (y, x) order.
+        """
+        buckets = self.buckets[room]
+        bucket = buckets[old_entropy]
+        del bucket[bisect_left(bucket, cell)]
+        if not bucket:
+            del buckets[old_entropy]
+        insort(buckets.setdefault(entropy, []), cell)
+
+    def room_counts(self, room):
+        """
+        Returns the collapse counts of one room, named as the `WaveFunctionCollapse` attributes.
+
+        Returns:
+            Dict[str, int]: 'iterations', 'backtracks', 'max_backtrack_depth', 'restarts' and
+            'propagations'.
+        """
+        return {
+            'iterations': self.room_iterations[room],
+            'backtracks': self.room_backtracks[room],
+            'max_backtrack_depth': self.room_max_backtrack_depth[room],
+            'restarts': self.seed_indices[room],
+            'propagations': self.room_propagations[room],
+        }
+
+    def get_collapsed_grids(self):
+        """
+        Returns the collapsed grid of every room, in the order of the seeds.
+        """
+        return [[row[:] for row in grid] for grid in self.grids]
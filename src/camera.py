@@ -41,9 +41,19 @@ class Camera:
         Args:
             target (pygame.sprite.Sprite): The target entity to follow (e.g., the player).
         """
-        # Center the camera on the target
-        self.x = target.rect.centerx - self.width // 2
-        self.y = target.rect.centery - self.height // 2
+        self.center_on(target.rect.centerx, target.rect.centery)
+
+    def center_on(self, center_x, center_y):
+        """
+        Centers the camera on a point in the game world, staying within the bounds of the world.
+
+        Args:
+            center_x (int): The x-coordinate to center on.
+            center_y (int): The y-coordinate to center on.
+        """
+        # Center the camera on the point
+        self.x = center_x - self.width // 2
+        self.y = center_y - self.height // 2
 
         # Clamp the camera position to the bounds of the world
         self.x = max(0, min(self.x, self.world_width - self.width))
@@ -1,4 +1,61 @@
 import math
+from fractions import Fraction
+
+# Versioned minimum-entropy heuristics. Worlds keep the version they were generated with,
+# since changing the heuristic changes every room of a seed.
+ENTROPY_LOG_WEIGHT = 1  # ln(total weight); ignores how the weight is distributed
+ENTROPY_SHANNON = 2  # Shannon entropy of the weight distribution, updated incrementally
+ENTROPY_HEURISTICS = (ENTROPY_LOG_WEIGHT, ENTROPY_SHANNON)
+
+
+class EntropyTable:
+    """
+    Precomputed per-tile terms for the Shannon entropy of a cell's weight distribution.
+
+    The entropy of a domain with weights w is ln(sum(w)) - sum(w * ln(w)) / sum(w), so a cell
+    only needs the two running sums. Both terms of every tile are stored as exact integer
+    multiples of a common power-of-two denominator (every float is one), which makes the
+    running sums exact: they do not depend on the order in which tiles were removed, and the
+    entropy of a domain is the same however it was reached.
+
+    Attributes:
+        denominator (int): The common denominator of the stored terms.
+        weight_terms (Dict[str, int]): Tile name to weight times the denominator.
+        log_terms (Dict[str, int]): Tile name to w * ln(w) times the denominator; 0 for w = 0.
+    """
+
+    def __init__(self, tileset):
+        """
+        Initializes the EntropyTable.
+
+        Args:
+            tileset (Dict[str, Dict]): The tileset, with a 'weight' per tile.
+        """
+        terms = {}
+        for tile_name, tile_info in tileset.items():
+            weight = tile_info['weight']
+            log_term = weight * math.log(weight) if weight > 0 else 0.0
+            terms[tile_name] = (Fraction(weight), Fraction(log_term))
+        self.denominator = max([term.denominator for pair in terms.values() for term in pair] or [1])
+        self.weight_terms = {tile_name: int(weight * self.denominator) for tile_name, (weight, _) in terms.items()}
+        self.log_terms = {tile_name: int(log_term * self.denominator) for tile_name, (_, log_term) in terms.items()}
+
+    def sums(self, tiles):
+        """
+        Returns the exact (weight, w * ln(w)) sums of some tiles.
+        """
+        return sum(self.weight_terms[tile] for tile in tiles), sum(self.log_terms[tile] for tile in tiles)
+
+    def entropy(self, weight_sum, log_weight_sum):
+        """
+        Computes the Shannon entropy from exact sums in O(1).
+
+        Raises:
+            ValueError: If the total weight is zero, as ln(0) is undefined.
+        """
+        total_weight = weight_sum / self.denominator
+        return math.log(total_weight) - (log_weight_sum / self.denominator) / total_weight
+
 
 class Cell:
     """
@@ -14,9 +71,12 @@ class Cell:
         collapsed (bool): Indicates whether the cell has been collapsed to a single tile.
         tile (Optional[str]): The tile assigned to this cell after collapsing. None if uncollapsed.
         entropy (float): The calculated entropy of the cell based on the weights of possible tiles.
+        heuristic (int): The entropy heuristic version, ENTROPY_LOG_WEIGHT or ENTROPY_SHANNON.
+        weight_sum (int): Running exact weight sum of the possible tiles (Shannon heuristic only).
+        log_weight_sum (int): Running exact w * ln(w) sum of the possible tiles (Shannon heuristic only).
     """
 
-    def __init__(self, x, y, tileset):
+    def __init__(self, x, y, tileset, heuristic=ENTROPY_LOG_WEIGHT, entropy_table=None):
         """
         Initializes a Cell instance.
 
@@ -25,20 +85,32 @@ class Cell:
             y (int): The y-coordinate of the cell in the grid.
             tileset (Dict[str, Dict]): A dictionary representing the tileset, where keys are tile names
                 and values are dictionaries containing tile properties, including 'weight'.
+            heuristic (int): The entropy heuristic version, ENTROPY_LOG_WEIGHT or ENTROPY_SHANNON.
+            entropy_table (EntropyTable, optional): Shared per-tile terms for the Shannon heuristic.
+                Built from the tileset if not given.
         """
+        if heuristic not in ENTROPY_HEURISTICS:
+            raise ValueError(f"Unknown entropy heuristic: {heuristic!r}")
         self.x = x
         self.y = y
         self.possible_tiles = sorted(tileset.keys())
         self.collapsed = False
         self.tile = None
+        self.heuristic = heuristic
+        if heuristic == ENTROPY_SHANNON and entropy_table is None:
+            entropy_table = EntropyTable(tileset)
+        self.entropy_table = entropy_table
+        self.weight_sum = 0
+        self.log_weight_sum = 0
         self.entropy = self.calculate_entropy(tileset)
 
     def calculate_entropy(self, tileset):
         """
         Calculates the entropy of the cell based on the weights of its possible tiles.
 
-        The entropy is calculated using the natural logarithm of the sum of the weights of the possible tiles:
-        entropy = ln(total_weight)
+        With ENTROPY_LOG_WEIGHT the entropy is the natural logarithm of the sum of the weights of
+        the possible tiles: entropy = ln(total_weight). With ENTROPY_SHANNON the running sums are
+        rebuilt from the possible tiles and the Shannon entropy is returned.
 
         Args:
             tileset (Dict[str, Dict]): The tileset dictionary containing tile weights.
@@ -46,7 +118,46 @@ class Cell:
         Returns:
             float: The entropy of the cell.
         """
+        if self.heuristic == ENTROPY_SHANNON:
+            self.weight_sum, self.log_weight_sum = self.entropy_table.sums(self.possible_tiles)
+            return self.entropy_table.entropy(self.weight_sum, self.log_weight_sum)
         weights = [tileset[tile]['weight'] for tile in self.possible_tiles]
         total_weight = sum(weights)
         entropy = math.log(total_weight)
         return entropy
+
+    def remove_tiles(self, remaining_tiles, removed_tiles, tileset):
+        """
+        Narrows the possible tiles and updates the entropy.
+
+        With ENTROPY_SHANNON only the removed tiles' terms are subtracted from the running sums;
+        ENTROPY_LOG_WEIGHT recomputes the entropy as it always has, so existing seeds are unchanged.
+
+        Args:
+            remaining_tiles (List[str]): The sorted tiles that stay possible.
+            removed_tiles (List[str]): The tiles that are no longer possible.
+            tileset (Dict[str, Dict]): The tileset dictionary containing tile weights.
+        """
+        self.possible_tiles = remaining_tiles
+        if self.heuristic == ENTROPY_SHANNON:
+            table = self.entropy_table
+            for tile in removed_tiles:
+                self.weight_sum -= table.weight_terms[tile]
+                self.log_weight_sum -= table.log_terms[tile]
+            self.entropy = table.entropy(self.weight_sum, self.log_weight_sum)
+        else:
+            self.entropy = self.calculate_entropy(tileset)
+
+    def snapshot(self):
+        """
+        Returns the cell's mutable state, for `restore` when backtracking.
+        """
+        return (self.possible_tiles.copy(), self.collapsed, self.tile, self.entropy,
+                self.weight_sum, self.log_weight_sum)
+
+    def restore(self, state):
+        """
+        Restores state returned by `snapshot`.
+        """
+        (self.possible_tiles, self.collapsed, self.tile, self.entropy,
+         self.weight_sum, self.log_weight_sum) = state
@@ -1,16 +1,15 @@
 import pygame
-import os
 from src.camera import Camera
-from src.util import TileJsonLoader
+from src.assets import get_assets
+from src.collision import move_and_slide
 
-# Load configuration data
-DATA_PATH = os.path.join("assets", "data")
-json_loader = TileJsonLoader(DATA_PATH)
-TILESET = json_loader.load_json("tileset.json")
-TILE_CONSTRAINTS = json_loader.load_json("tile_constraints.json")
-DIRECTIONS = json_loader.load_json("directions.json")
-REVERSE_DIRECTIONS = json_loader.load_json("reverse_directions.json")
-CHARACTER_TILESET = json_loader.load_json("character_tileset.json")
+# Configuration data comes from the shared asset registry
+ASSETS = get_assets()
+TILESET = ASSETS.tileset
+TILE_CONSTRAINTS = ASSETS.tile_constraints
+DIRECTIONS = ASSETS.directions
+REVERSE_DIRECTIONS = ASSETS.reverse_directions
+CHARACTER_TILESET = ASSETS.character_tileset
 
 TILE_SIZE = 16
 
@@ -33,6 +32,7 @@ class Character:
         """
         self.spritesheet = spritesheet
         self.position = pygame.Vector2(position)
+        self.previous_position = pygame.Vector2(position)  # Position at the start of the simulation step
         self.world_width = world_width
         self.world_height = world_height
         self.animation_speed = 0.25  # Time between animation frames in seconds
@@ -89,6 +89,24 @@ class Character:
         self.enemy_interaction_rect = pygame.Rect(0, 0, 40, 40)
         self.update_enemy_interaction_rect()
 
+    def store_previous_position(self):
+        """
+        Records the position at the start of a simulation step, for render interpolation.
+        """
+        self.previous_position.update(self.position)
+
+    def get_render_position(self, alpha=1.0):
+        """
+        Interpolates between the previous and the current simulation step.
+
+        Args:
+            alpha (float): How far rendering is between the two steps, from 0 to 1.
+
+        Returns:
+            pygame.Vector2: The position to draw the character at.
+        """
+        return self.previous_position.lerp(self.position, alpha)
+
     def update(self, dt):
         """
         Updates the character's state each frame.
@@ -146,7 +164,7 @@ class Character:
 
     def move(self, dx, dy, dt, tile_map):
         """
-        Moves the character based on input and handles collisions.
+        Moves the character based on input, sliding along the blocked tiles it runs into.
 
         Args:
             dx (float): Movement direction along the x-axis (-1, 0, or 1).
@@ -158,32 +176,13 @@ class Character:
         delta_x = dx * speed * dt
         delta_y = dy * speed * dt
 
-        original_position = self.position.copy()
-
-        # Attempt to move in both axes
-        self.position.x += delta_x
-        self.position.y += delta_y
+        # Sweep the collision rect along the move in one query, so no step size tunnels through a wall
+        offset_x, offset_y = self.collision_rect_offset
+        x, y = move_and_slide(self.position.x + offset_x, self.position.y + offset_y, self.collision_rect.width,
+                              self.collision_rect.height, delta_x, delta_y, tile_map)
+        self.position.update(x - offset_x, y - offset_y)
         self.update_collision_rect()
 
-        if self.check_collision(self.collision_rect, tile_map.collidable_tiles):
-            # Collision detected; revert to original position
-            self.position = original_position.copy()
-            self.update_collision_rect()
-
-            # Attempt to move only along the x-axis
-            self.position.x += delta_x
-            self.update_collision_rect()
-            if self.check_collision(self.collision_rect, tile_map.collidable_tiles):
-                self.position.x -= delta_x  # Revert x movement
-                self.update_collision_rect()
-
-            # Attempt to move only along the y-axis
-            self.position.y += delta_y
-            self.update_collision_rect()
-            if self.check_collision(self.collision_rect, tile_map.collidable_tiles):
-                self.position.y -= delta_y  # Revert y movement
-                self.update_collision_rect()
-
         # Update facing direction and animation based on movement
         if dx > 0:
             self.current_animation = 'right'
@@ -269,19 +268,6 @@ class Character:
         )
         self.rect.topleft = self.position
 
-    def check_collision(self, rect, collidable_tiles):
-        """
-        Checks for collisions between the character and collidable tiles.
-
-        Args:
-            rect (pygame.Rect): The rectangle to check for collisions.
-            collidable_tiles (List[Tile]): A list of tiles that are collidable.
-
-        Returns:
-            bool: True if a collision is detected; False otherwise.
-        """
-        return any(rect.colliderect(tile.rect) for tile in collidable_tiles)
-
     def update_animation(self, dt):
         """
         Updates the character's animation frames based on the animation timer.
@@ -307,25 +293,27 @@ class Character:
         x = 10  # Horizontal position on the screen
         y = 10  # Vertical position on the screen
         health_ratio = self.health / self.max_health
-        pygame.draw.rect(surface, (255, 0, 0), (x, y, bar_width, bar_height))  # Background bar
-        pygame.draw.rect(
-            surface,
+        # Filled with Surface.fill rather than pygame.draw so that any surface-like target works
+        surface.fill((255, 0, 0), (x, y, bar_width, bar_height))  # Background bar
+        surface.fill(
             (0, 255, 0),
             (x, y, bar_width * health_ratio, bar_height)
         )  # Health bar
 
-    def draw(self, screen, camera):
+    def draw(self, screen, camera, alpha=1.0):
         """
         Draws the character and optional debug rectangles on the screen.
 
         Args:
             screen (pygame.Surface): The game screen to draw on.
             camera (Camera): The camera object for adjusting the drawing position.
+            alpha (float): Interpolation between the previous and the current simulation step.
         """
         # Adjust for the camera offset and draw the character
+        position = self.get_render_position(alpha)
         screen.blit(
             self.image,
-            (self.position.x - camera.x, self.position.y - camera.y)
+            (position.x - camera.x, position.y - camera.y)
         )
 
         # Optional: Draw the interaction rectangles for debugging
@@ -0,0 +1,278 @@
+import os
+import pickle
+import hashlib
+from src.assets import get_assets, CACHE_MAGIC
+from src.batch_wfc import BatchWaveFunctionCollapse
+
+COMPILED_CONSTRAINTS_PATH = os.path.join("assets", "cache", "compiled_constraints.bin")
+COMPILER_VERSION = 1
+SYMMETRY_MODES = ('none', 'union', 'intersection')
+DEFAULT_SYMMETRY = 'intersection'  # Keep only the adjacencies both tiles agree on
+SAMPLE_SEEDS = 16  # Rooms collapsed to collect the domains seen in practice
+SAMPLE_GRID_SIZE = (50, 50)
+
+
+class CompiledConstraints:
+    """
+    The result of compiling the tileset and its adjacency constraints.
+
+    Attributes:
+        tileset (Dict[str, Dict]): The tileset without the removed tiles.
+        tile_constraints (Dict[str, Dict]): The symmetrised constraints between the remaining tiles.
+        tile_names (List[str]): The remaining tile names, sorted; the index is the tile id.
+        removed_tiles (Dict[str, str]): Removed tile name to the reason it can never appear.
+        asymmetries (List[Tuple[str, str, str, float, float]]): (tile, direction, other tile,
+            preference, reverse preference) for every adjacency only one of the two tiles allows.
+        symmetry (str): How asymmetries were resolved: 'none', 'union' or 'intersection'.
+        supports (List[Dict[int, int]]): Per direction in sorted order, domain bitmask to the
+            bitmask of tiles allowed next to it, for the domains seen while sampling.
+        source_hash (bytes): Hash of the inputs the constraints were compiled from.
+    """
+
+    FIELDS = ('tileset', 'tile_constraints', 'removed_tiles', 'asymmetries', 'symmetry', 'supports', 'source_hash')
+
+    def __init__(self, tileset, tile_constraints, removed_tiles, asymmetries, symmetry, supports, source_hash):
+        self.tileset = tileset
+        self.tile_constraints = tile_constraints
+        self.tile_names = sorted(tileset.keys())
+        self.removed_tiles = removed_tiles
+        self.asymmetries = asymmetries
+        self.symmetry = symmetry
+        self.supports = supports
+        self.source_hash = source_hash
+
+    def report(self):
+        """
+        Describes the asymmetries and removed tiles in human-readable lines.
+
+        Returns:
+            List[str]: The report lines.
+        """
+        lines = [f"{len(self.asymmetries)} asymmetric adjacencies (resolved by {self.symmetry}):"]
+        for tile_name, direction, other_tile, preference, reverse_preference in self.asymmetries:
+            lines.append(f"  {tile_name} allows {other_tile} {direction} ({preference}), "
+                         f"but {other_tile} does not allow it back ({reverse_preference})")
+        lines.append(f"{len(self.removed_tiles)} tiles removed:")
+        for tile_name, reason in sorted(self.removed_tiles.items()):
+            lines.append(f"  {tile_name}: {reason}")
+        lines.append(f"{len(self.tile_names)} tiles kept; "
+                     f"{sum(len(supports) for supports in self.supports)} support sets precomputed")
+        return lines
+
+
+class ConstraintCompiler:
+    """
+    Compiles tile_constraints.json into consistent constraints ahead of time.
+
+    `WaveFunctionCollapse` only consults the neighbor's rules when it filters a neighbor, so an
+    adjacency that one tile allows and the other does not is allowed when propagating one way
+    and forbidden the other way. Such asymmetries and tiles that can never appear otherwise
+    only show up at runtime, as contradictions and backtracking. The compiler:
+
+    1. Reports every asymmetric adjacency and resolves it by union or intersection.
+    2. Removes tiles that can never appear, by arc consistency over the tile set: a tile with
+       zero weight is never selected, and a tile without an allowed neighbor on both sides of
+       an axis cannot be placed in any grid at least two cells wide and high. Removing a tile
+       can leave others without support, so this repeats until nothing changes.
+    3. Collapses sample rooms with the result and keeps, per direction, the support set of
+       every domain they produced, so the batch collapse starts with them precomputed.
+
+    Attributes:
+        symmetry (str): How to resolve asymmetries: 'none', 'union' or 'intersection'.
+    """
+
+    def __init__(self, symmetry=DEFAULT_SYMMETRY, sample_seeds=SAMPLE_SEEDS):
+        """
+        Initializes the ConstraintCompiler.
+
+        Args:
+            symmetry (str): How to resolve asymmetries: 'none', 'union' or 'intersection'.
+            sample_seeds (int): The number of rooms collapsed to collect support sets.
+        """
+        if symmetry not in SYMMETRY_MODES:
+            raise ValueError(f"Unknown symmetry mode '{symmetry}'; expected one of {SYMMETRY_MODES}.")
+        self.symmetry = symmetry
+        self.sample_seeds = sample_seeds
+        self.assets = get_assets()
+
+    def source_hash(self):
+        """
+        Hashes the inputs of the compilation: the constraints, the tile weights and the options.
+        """
+        digest = hashlib.sha256(COMPILER_VERSION.to_bytes(4, 'little'))
+        digest.update(self.symmetry.encode('utf-8'))
+        digest.update(self.sample_seeds.to_bytes(4, 'little'))
+        digest.update(repr(sorted((name, info['weight']) for name, info in self.assets.tileset.items())).encode('utf-8'))
+        digest.update(repr(sorted(
+            (tile_name, direction, other_tile, preference)
+            for tile_name, rules in self.assets.tile_constraints.items()
+            for direction, allowed_tiles in rules.items()
+            for other_tile, preference in allowed_tiles.items()
+        )).encode('utf-8'))
+        return digest.digest()
+
+    def find_asymmetries(self, tile_constraints):
+        """
+        Lists the adjacencies that one tile allows and the other does not.
+
+        Returns:
+            List[Tuple[str, str, str, float, float]]: (tile, direction, other tile, preference,
+            reverse preference), each pair reported once from the allowing tile.
+        """
+        reverse_directions = self.assets.reverse_directions
+        asymmetries = []
+        for tile_name in sorted(tile_constraints):
+            for direction in sorted(tile_constraints[tile_name]):
+                for other_tile, preference in sorted(tile_constraints[tile_name][direction].items()):
+                    reverse_preference = tile_constraints.get(other_tile, {}).get(
+                        reverse_directions[direction], {}).get(tile_name, 0)
+                    if preference > 0 and not reverse_preference > 0:
+                        asymmetries.append((tile_name, direction, other_tile, preference, reverse_preference))
+        return asymmetries
+
+    def symmetrise(self, tile_constraints, asymmetries):
+        """
+        Resolves asymmetries: 'union' adds the missing reverse adjacency with the same
+        preference, 'intersection' drops the one-sided adjacency, 'none' keeps both as they are.
+
+        Returns:
+            Dict[str, Dict]: A new constraints dictionary.
+        """
+        constraints = {
+            tile_name: {direction: dict(allowed_tiles) for direction, allowed_tiles in rules.items()}
+            for tile_name, rules in tile_constraints.items()
+        }
+        for tile_name, direction, other_tile, preference, _ in asymmetries:
+            reverse_direction = self.assets.reverse_directions[direction]
+            if self.symmetry == 'union':
+                constraints.setdefault(other_tile, {}).setdefault(reverse_direction, {})[tile_name] = preference
+            elif self.symmetry == 'intersection':
+                del constraints[tile_name][direction][other_tile]
+                constraints.get(other_tile, {}).get(reverse_direction, {}).pop(tile_name, None)
+        return constraints
+
+    def prune(self, tileset, tile_constraints):
+        """
+        Removes the tiles that can never appear, until the remaining tiles are arc consistent.
+
+        Returns:
+            Dict[str, str]: Removed tile name to the reason.
+        """
+        directions = self.assets.directions
+        reverse_directions = self.assets.reverse_directions
+        removed = {name: "zero weight, never selected" for name, info in tileset.items() if not info['weight'] > 0}
+        live = set(tileset) - set(removed)
+
+        def allowed(tile_name, direction, other_tile):
+            # Permissive: allowed if either tile's rule allows it, so no placeable tile is removed
+            return (tile_constraints.get(other_tile, {}).get(reverse_directions[direction], {}).get(tile_name, 0) > 0
+                    or tile_constraints.get(tile_name, {}).get(direction, {}).get(other_tile, 0) > 0)
+
+        axes = {}
+        for direction, (dx, dy) in directions.items():
+            axes.setdefault('horizontal' if dx else 'vertical', []).append(direction)
+
+        changed = True
+        while changed:
+            changed = False
+            for tile_name in sorted(live):
+                for axis, axis_directions in sorted(axes.items()):
+                    if not any(allowed(tile_name, direction, other_tile)
+                               for direction in axis_directions for other_tile in live):
+                        removed[tile_name] = f"no allowed {axis} neighbor"
+                        live.discard(tile_name)
+                        changed = True
+                        break
+        return removed
+
+    def compile(self):
+        """
+        Compiles the constraints and samples the support sets.
+
+        Returns:
+            CompiledConstraints: The compiled constraints.
+        """
+        asymmetries = self.find_asymmetries(self.assets.tile_constraints)
+        constraints = self.symmetrise(self.assets.tile_constraints, asymmetries)
+        removed_tiles = self.prune(self.assets.tileset, constraints)
+
+        tileset = {name: info for name, info in self.assets.tileset.items() if name not in removed_tiles}
+        constraints = {
+            tile_name: {
+                direction: {other: preference for other, preference in allowed_tiles.items() if other in tileset}
+                for direction, allowed_tiles in rules.items()
+            }
+            for tile_name, rules in constraints.items() if tile_name in tileset
+        }
+
+        wfc = BatchWaveFunctionCollapse(SAMPLE_GRID_SIZE, tileset, constraints,
+                                        [(index * 2654435761 + 17) % (2**32) for index in range(self.sample_seeds)])
+        wfc.collapse()
+        return CompiledConstraints(tileset, constraints, removed_tiles, asymmetries, self.symmetry,
+                                   wfc.supports, self.source_hash())
+
+
+def write_compiled_constraints(compiled, path=COMPILED_CONSTRAINTS_PATH):
+    """
+    Writes the compiled constraints artifact, keyed by the hash of its inputs.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(CACHE_MAGIC + compiled.source_hash)
+        # Stored as plain data so that the artifact does not depend on the module's import path
+        pickle.dump({field: getattr(compiled, field) for field in CompiledConstraints.FIELDS}, file,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+def read_compiled_constraints(source_hash, path=COMPILED_CONSTRAINTS_PATH):
+    """
+    Reads the compiled constraints artifact if it was compiled from the current inputs.
+
+    Returns:
+        CompiledConstraints or None: The compiled constraints, or None if missing or stale.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as file:
+            if file.read(len(CACHE_MAGIC) + len(source_hash)) != CACHE_MAGIC + source_hash:
+                return None
+            return CompiledConstraints(**pickle.load(file))
+    except (OSError, pickle.UnpicklingError, EOFError, TypeError):
+        return None
+
+
+_compiled = None
+
+
+def get_compiled_constraints(symmetry=DEFAULT_SYMMETRY):
+    """
+    Returns the compiled constraints, loading the artifact or compiling it when it is
+    missing or stale.
+
+    Returns:
+        CompiledConstraints: The compiled constraints.
+    """
+    global _compiled
+    if _compiled is None or _compiled.symmetry != symmetry:
+        compiler = ConstraintCompiler(symmetry)
+        _compiled = read_compiled_constraints(compiler.source_hash())
+        if _compiled is None:
+            _compiled = compiler.compile()
+            try:
+                write_compiled_constraints(_compiled)
+            except OSError:
+                pass
+    return _compiled
+
+
+if __name__ == "__main__":
+    # Compile the constraints and report the fixes, e.g. `python -m src.constraint_compiler union`
+    import sys
+
+    compiled = ConstraintCompiler(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SYMMETRY).compile()
+    write_compiled_constraints(compiled)
+    print("\n".join(compiled.report()))
+    print(f"Wrote {COMPILED_CONSTRAINTS_PATH}")
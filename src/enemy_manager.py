@@ -0,0 +1,555 @@
+import math
+from array import array
+from collections import deque
+from src.character import CHARACTER_TILESET
+from src.entity_registry import ENEMY
+from src.collision import move_and_slide
+
+TILE_SIZE = 16
+ENEMY_SPEED = 70  # Movement speed in pixels per second
+ANIMATION_SPEED = 0.1  # Time between animation frames in seconds
+SEPARATION_RADIUS = 12  # Enemies closer than this (in pixels) push each other apart
+SEPARATION_SPEED = 120  # Pixels per second two fully overlapping enemies are pushed apart
+FACINGS = ('down', 'left', 'right', 'up')  # Facing code -> animation name
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))  # 4-way connectivity, in the A* neighbour order
+LOD_VIEW_MARGIN = 32  # Pixels around the camera view within which enemies are updated fully
+LOD_NEAR_DISTANCE = 160  # Enemies within this many pixels of the player are updated fully even off-screen
+LOD_MAX_FULL_UPDATES = 64  # Full updates per step; past this the enemies farthest from the player are updated coarsely
+LOD_FAR_BUDGET = 16  # Coarse updates per step shared by the enemies outside the view and LOD_NEAR_DISTANCE
+LOD_MAX_CATCH_UP = 1.0  # Most seconds of skipped updates an enemy catches up on at once
+
+
+class EnemyManager:
+    """
+    Simulates all enemies of a room in a struct-of-arrays layout.
+
+    Positions, previous positions, velocities, movement targets and animation state live in
+    contiguous `array` columns indexed by slot, so one update pass walks flat arrays instead
+    of calling into a Python object (and allocating Vector2s) per enemy. Enemy objects are
+    thin views onto a slot. Removing an enemy moves the last slot into the hole, so the
+    arrays stay dense.
+
+    Pathfinding is shared: a breadth-first flow field from the tiles around the player gives
+    every enemy the next tile on a shortest 4-connected path, which is what each enemy's own
+    A* search used to compute. The field is only rebuilt when the player changes tile or the
+    room's entities change, and stops growing once every enemy has been reached. Enemies are
+    kept apart with a spatial hash of SEPARATION_RADIUS cells.
+
+    Given the camera view, an update has levels of detail: enemies in or near the view, or near
+    the player, get the full update, at most LOD_MAX_FULL_UPDATES of them. The others take
+    turns at a coarse update, at most LOD_FAR_BUDGET of them per step, which catches up on the time they skipped by walking the
+    flow field without separation or animation. `simulate` runs the same coarse update for a
+    room the player is not in, so its enemies keep closing in on where the player was last seen.
+
+    Attributes:
+        views (List[Enemy]): The enemy view of each slot.
+        x (array): Top-left x-coordinate of each enemy in pixels.
+        y (array): Top-left y-coordinate of each enemy in pixels.
+        previous_x (array): x-coordinate at the start of the simulation step.
+        previous_y (array): y-coordinate at the start of the simulation step.
+        velocity_x (array): Movement along x during the last update, in pixels per second.
+        velocity_y (array): Movement along y during the last update, in pixels per second.
+        target_x (array): x-coordinate of the tile the enemy is walking to.
+        target_y (array): y-coordinate of the tile the enemy is walking to.
+        animation_timer (array): Seconds since the last animation frame.
+        frame_index (array): Current animation frame.
+        facing (array): Facing code, an index into FACINGS.
+        idle (array): 1 if the enemy shows its idle frame.
+        lagged_time (array): Seconds the enemy has not been updated for.
+        target_position (Tuple[float, float] or None): Where the player was at the last update.
+    """
+
+    def __init__(self, tile_size=TILE_SIZE):
+        """
+        Initializes an empty EnemyManager.
+
+        Args:
+            tile_size (int): The size of the tiles in pixels.
+        """
+        self.tile_size = tile_size
+        self.views = []
+        self.x = array('d')
+        self.y = array('d')
+        self.previous_x = array('d')
+        self.previous_y = array('d')
+        self.velocity_x = array('d')
+        self.velocity_y = array('d')
+        self.target_x = array('d')
+        self.target_y = array('d')
+        self.animation_timer = array('d')
+        self.frame_index = array('i')
+        self.facing = array('b')
+        self.idle = array('b')
+        self.lagged_time = array('d')
+        self.columns = (
+            self.x, self.y, self.previous_x, self.previous_y, self.velocity_x, self.velocity_y,
+            self.target_x, self.target_y, self.animation_timer, self.frame_index, self.facing, self.idle,
+            self.lagged_time,
+        )
+        self.frame_cache = {}  # (id(spritesheet), tile_size) -> (spritesheet, animations, idle_frames)
+
+        # Flow field towards the player, as tile distances (-1 = not reached)
+        self.flow_field = None
+        self.flow_queue = None  # The search's frontier, from which it is extended
+        self.flow_key = None
+        self.flow_complete = False
+        self.target_position = None
+        self.coarse_cursor = 0  # Where the next round of coarse updates starts
+
+    def __len__(self):
+        return len(self.views)
+
+    def add(self, view, position):
+        """
+        Allocates a slot for an enemy view.
+
+        Args:
+            view (Enemy): The view that reads and writes the slot.
+            position (Tuple[float, float]): The initial top-left position in pixels.
+
+        Returns:
+            int: The slot index.
+        """
+        x, y = position
+        for column, value in zip(self.columns, (x, y, x, y, 0, 0, x, y, 0, 0, 0, 0, 0)):
+            column.append(value)
+        self.views.append(view)
+        return len(self.views) - 1
+
+    def remove(self, view):
+        """
+        Frees the slot of an enemy view, moving the last slot into its place.
+
+        Args:
+            view (Enemy): The view to remove. Unknown views are ignored.
+        """
+        index = view.index
+        if index is None or index >= len(self.views) or self.views[index] is not view:
+            return
+        last = len(self.views) - 1
+        if index != last:
+            for column in self.columns:
+                column[index] = column[last]
+            moved = self.views[last]
+            self.views[index] = moved
+            moved.index = index
+        for column in self.columns:
+            column.pop()
+        self.views.pop()
+        view.index = None
+
+    def on_entity_removed(self, entity, kind):
+        """
+        EntityRegistry removal listener; frees the slot of a removed enemy.
+        """
+        if kind == ENEMY:
+            self.remove(entity)
+
+    def get_frames(self, spritesheet, tile_size, color_shift):
+        """
+        Returns the enemy animation frames, color-shifted once per spritesheet and shared by every enemy.
+
+        Args:
+            spritesheet (Spritesheet): The spritesheet containing the character frames.
+            tile_size (int): The size of a frame in pixels.
+            color_shift (Callable[[pygame.Surface], pygame.Surface]): Tints one frame.
+
+        Returns:
+            Tuple[Dict[str, List[pygame.Surface]], Dict[str, pygame.Surface]]: The animations and idle frames.
+        """
+        key = (id(spritesheet), tile_size)
+        cached = self.frame_cache.get(key)
+        if cached is None or cached[0] is not spritesheet:
+            animations = {
+                direction: [
+                    color_shift(spritesheet.get_image(x, y, tile_size, tile_size))
+                    for x, y in CHARACTER_TILESET[f'char_{direction}']
+                ]
+                for direction in FACINGS
+            }
+            idle_frames = {
+                direction: color_shift(spritesheet.get_image(1, index, tile_size, tile_size))
+                for index, direction in enumerate(FACINGS)
+            }
+            cached = (spritesheet, animations, idle_frames)
+            self.frame_cache[key] = cached
+        return cached[1], cached[2]
+
+    def store_previous_positions(self):
+        """
+        Records every position at the start of a simulation step, for render interpolation.
+        """
+        self.previous_x[:] = self.x
+        self.previous_y[:] = self.y
+
+    def update_flow_field(self, goal_x, goal_y, tile_map, slots=None):
+        """
+        Makes sure the flow field labels the tiles of the given enemies.
+
+        The search starts from the goal's tile (if free) and its free neighbours, the same
+        goals the per-enemy A* searches used, and stops once every given enemy's tile is
+        labelled. It starts over when the goal changes tile or the room's entities change;
+        otherwise a later call only extends it, from where it stopped, to enemies it has not
+        reached yet.
+
+        Args:
+            goal_x (float): x-coordinate of the goal (the player) in pixels.
+            goal_y (float): y-coordinate of the goal in pixels.
+            tile_map (TileMap): The tile map to search.
+            slots (Iterable[int], optional): The enemies that need a path. Defaults to all.
+        """
+        tile_size = self.tile_size
+        width, height = tile_map.width, tile_map.height
+        goal_tile = (int(goal_x // tile_size), int(goal_y // tile_size))
+        version = tile_map.entities.version if tile_map.entities is not None else 0
+        key = (id(tile_map), goal_tile, version)
+
+        pending = set()
+        for index in (range(len(self.views)) if slots is None else slots):
+            tile_x, tile_y = int(self.x[index] // tile_size), int(self.y[index] // tile_size)
+            if 0 <= tile_x < width and 0 <= tile_y < height:
+                pending.add(tile_y * width + tile_x)
+
+        if key != self.flow_key:
+            self.flow_key = key
+            field = array('i', [-1]) * (width * height)
+            queue = deque()
+            goals = [goal_tile] + [(goal_tile[0] + dx, goal_tile[1] + dy) for dx, dy in NEIGHBOR_OFFSETS]
+            for tile_x, tile_y in goals:
+                if 0 <= tile_x < width and 0 <= tile_y < height and not tile_map.is_blocked(tile_x, tile_y):
+                    cell = tile_y * width + tile_x
+                    if field[cell] == -1:
+                        field[cell] = 0 if (tile_x, tile_y) == goal_tile else 1
+                        queue.append(cell)
+            self.flow_field, self.flow_queue = field, queue
+        elif self.flow_complete:
+            return
+        field, queue = self.flow_field, self.flow_queue
+        pending = {cell for cell in pending if field[cell] == -1}
+
+        is_blocked = tile_map.is_blocked
+        while queue and pending:
+            cell = queue.popleft()
+            distance = field[cell] + 1
+            x, y = cell % width, cell // width
+            for dx, dy in NEIGHBOR_OFFSETS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    neighbor = ny * width + nx
+                    if field[neighbor] == -1 and not is_blocked(nx, ny):
+                        field[neighbor] = distance
+                        queue.append(neighbor)
+                        pending.discard(neighbor)
+        # An exhausted search labels every reachable tile, so it never needs extending
+        self.flow_complete = not queue
+
+    def next_tile(self, tile_x, tile_y, width, height):
+        """
+        Returns the neighbouring tile one step closer to the player, or None if the tile is unreachable.
+        """
+        field = self.flow_field
+        distance = field[tile_y * width + tile_x]
+        if distance <= 0:
+            return None
+        for dx, dy in NEIGHBOR_OFFSETS:
+            nx, ny = tile_x + dx, tile_y + dy
+            if 0 <= nx < width and 0 <= ny < height and field[ny * width + nx] == distance - 1:
+                return (nx, ny)
+        return None
+
+    def separation(self, dt, slots=None):
+        """
+        Computes the separation displacement of the enemies with a spatial hash.
+
+        Args:
+            dt (float): Delta time of the step in seconds.
+            slots (Sequence[int], optional): Only separate these slots from each other. Defaults to all.
+
+        Returns:
+            Tuple[array, array]: The x and y displacement per slot.
+        """
+        count = len(self.views)
+        push_x = array('d', bytes(8 * count))
+        push_y = array('d', bytes(8 * count))
+        if count < 2 or (slots is not None and len(slots) < 2):
+            return push_x, push_y
+
+        xs, ys = self.x, self.y
+        cells = {}
+        for index in (range(count) if slots is None else slots):
+            cells.setdefault((int(xs[index] // SEPARATION_RADIUS), int(ys[index] // SEPARATION_RADIUS)), []).append(index)
+
+        strength = SEPARATION_SPEED * dt / SEPARATION_RADIUS
+        for (cell_x, cell_y), members in cells.items():
+            for other_x in (cell_x - 1, cell_x, cell_x + 1):
+                for other_y in (cell_y - 1, cell_y, cell_y + 1):
+                    others = cells.get((other_x, other_y))
+                    if not others:
+                        continue
+                    for index in members:
+                        for other in others:
+                            if other <= index:
+                                continue
+                            dx = xs[index] - xs[other]
+                            dy = ys[index] - ys[other]
+                            distance = math.hypot(dx, dy)
+                            if distance >= SEPARATION_RADIUS:
+                                continue
+                            if distance == 0:
+                                # Exactly stacked enemies are split along x by slot order
+                                dx, dy, distance = 1.0, 0.0, 1.0
+                            push = strength * (SEPARATION_RADIUS - distance) / distance
+                            push_x[index] += dx * push
+                            push_y[index] += dy * push
+                            push_x[other] -= dx * push
+                            push_y[other] -= dy * push
+        return push_x, push_y
+
+    def move_slot(self, index, dx, dy, tile_map):
+        """
+        Moves one enemy, sliding along the blocked tiles it runs into.
+        """
+        self.x[index], self.y[index] = move_and_slide(self.x[index], self.y[index], self.tile_size, self.tile_size,
+                                                      dx, dy, tile_map)
+
+    def level_of_detail(self, view, player_x, player_y):
+        """
+        Splits the enemies into those updated fully and those updated coarsely.
+
+        Args:
+            view (pygame.Rect): The camera view in world pixels.
+            player_x (float): x-coordinate of the player in pixels.
+            player_y (float): y-coordinate of the player in pixels.
+
+        Returns:
+            Tuple[List[int], List[int]]: The slots in or near the view or near the player, at
+            most LOD_MAX_FULL_UPDATES of them, and the others.
+        """
+        size = self.tile_size
+        left, top = view.left - LOD_VIEW_MARGIN - size, view.top - LOD_VIEW_MARGIN - size
+        right, bottom = view.right + LOD_VIEW_MARGIN, view.bottom + LOD_VIEW_MARGIN
+        near_squared = LOD_NEAR_DISTANCE * LOD_NEAR_DISTANCE
+        full, coarse = [], []
+        xs, ys = self.x, self.y
+        for index in range(len(self.views)):
+            x, y = xs[index], ys[index]
+            if (left < x < right and top < y < bottom) or \
+                    (x - player_x) * (x - player_x) + (y - player_y) * (y - player_y) < near_squared:
+                full.append(index)
+            else:
+                coarse.append(index)
+        if len(full) > LOD_MAX_FULL_UPDATES:
+            # A crowd in view; keep the full update for the enemies closest to the player
+            full.sort(key=lambda index: (xs[index] - player_x) ** 2 + (ys[index] - player_y) ** 2)
+            coarse.extend(full[LOD_MAX_FULL_UPDATES:])
+            del full[LOD_MAX_FULL_UPDATES:]
+        return full, coarse
+
+    def coarse_turn(self, slots, dt):
+        """
+        Adds a step to the lagged time of the coarsely updated enemies and picks whose turn it is.
+
+        Returns:
+            List[int]: At most LOD_FAR_BUDGET of the slots, in turn.
+        """
+        lagged = self.lagged_time
+        for index in slots:
+            lagged[index] += dt
+        if len(slots) <= LOD_FAR_BUDGET:
+            return slots
+        start = self.coarse_cursor % len(slots)
+        self.coarse_cursor = start + LOD_FAR_BUDGET
+        return (slots[start:] + slots[:start])[:LOD_FAR_BUDGET]
+
+    def coarse_update(self, slots, tile_map, goal_x, goal_y):
+        """
+        Moves enemies along the flow field by the time they have lagged, without separation or animation.
+
+        A move may cross several tiles; every part of it is swept, so it never passes through a wall.
+        """
+        tile_size = self.tile_size
+        width, height = tile_map.width, tile_map.height
+        xs, ys, lagged = self.x, self.y, self.lagged_time
+        for index in slots:
+            elapsed = min(lagged[index], LOD_MAX_CATCH_UP)
+            lagged[index] = 0
+            start_x, start_y = xs[index], ys[index]
+            remaining = ENEMY_SPEED * elapsed
+            while remaining > 0:
+                tile_x, tile_y = int(xs[index] // tile_size), int(ys[index] // tile_size)
+                next_tile = self.next_tile(tile_x, tile_y, width, height) \
+                    if 0 <= tile_x < width and 0 <= tile_y < height else None
+                if next_tile is not None:
+                    target_x, target_y = next_tile[0] * tile_size, next_tile[1] * tile_size
+                else:
+                    target_x, target_y = goal_x, goal_y
+                dx, dy = target_x - xs[index], target_y - ys[index]
+                length = math.hypot(dx, dy)
+                if length == 0:
+                    break
+                if abs(dx) > abs(dy):
+                    self.facing[index] = 2 if dx > 0 else 1
+                else:
+                    self.facing[index] = 0 if dy > 0 else 3
+                self.target_x[index], self.target_y[index] = target_x, target_y
+                if next_tile is not None and length <= remaining:
+                    xs[index], ys[index] = target_x, target_y
+                    remaining -= length
+                else:
+                    self.move_slot(index, dx / length * remaining, dy / length * remaining, tile_map)
+                    break
+            if elapsed > 0:
+                self.velocity_x[index] = (xs[index] - start_x) / elapsed
+                self.velocity_y[index] = (ys[index] - start_y) / elapsed
+
+    def update(self, dt, player, tile_map, slots=None, view=None):
+        """
+        Advances the enemies by one step and reports contact with the player.
+
+        Args:
+            dt (float): Delta time of the step in seconds.
+            player (Character): The player character to chase.
+            tile_map (TileMap): The current tile map for collision detection and pathfinding.
+            slots (Iterable[int], optional): Only update these slots. Defaults to all.
+            view (pygame.Rect, optional): The camera view in world pixels. If given, only the
+                enemies in or near it are updated fully, and the rest coarsely in turns.
+
+        Returns:
+            int: The number of fully updated enemies touching the player's collision rect.
+        """
+        if not self.views:
+            return 0
+        tile_size = self.tile_size
+        width, height = tile_map.width, tile_map.height
+        player_x, player_y = player.position.x, player.position.y
+        self.target_position = (player_x, player_y)
+        coarse = ()
+        if view is not None:
+            slots, far = self.level_of_detail(view, player_x, player_y)
+            coarse = self.coarse_turn(far, dt)
+            self.update_flow_field(player_x, player_y, tile_map, slots + coarse)
+        else:
+            self.update_flow_field(player_x, player_y, tile_map, slots)
+        push_x, push_y = self.separation(dt, slots)
+
+        xs, ys = self.x, self.y
+        target_xs, target_ys = self.target_x, self.target_y
+        lagged = self.lagged_time
+        for index in (range(len(self.views)) if slots is None else slots):
+            # An enemy that comes into view catches up on the steps it skipped
+            elapsed = dt + min(lagged[index], LOD_MAX_CATCH_UP)
+            lagged[index] = 0
+            step = ENEMY_SPEED * elapsed
+            start_x, start_y = xs[index], ys[index]
+            tile_x, tile_y = int(start_x // tile_size), int(start_y // tile_size)
+            next_tile = self.next_tile(tile_x, tile_y, width, height) \
+                if 0 <= tile_x < width and 0 <= tile_y < height else None
+            if next_tile is not None:
+                # Walk to the next tile on the path; arriving snaps onto it
+                goal_x, goal_y = next_tile[0] * tile_size, next_tile[1] * tile_size
+            else:
+                # No path (or already on the player's tile); move directly towards the player
+                goal_x, goal_y = player_x, player_y
+            target_xs[index], target_ys[index] = goal_x, goal_y
+
+            dx, dy = goal_x - start_x, goal_y - start_y
+            length = math.hypot(dx, dy)
+            if length == 0:
+                if next_tile is None:
+                    # Reached the player; use the idle frame
+                    self.idle[index] = 1
+                    self.frame_index[index] = 0
+                    self.animation_timer[index] = 0
+            elif next_tile is not None and length <= step:
+                xs[index], ys[index] = goal_x, goal_y
+            else:
+                self.move_slot(index, dx / length * step, dy / length * step, tile_map)
+            if push_x[index] or push_y[index]:
+                # Separation applies even to enemies that arrived, so crowds never stack up
+                self.move_slot(index, push_x[index], push_y[index], tile_map)
+
+            if length > 0:
+                # Face the goal and advance the walking animation
+                if abs(dx) > abs(dy):
+                    self.facing[index] = 2 if dx > 0 else 1
+                else:
+                    self.facing[index] = 0 if dy > 0 else 3
+                self.idle[index] = 0
+                self.animation_timer[index] += elapsed
+                if self.animation_timer[index] >= ANIMATION_SPEED:
+                    self.animation_timer[index] = 0
+                    frame_count = len(self.views[index].animations[FACINGS[self.facing[index]]])
+                    self.frame_index[index] = (self.frame_index[index] + 1) % frame_count
+
+            if elapsed > 0:
+                self.velocity_x[index] = (xs[index] - start_x) / elapsed
+                self.velocity_y[index] = (ys[index] - start_y) / elapsed
+
+        self.coarse_update(coarse, tile_map, player_x, player_y)
+        return self.touching(player.collision_rect, slots)
+
+    def simulate(self, dt, tile_map):
+        """
+        Coarsely advances the enemies of a room the player is not in.
+
+        The enemies keep heading for where the player was at the last update, taking turns like
+        the enemies outside the view do, so the cost does not grow with the room's population.
+
+        Args:
+            dt (float): Seconds since the room was last simulated.
+            tile_map (TileMap): The room's tile map.
+        """
+        if not self.views or self.target_position is None:
+            return
+        coarse = self.coarse_turn(list(range(len(self.views))), dt)
+        goal_x, goal_y = self.target_position
+        self.update_flow_field(goal_x, goal_y, tile_map, coarse)
+        self.coarse_update(coarse, tile_map, goal_x, goal_y)
+
+    def touching(self, rect, slots=None):
+        """
+        Counts the enemies whose collision rect overlaps a rectangle.
+
+        Args:
+            rect (pygame.Rect): The rectangle, e.g. the player's collision rect.
+            slots (Iterable[int], optional): Only check these slots. Defaults to all.
+
+        Returns:
+            int: The number of enemies overlapping the rectangle.
+        """
+        size = self.tile_size
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        xs, ys = self.x, self.y
+        count = 0
+        for index in (range(len(self.views)) if slots is None else slots):
+            x, y = int(xs[index]), int(ys[index])
+            if x < right and x + size > left and y < bottom and y + size > top:
+                count += 1
+        return count
+
+    def image(self, index):
+        """
+        Returns the current frame of an enemy.
+        """
+        view = self.views[index]
+        direction = FACINGS[self.facing[index]]
+        if self.idle[index]:
+            return view.idle_frames[direction]
+        return view.animations[direction][self.frame_index[index]]
+
+    def draw(self, surface, camera, alpha=1.0):
+        """
+        Draws every enemy at its interpolated position in one batch.
+
+        Args:
+            surface (pygame.Surface): The surface to draw on.
+            camera (Camera): The camera object for adjusting the drawing position.
+            alpha (float): Interpolation between the previous and the current simulation step.
+        """
+        xs, ys, previous_xs, previous_ys = self.x, self.y, self.previous_x, self.previous_y
+        surface.blits([
+            (self.image(index),
+             (previous_xs[index] + (xs[index] - previous_xs[index]) * alpha - camera.x,
+              previous_ys[index] + (ys[index] - previous_ys[index]) * alpha - camera.y))
+            for index in range(len(self.views))
+        ], False)
@@ -0,0 +1,192 @@
+OBJECT = 'object'
+ENEMY = 'enemy'
+
+
+class EntityRegistry:
+    """
+    Stores the objects and enemies of a room with id-indexed access.
+
+    Entities are kept in dictionaries keyed by an integer id, so adding and removing an
+    entity is O(1) while iteration still follows insertion (generation) order. Entities
+    anchored to a tile (objects such as rocks and flowers) are also recorded in a
+    tile-occupancy grid, which answers "what is on tile (x, y)?" in O(1) instead of
+    scanning every object in the room.
+
+    Attributes:
+        width (int): The width of the occupancy grid in tiles.
+        height (int): The height of the occupancy grid in tiles.
+        entities (Dict[int, object]): All registered entities keyed by id.
+        occupancy (List[List[Optional[int]]]): Entity id anchored at each tile, or None.
+        version (int): Incremented whenever an entity is added or removed.
+        removal_listeners (List[Callable[[object, str], None]]): Called with (entity, kind) after
+            an entity is removed.
+    """
+
+    def __init__(self, width, height):
+        """
+        Initializes an empty EntityRegistry.
+
+        Args:
+            width (int): The width of the room in tiles.
+            height (int): The height of the room in tiles.
+        """
+        self.width = width
+        self.height = height
+        self.next_id = 0
+        self.version = 0  # Incremented on every add or remove, e.g. to invalidate cached drawing
+        self.entities = {}
+        self.by_kind = {OBJECT: {}, ENEMY: {}}
+        self.kinds = {}
+        self.tile_positions = {}  # Entity id -> (x, y) tile it occupies
+        self.occupancy = [[None for _ in range(width)] for _ in range(height)]
+        self.removal_listeners = []
+
+    def add(self, entity, kind, tile_pos=None):
+        """
+        Registers an entity and assigns it an id.
+
+        Args:
+            entity (object): The entity to register. Its `entity_id` attribute is set.
+            kind (str): The entity kind, either OBJECT or ENEMY.
+            tile_pos (Tuple[int, int], optional): The tile the entity occupies. Defaults to None.
+
+        Returns:
+            int: The id assigned to the entity.
+        """
+        entity_id = self.next_id
+        self.next_id += 1
+        self.version += 1
+        entity.entity_id = entity_id
+        self.entities[entity_id] = entity
+        self.by_kind[kind][entity_id] = entity
+        self.kinds[entity_id] = kind
+
+        if tile_pos is not None:
+            x, y = tile_pos
+            if self.occupancy[y][x] is not None:
+                raise ValueError(f"Tile {tile_pos} is already occupied by entity {self.occupancy[y][x]}.")
+            self.occupancy[y][x] = entity_id
+            self.tile_positions[entity_id] = tile_pos
+        return entity_id
+
+    def remove(self, entity_id):
+        """
+        Removes an entity and clears the tile it occupies.
+
+        Args:
+            entity_id (int): The id of the entity to remove.
+
+        Returns:
+            object or None: The removed entity, or None if the id is unknown.
+        """
+        entity = self.entities.pop(entity_id, None)
+        if entity is None:
+            return None
+        self.version += 1
+        kind = self.kinds.pop(entity_id)
+        del self.by_kind[kind][entity_id]
+        tile_pos = self.tile_positions.pop(entity_id, None)
+        if tile_pos is not None:
+            x, y = tile_pos
+            self.occupancy[y][x] = None
+        for listener in self.removal_listeners:
+            listener(entity, kind)
+        return entity
+
+    def get(self, entity_id):
+        """
+        Retrieves an entity by id.
+
+        Args:
+            entity_id (int): The id of the entity.
+
+        Returns:
+            object or None: The entity, or None if the id is unknown.
+        """
+        return self.entities.get(entity_id)
+
+    def objects(self):
+        """
+        Returns a view of the registered objects in generation order.
+        """
+        return self.by_kind[OBJECT].values()
+
+    def enemies(self):
+        """
+        Returns a view of the registered enemies in spawn order.
+        """
+        return self.by_kind[ENEMY].values()
+
+    def get_at(self, x, y):
+        """
+        Retrieves the entity occupying a tile.
+
+        Args:
+            x (int): The x-coordinate of the tile.
+            y (int): The y-coordinate of the tile.
+
+        Returns:
+            object or None: The entity on the tile, or None if the tile is free or out of bounds.
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            entity_id = self.occupancy[y][x]
+            if entity_id is not None:
+                return self.entities[entity_id]
+        return None
+
+    def is_occupied(self, x, y):
+        """
+        Checks whether a tile is occupied by an entity.
+
+        Args:
+            x (int): The x-coordinate of the tile.
+            y (int): The y-coordinate of the tile.
+
+        Returns:
+            bool: True if an entity occupies the tile; False otherwise.
+        """
+        return self.get_at(x, y) is not None
+
+    def is_collidable_at(self, x, y):
+        """
+        Checks whether a tile is occupied by a collidable entity.
+
+        Args:
+            x (int): The x-coordinate of the tile.
+            y (int): The y-coordinate of the tile.
+
+        Returns:
+            bool: True if a collidable entity occupies the tile; False otherwise.
+        """
+        entity = self.get_at(x, y)
+        return entity is not None and entity.collidable
+
+    def query_rect(self, rect, tile_size):
+        """
+        Finds the tile-anchored entities overlapping a rectangle.
+
+        Only the tiles covered by the rectangle are inspected. Results are ordered by id so
+        that the first match is the earliest generated entity, as with a list scan.
+
+        Args:
+            rect (pygame.Rect): The rectangle in world pixels.
+            tile_size (int): The size of a tile in pixels.
+
+        Returns:
+            List[object]: The entities whose tile overlaps the rectangle.
+        """
+        if rect.width <= 0 or rect.height <= 0:
+            return []
+        x0 = max(0, rect.left // tile_size)
+        y0 = max(0, rect.top // tile_size)
+        x1 = min(self.width - 1, (rect.right - 1) // tile_size)
+        y1 = min(self.height - 1, (rect.bottom - 1) // tile_size)
+
+        found = []
+        for y in range(y0, y1 + 1):
+            row = self.occupancy[y]
+            for x in range(x0, x1 + 1):
+                if row[x] is not None:
+                    found.append(row[x])
+        found.sort()
+        return [self.entities[entity_id] for entity_id in found]
@@ -1,6 +1,25 @@
 import random
+import time
+from collections import OrderedDict
 from src.noise import Noise
-from src.room import Room
+from src.room import (Room, generate_room_grids, create_room_collapse, ROOM_DIMENSIONS, ENTROPY_HEURISTIC, COMPILED_CONSTRAINTS,
+                      TILE_GENERATOR, TILE_GENERATOR_AUTOTILE, WFC_MAX_BACKTRACKS, WFC_MAX_RESTARTS)
+from src.assets import get_assets
+from src.batch_wfc import BATCH_SIZE
+from src.world_chunks import ChunkedNoise
+from src.world_archive import WorldArchive, FLAG_COMPILED_CONSTRAINTS, FLAG_AUTOTILE
+from src.world_graph import WorldGraph
+from src.scheduler import PRIORITY_NORMAL, PRIORITY_LOW
+
+GOAL_CHUNK_DISTANCE = 2  # Chebyshev distance in chunks from the spawn chunk to the goal chunk
+MIN_GOAL_DISTANCE = 0  # Fewest room transitions from the spawn room to the goal room; 0 allows any room
+MAX_RESIDENT_ROOMS = None  # Generated rooms kept in memory; the least recently entered are released. None keeps all
+ROOM_GENERATION_SLICE = 32  # Collapse steps of a queued room per scheduler step
+ROOM_START_ESTIMATE = 0.005  # Seconds expected to set up a room's collapse, its first scheduler step
+ROOM_BUILD_ESTIMATE = 0.01  # Seconds expected to build a room before one has been timed
+ROOM_GENERATION_DEADLINE = 1.0  # Seconds within which a queued room is generated even if frames run long
+BACKGROUND_ROOMS = 2  # Most recently entered rooms, besides the current one, whose enemies keep moving
+BACKGROUND_SIMULATION_INTERVAL = 0.25  # Seconds of game time between coarse updates of the background rooms
 
 class Map:
     """
@@ -9,22 +28,65 @@ class Map:
     The Map class handles the creation and management of rooms, tracks the player's
     current location, and facilitates movement between rooms while ensuring consistent
     room generation using a base seed for randomness.
+
+    In chunked mode the world map is generated lazily by ChunkedNoise, so startup cost does
+    not depend on the world size and the world may be unbounded.
     """
 
-    def __init__(self, map_width, map_height, base_seed=0):
+    def __init__(self, map_width, map_height, base_seed=0, chunked=False, noise=None,
+                 min_goal_distance=MIN_GOAL_DISTANCE, max_resident_rooms=MAX_RESIDENT_ROOMS, tile_generator=TILE_GENERATOR):
         """
         Initializes the Map object.
 
         Args:
-            map_width (int): The width of the map in rooms.
-            map_height (int): The height of the map in rooms.
+            map_width (int): The width of the map in rooms. None with chunked=True for an unbounded world.
+            map_height (int): The height of the map in rooms. None with chunked=True for an unbounded world.
             base_seed (int): The base seed for random number generation.
+            chunked (bool): Whether to generate the world map in chunks on demand.
+            noise (Noise, optional): The world's noise map if it was generated earlier, e.g.
+                restored from a save. Defaults to generating it from the seed.
+            min_goal_distance (int): The fewest room transitions from the spawn room to the goal
+                room. If no room is that far, the farthest reachable room is the goal. Ignored
+                in chunked mode.
+            max_resident_rooms (int, optional): The most generated rooms kept in memory. Released
+                rooms are regenerated from their seed and diff when entered again, so only the
+                state of their enemies is lost. None keeps every room.
+            tile_generator (str): How the rooms' tile grids are generated: TILE_GENERATOR_WFC or
+                TILE_GENERATOR_AUTOTILE.
         """
         self.base_seed = base_seed
-        self.noise = Noise(map_width, map_height, self.base_seed)
-        self.rooms_coordinates = self.get_rooms_coordinates()
-        self.rooms_coordinates.sort()  # Ensure consistent order for determinism
-        self.rooms = {}
+        self.tile_generator = tile_generator
+        self.chunked = chunked
+        self.rooms = OrderedDict()  # Oldest first: rooms never entered, then by when they were last entered
+        self.pending_rooms = {}  # Neighboring rooms whose tile grids are being collapsed a slice per frame
+        self.visited_rooms = set()  # Rooms the player has entered, e.g. for the minimap
+        # Ids of the entities removed from each room (destroyed rocks, killed enemies). Rooms are
+        # regenerated from their seed, so this is all the state a room needs to be restored
+        self.room_diffs = {}
+        self.archive = None  # WorldArchive that rooms are served from, see `open_archive`
+        self.max_resident_rooms = max_resident_rooms
+        self.memory_tracker = None  # MemoryTracker notified when rooms are generated and released
+        # TaskScheduler that queued rooms are generated by in idle frame time; without one
+        # they are generated by `generate_pending`
+        self.scheduler = None
+        self.room_build_time = ROOM_BUILD_ESTIMATE  # Running average of the seconds to build a collapsed room
+        self.eviction_task = None
+        self.background_time = 0.0  # Game time not yet simulated in the background rooms
+        self.background_task = None
+
+        if chunked:
+            bounds = (map_width, map_height) if map_width and map_height else None
+            self.noise = ChunkedNoise(self.base_seed, bounds=bounds)
+            self.rooms_coordinates = None
+            self.random_gen = random.Random(self.base_seed)
+            self.select_chunked_rooms(bounds)
+            self.noise.update_resident(self.current_room_coords)
+            return
+
+        self.noise = noise if noise is not None else Noise(map_width, map_height, self.base_seed)
+        # Indexed rooms: O(1) membership, 4-neighbour adjacency and BFS distances
+        self.graph = WorldGraph(self.noise.get_noise_map())
+        self.rooms_coordinates = list(self.graph.rooms)  # Sorted for determinism
 
         # Use a local random generator for consistent room selection
         self.random_gen = random.Random(self.base_seed)
@@ -33,14 +95,102 @@ class Map:
         self.current_room_coords = self.random_gen.choice(self.rooms_coordinates)
         self.spawn_room_coords = self.current_room_coords
 
-        available_rooms = [
-            coord for coord in self.rooms_coordinates if coord != self.current_room_coords
-        ]
+        if min_goal_distance > 0:
+            # Only rooms at least min_goal_distance transitions away, or else the farthest one
+            available_rooms = self.graph.rooms_at_least(self.current_room_coords, min_goal_distance)
+            if not available_rooms:
+                farthest_room = self.graph.farthest_room(self.current_room_coords)
+                available_rooms = [farthest_room] if farthest_room != self.current_room_coords else []
+        else:
+            available_rooms = [
+                coord for coord in self.rooms_coordinates if coord != self.current_room_coords
+            ]
         if available_rooms:
             self.goal_room_coords = self.random_gen.choice(available_rooms)
         else:
             self.goal_room_coords = self.current_room_coords  # Fallback if only one room exists
 
+    def select_chunked_rooms(self, bounds):
+        """
+        Selects the spawn and goal rooms in chunked mode while only generating a few chunks.
+
+        The spawn room lies in the chunk at the centre of the world (or chunk (0, 0) when
+        unbounded), and the goal room in a chunk GOAL_CHUNK_DISTANCE chunks away.
+
+        Args:
+            bounds (Optional[Tuple[int, int]]): The world bounds, or None if unbounded.
+        """
+        if bounds:
+            spawn_chunk = self.noise.chunk_coords(bounds[0] // 2, bounds[1] // 2)
+        else:
+            spawn_chunk = (0, 0)
+        self.current_room_coords = self.find_room_near_chunk(spawn_chunk, 0)
+        self.spawn_room_coords = self.current_room_coords
+
+        self.goal_room_coords = self.find_room_near_chunk(spawn_chunk, GOAL_CHUNK_DISTANCE)
+        if self.goal_room_coords is None or self.goal_room_coords == self.spawn_room_coords:
+            self.goal_room_coords = self.current_room_coords  # Fallback if no other room was found
+
+    def find_room_near_chunk(self, center_chunk, distance):
+        """
+        Picks a random room from the chunks at a given Chebyshev distance from a chunk,
+        searching further out if those chunks have no rooms.
+
+        Args:
+            center_chunk (Tuple[int, int]): The chunk to search around.
+            distance (int): The preferred distance in chunks.
+
+        Returns:
+            Tuple[int, int] or None: The room coordinates, or None if the world has no rooms.
+        """
+        center_x, center_y = center_chunk
+        size = self.noise.chunk_size
+        max_distance = distance + 8
+        if self.noise.bounds:
+            max_distance = max(self.noise.bounds) // size + 1
+        for radius in range(distance, max_distance + 1):
+            ring = [
+                (center_x + dx, center_y + dy)
+                for dy in range(-radius, radius + 1)
+                for dx in range(-radius, radius + 1)
+                if max(abs(dx), abs(dy)) == radius
+                and self.noise.in_bounds((center_x + dx) * size, (center_y + dy) * size)
+            ]
+            self.random_gen.shuffle(ring)
+            for chunk_x, chunk_y in ring:
+                room = self.noise.find_floor_cell(chunk_x, chunk_y, self.random_gen)
+                if room is not None:
+                    return room
+        return None
+
+    def has_room(self, coords):
+        """
+        Checks whether a room exists at the given coordinates.
+
+        Args:
+            coords (Tuple[int, int]): The (x, y) room coordinates.
+
+        Returns:
+            bool: True if a room exists there; False otherwise.
+        """
+        if self.chunked:
+            return self.noise.is_room(*coords)
+        return self.graph.has_room(coords)
+
+    def distance_to_goal(self, coords=None):
+        """
+        Returns the number of room transitions from a room to the goal room.
+
+        Args:
+            coords (Tuple[int, int], optional): The room. Defaults to the current room.
+
+        Returns:
+            int or None: The distance, -1 if the goal cannot be reached, or None in chunked mode.
+        """
+        if self.chunked:
+            return None
+        return self.graph.distance(self.goal_room_coords, coords or self.current_room_coords)
+
     def get_rooms_coordinates(self):
         """
         Generates a list of room coordinates where rooms should be placed based on the noise map.
@@ -64,18 +214,301 @@ class Map:
             Room: The current room instance.
         """
         room_coord = self.current_room_coords
+        self.visited_rooms.add(room_coord)
         if room_coord not in self.rooms:
             # Generate the room if it doesn't already exist
-            is_goal_room = (room_coord == self.goal_room_coords)
-            is_spawn_room = (room_coord == self.spawn_room_coords)
-            self.rooms[room_coord] = Room(
-                room_coord,
-                base_seed=self.base_seed,
-                is_goal_room=is_goal_room,
-                is_spawn_room=is_spawn_room
-            )
+            self.rooms[room_coord] = self.create_room(room_coord)
+        else:
+            # Keep the rooms in the order they were last entered
+            self.rooms.move_to_end(room_coord)
+        if self.max_resident_rooms is not None:
+            if self.scheduler is None:
+                for coords in list(self.rooms)[:max(0, len(self.rooms) - self.max_resident_rooms)]:
+                    if coords != room_coord:
+                        self.release_room(coords)
+            elif self.eviction_task is None or self.eviction_task.done:
+                self.eviction_task = self.scheduler.add("room eviction", self.eviction_steps(),
+                                                        priority=PRIORITY_LOW, tag=self)
+        self.prefetch_neighbors(room_coord)
         return self.rooms[room_coord]
 
+    def eviction_steps(self):
+        """
+        Releases the least recently entered rooms over `max_resident_rooms`, one per scheduler step.
+        """
+        while len(self.rooms) > self.max_resident_rooms:
+            coords = next((coords for coords in self.rooms if coords != self.current_room_coords), None)
+            if coords is None:
+                return
+            self.release_room(coords)
+            yield None
+
+    def simulate_background_rooms(self, dt):
+        """
+        Keeps the enemies of the most recently entered rooms moving while the player is elsewhere.
+
+        Every BACKGROUND_SIMULATION_INTERVAL of game time, the enemies of up to BACKGROUND_ROOMS
+        rooms get a coarse update for the time that passed; with a scheduler it runs as a
+        low-priority task, one room per step.
+
+        Args:
+            dt (float): Seconds of game time since the last call.
+        """
+        self.background_time += dt
+        if self.background_time < BACKGROUND_SIMULATION_INTERVAL:
+            return
+        if self.background_task is not None and not self.background_task.done:
+            return
+        elapsed, self.background_time = self.background_time, 0.0
+        # Rooms are kept in the order they were last entered; a room never entered has no target
+        rooms = [room for coords, room in reversed(self.rooms.items())
+                 if coords != self.current_room_coords and room.enemy_manager.target_position is not None]
+        steps = self.background_simulation_steps(rooms[:BACKGROUND_ROOMS], elapsed)
+        if self.scheduler is None:
+            for _ in steps:
+                pass
+        else:
+            self.background_task = self.scheduler.add("background enemies", steps, priority=PRIORITY_LOW, tag=self)
+
+    def background_simulation_steps(self, rooms, elapsed):
+        """
+        Coarsely advances the enemies of the given rooms, one room per scheduler step.
+        """
+        for room in rooms:
+            room.enemy_manager.simulate(elapsed, room.tile_map)
+            yield None
+
+    def add_unentered_room(self, coords, room):
+        """
+        Keeps a room generated before the player entered it, e.g. prefetched, as the least
+        recently entered, so that eviction drops it before the rooms the player visited.
+        """
+        self.rooms[coords] = room
+        self.rooms.move_to_end(coords, last=False)
+
+    def release_room(self, coords):
+        """
+        Drops a generated room from memory. Its diff is kept, so it is regenerated as it was left.
+
+        Args:
+            coords (Tuple[int, int]): The (x, y) room coordinates.
+
+        Returns:
+            bool: True if the room was in memory.
+        """
+        room = self.rooms.pop(coords, None)
+        if room is None:
+            return False
+        if self.memory_tracker is not None:
+            self.memory_tracker.room_released(coords, room)
+        return True
+
+    def create_room(self, coords, collapsed_map=None):
+        """
+        Creates the room at the given coordinates.
+
+        Args:
+            coords (Tuple[int, int]): The (x, y) room coordinates.
+            collapsed_map (List[List[str]], optional): The room's tile grid if it was collapsed
+                ahead of time.
+
+        Returns:
+            Room: The new room.
+        """
+        if self.memory_tracker is not None:
+            self.memory_tracker.begin_room()
+        entities = None
+        if collapsed_map is None and self.archive is not None and coords in self.archive:
+            # Baked ahead of time; nothing is generated
+            collapsed_map = self.archive.get_tile_grid(coords)
+            entities = self.archive.get_entities(coords)
+        if collapsed_map is None and coords in self.pending_rooms:
+            # Finish a background generation that has not completed yet
+            collapse = self.pending_rooms.pop(coords)
+            collapse.run()
+            collapsed_map = collapse.get_collapsed_grids()[0]
+        room = Room(
+            coords,
+            base_seed=self.base_seed,
+            is_goal_room=(coords == self.goal_room_coords),
+            is_spawn_room=(coords == self.spawn_room_coords),
+            collapsed_map=collapsed_map,
+            entities=entities,
+            tile_generator=self.tile_generator
+        )
+        self.track_room_diff(coords, room)
+        if self.memory_tracker is not None:
+            self.memory_tracker.end_room(coords, room)
+        return room
+
+    def track_room_diff(self, coords, room):
+        """
+        Applies the entities removed from a room earlier and records the ones removed from now on.
+
+        Entities get their ids in generation order, which is the same every time the room is
+        generated from its seed, so an id identifies the same rock or enemy across sessions.
+
+        Args:
+            coords (Tuple[int, int]): The (x, y) room coordinates.
+            room (Room): The newly generated room.
+        """
+        for entity_id in sorted(self.room_diffs.get(coords, ())):
+            room.entities.remove(entity_id)
+
+        def record_removal(entity, kind):
+            self.room_diffs.setdefault(coords, set()).add(entity.entity_id)
+
+        room.entities.removal_listeners.append(record_removal)
+
+    def open_archive(self, path):
+        """
+        Serves rooms from a world archive baked by `src.world_baker` instead of generating them.
+
+        Args:
+            path (str): The archive file.
+
+        Raises:
+            ValueError: If the archive was baked from another world, with other generation settings
+                or from other assets.
+        """
+        if self.chunked:
+            raise ValueError("World archives are baked from bounded worlds; chunked maps cannot open them.")
+        archive = WorldArchive(path)
+        expected = (self.base_seed, (self.noise.width, self.noise.height), self.spawn_room_coords, self.goal_room_coords,
+                    ROOM_DIMENSIONS, ENTROPY_HEURISTIC, bool(COMPILED_CONSTRAINTS),
+                    self.tile_generator == TILE_GENERATOR_AUTOTILE, WFC_MAX_BACKTRACKS, WFC_MAX_RESTARTS)
+        baked = (archive.base_seed, archive.map_size, archive.spawn_room_coords, archive.goal_room_coords,
+                 archive.room_size, archive.entropy_heuristic, bool(archive.flags & FLAG_COMPILED_CONSTRAINTS),
+                 bool(archive.flags & FLAG_AUTOTILE), archive.max_backtracks, archive.max_restarts)
+        if archive.asset_hash != get_assets().content_hash:
+            archive.close()
+            raise ValueError(f"{path} was baked from other tileset or constraint assets.")
+        if baked != expected:
+            archive.close()
+            raise ValueError(f"{path} was baked from another world or with other generation settings.")
+        if self.archive is not None:
+            self.archive.close()
+        self.archive = archive
+
+    def prefetch_neighbors(self, coords):
+        """
+        Queues the rooms next to a room for background generation, as tasks of the scheduler
+        if there is one, else with `generate_pending`.
+
+        Args:
+            coords (Tuple[int, int]): The (x, y) room coordinates.
+        """
+        if self.tile_generator == TILE_GENERATOR_AUTOTILE:
+            # Autotiled rooms are generated in one pass when they are entered
+            return
+        x, y = coords
+        for neighbor in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if self.archive is not None and neighbor in self.archive:
+                continue
+            if self.has_room(neighbor) and neighbor not in self.rooms and neighbor not in self.pending_rooms:
+                self.pending_rooms[neighbor] = create_room_collapse([neighbor], self.base_seed)
+                if self.scheduler is not None:
+                    self.scheduler.add(f"room {neighbor}", self.room_generation_steps(neighbor),
+                                       priority=PRIORITY_NORMAL, deadline=ROOM_GENERATION_DEADLINE, tag=self,
+                                       estimate=ROOM_START_ESTIMATE)
+
+    def room_generation_steps(self, coords, slice_steps=ROOM_GENERATION_SLICE):
+        """
+        Generates a queued room as scheduler steps: slices of its collapse, then the room itself.
+
+        Entering the room before it is done finishes it in `create_room`, which ends the task.
+
+        Args:
+            coords (Tuple[int, int]): The (x, y) room coordinates.
+            slice_steps (int): Collapse steps per scheduler step.
+
+        Yields:
+            float or None: The estimated seconds of the next step, when it differs from the last ones.
+        """
+        collapse = self.pending_rooms.get(coords)
+        while collapse is not None and not collapse.run(max_steps=slice_steps):
+            yield None
+            collapse = self.pending_rooms.get(coords)
+        if collapse is None:
+            return
+        # Placing objects and enemies takes much longer than a slice of the collapse
+        yield self.room_build_time
+        if self.pending_rooms.get(coords) is collapse:
+            del self.pending_rooms[coords]
+            start_time = time.perf_counter()
+            self.add_unentered_room(coords, self.create_room(coords, collapse.get_collapsed_grids()[0]))
+            self.room_build_time = 0.7 * self.room_build_time + 0.3 * (time.perf_counter() - start_time)
+
+    def generate_pending(self, time_budget):
+        """
+        Works on the queued rooms for about `time_budget` seconds, oldest first.
+
+        A room is built as soon as its tile grid is collapsed, which may overrun the budget
+        by the time it takes to place its objects and enemies.
+
+        Args:
+            time_budget (float): The seconds to spend.
+
+        Returns:
+            int: The number of rooms finished.
+        """
+        deadline = time.perf_counter() + time_budget
+        finished = 0
+        while self.pending_rooms:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            coords, collapse = next(iter(self.pending_rooms.items()))
+            if not collapse.run(time_budget=remaining):
+                break
+            del self.pending_rooms[coords]
+            self.add_unentered_room(coords, self.create_room(coords, collapse.get_collapsed_grids()[0]))
+            finished += 1
+        return finished
+
+    def generation_progress(self, coords):
+        """
+        Reports how far the generation of a room is.
+
+        Args:
+            coords (Tuple[int, int]): The (x, y) room coordinates.
+
+        Returns:
+            Tuple[int, int]: (collapsed cells, total cells); (0, 0) if the room is neither
+            generated nor queued.
+        """
+        if coords in self.pending_rooms:
+            return self.pending_rooms[coords].progress()
+        if coords in self.rooms:
+            room = self.rooms[coords]
+            cells = room.tile_map.width * room.tile_map.height
+            return cells, cells
+        return 0, 0
+
+    def pregenerate_rooms(self, coords=None, batch_size=BATCH_SIZE):
+        """
+        Generates many rooms up front, collapsing their tile grids in batches.
+
+        The rooms are the same as when they are generated one at a time on demand.
+
+        Args:
+            coords (Iterable[Tuple[int, int]], optional): The rooms to generate. Defaults to
+                every room of the map; required in chunked mode.
+            batch_size (int): The number of rooms whose grids are collapsed together.
+
+        Returns:
+            int: The number of rooms generated.
+        """
+        if coords is None:
+            if self.chunked:
+                raise ValueError("Chunked maps need the coordinates of the rooms to pre-generate.")
+            coords = self.rooms_coordinates
+        pending = [coord for coord in coords if self.has_room(coord) and coord not in self.rooms]
+        grids = generate_room_grids(pending, self.base_seed, batch_size, self.tile_generator)
+        for coord in pending:
+            self.add_unentered_room(coord, self.create_room(coord, grids[coord]))
+        return len(pending)
+
     def move_to_room(self, dx, dy):
         """
         Attempts to move the player to a room in the specified direction.
@@ -89,8 +522,11 @@ class Map:
         """
         current_x, current_y = self.current_room_coords
         new_coords = (current_x + dx, current_y + dy)
-        if new_coords in self.rooms_coordinates:
+        if self.has_room(new_coords):
             self.current_room_coords = new_coords
+            if self.chunked:
+                # Only keep the chunks around the player resident
+                self.noise.update_resident(new_coords)
             return self.get_current_room()
         else:
             return None  # Movement not possible; no room in that direction
@@ -116,17 +552,10 @@ class Map:
             Room or None: The room instance if it exists; otherwise, None.
         """
         coords = (x, y)
-        if coords in self.rooms_coordinates:
+        if self.has_room(coords):
             if coords not in self.rooms:
                 # Generate the room if it doesn't already exist
-                is_goal_room = (coords == self.goal_room_coords)
-                is_spawn_room = (coords == self.spawn_room_coords)
-                self.rooms[coords] = Room(
-                    coords,
-                    base_seed=self.base_seed,
-                    is_goal_room=is_goal_room,
-                    is_spawn_room=is_spawn_room
-                )
+                self.add_unentered_room(coords, self.create_room(coords))
             return self.rooms[coords]
         else:
             return None  # No room exists at the specified coordinates
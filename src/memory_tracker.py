@@ -0,0 +1,253 @@
+import gc
+import os
+import sys
+import json
+import time
+import types
+import weakref
+import tracemalloc
+import pygame
+
+MEMORY_REPORT_PATH = os.path.join("profiles", "memory.json")
+MEMORY_ENV = "THORNWOOD_MEMORY"  # Memory report path, like --memory=<path>
+SAMPLE_INTERVAL = 1.0  # Seconds between session growth samples
+# Source file of an allocation -> the subsystem it is attributed to
+SUBSYSTEM_FILES = {
+    'tile.py': 'tiles',
+    'tilemap.py': 'tiles',
+    'spritesheet.py': 'surfaces',
+    'object.py': 'objects',
+    'entity_registry.py': 'objects',
+    'enemy.py': 'enemies',
+    'enemy_manager.py': 'enemies',
+    'wfc.py': 'wfc',
+    'cell.py': 'wfc',
+    'batch_wfc.py': 'wfc',
+    'parallel_wfc.py': 'wfc',
+}
+SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+
+def parse_memory_option(argv, environ):
+    """
+    Reads the memory report path from `--memory[=path]`, falling back to the environment.
+
+    Returns:
+        str or None: The report path, or None if memory instrumentation is off.
+    """
+    path = environ.get(MEMORY_ENV) or None
+    for argument in argv:
+        if argument == "--memory":
+            path = MEMORY_REPORT_PATH
+        elif argument.startswith("--memory="):
+            path = argument.split("=", 1)[1]
+    return path
+
+
+def surface_bytes(surface):
+    """
+    Returns the pixel memory of a Surface, which lives outside the Python heap.
+    """
+    return surface.get_pitch() * surface.get_height()
+
+
+def deep_sizeof(obj, seen, surfaces):
+    """
+    Sums the Python heap size of an object and everything it references, once per object.
+
+    Surfaces are collected into `surfaces` instead of being measured, as their pixels are not
+    on the Python heap. Classes, modules and functions are shared and are not counted.
+
+    Args:
+        obj (object): The root object.
+        seen (Set[int]): Ids of the objects counted so far, shared between calls.
+        surfaces (Dict[int, pygame.Surface]): Receives the reachable surfaces by id.
+
+    Returns:
+        int: The size in bytes.
+    """
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, SKIPPED_TYPES):
+            continue
+        seen.add(id(current))
+        if isinstance(current, pygame.Surface):
+            surfaces[id(current)] = current
+            continue
+        total += sys.getsizeof(current)
+        # Unlike reading __dict__, this does not materialise the attribute dicts it walks
+        stack.extend(gc.get_referents(current))
+    return total
+
+
+def measure_room(room):
+    """
+    Attributes the memory held by a room to its subsystems.
+
+    Returns:
+        Dict[str, int]: Bytes per subsystem: 'tiles' (Tile objects, rects and grids),
+        'objects' (objects and the entity registry), 'enemies' (enemy views and the enemy
+        manager's arrays) and 'surfaces' (pixels of every distinct Surface the room
+        references: the spritesheet, tile and object images and enemy frames).
+    """
+    seen = set()
+    surfaces = {}
+    # The room's shared references are counted once, by the first subsystem reaching them
+    seen.update((id(room), id(room.tile_map), id(room.tile_map.spritesheet), id(room.entities), id(room.enemy_manager)))
+    # The roots stay referenced until every walk is done, so that no id in `seen` is reused
+    roots = {
+        'tiles': [room.tile_map.tile_map, room.tile_map.collidable_tiles, room.tile_map.collidable_grid],
+        'enemies': [list(room.entities.enemies())] + gc.get_referents(room.enemy_manager),
+        'objects': gc.get_referents(room.entities),
+        'spritesheet': gc.get_referents(room.tile_map.spritesheet),
+    }
+    sizes = {subsystem: deep_sizeof(root, seen, surfaces) for subsystem, root in roots.items()}
+    del sizes['spritesheet']
+    sizes['surfaces'] = sum(surface_bytes(surface) for surface in surfaces.values())
+    return sizes
+
+
+class MemoryTracker:
+    """
+    Accounts memory to rooms and subsystems over a session and reports leaks.
+
+    Every room's Python heap growth while it is generated is measured with tracemalloc and
+    broken down with `measure_room`. The session's traced memory is sampled over time. When
+    a room is released, weak references to it and its large parts are kept; any that are
+    still alive after a garbage collection are reported as leaks, with the types referring
+    to them.
+
+    Attributes:
+        rooms (Dict[Tuple[int, int], Dict]): Per generated room: 'traced_bytes' and its
+            `measure_room` breakdown.
+        samples (List[Dict]): Session growth samples.
+        released (Dict[Tuple[int, int], List[Tuple[str, weakref.ref]]]): Weak references to
+            the parts of the released rooms.
+    """
+
+    def __init__(self, frames=1):
+        """
+        Initializes the MemoryTracker and starts tracemalloc.
+
+        Args:
+            frames (int): Stack frames stored per allocation; 1 is enough to attribute subsystems.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.start_time = time.perf_counter()
+        self.last_sample = None
+        self.room_start = 0
+        self.rooms = {}
+        self.samples = []
+        self.released = {}
+        self.resident = 0
+
+    def begin_room(self):
+        """
+        Marks the start of a room's generation.
+        """
+        self.room_start = tracemalloc.get_traced_memory()[0]
+
+    def end_room(self, coords, room):
+        """
+        Records a generated room.
+        """
+        record = {'traced_bytes': tracemalloc.get_traced_memory()[0] - self.room_start}
+        record.update(measure_room(room))
+        self.rooms[coords] = record
+        self.resident += 1
+
+    def room_released(self, coords, room):
+        """
+        Keeps weak references to a released room's parts, to check they are freed.
+        """
+        self.released[coords] = [
+            ('Room', weakref.ref(room)),
+            ('TileMap', weakref.ref(room.tile_map)),
+            ('Spritesheet', weakref.ref(room.tile_map.spritesheet)),
+            ('EntityRegistry', weakref.ref(room.entities)),
+            ('EnemyManager', weakref.ref(room.enemy_manager)),
+        ]
+        self.resident -= 1
+
+    def sample(self, force=False):
+        """
+        Records the session's traced memory at most every SAMPLE_INTERVAL seconds.
+        """
+        now = time.perf_counter()
+        if not force and self.last_sample is not None and now - self.last_sample < SAMPLE_INTERVAL:
+            return
+        self.last_sample = now
+        current, peak = tracemalloc.get_traced_memory()
+        self.samples.append({'seconds': round(now - self.start_time, 3), 'traced_bytes': current,
+                             'peak_bytes': peak, 'resident_rooms': self.resident})
+
+    def find_leaks(self):
+        """
+        Lists the parts of released rooms that are still alive after a garbage collection.
+
+        Returns:
+            List[Dict]: 'room', 'part' and the 'referrers' types per leaked object.
+        """
+        gc.collect()
+        leaks = []
+        for coords, references in self.released.items():
+            for part, reference in references:
+                obj = reference()
+                if obj is None:
+                    continue
+                referrers = sorted({type(referrer).__name__ for referrer in gc.get_referrers(obj)
+                                    if not isinstance(referrer, types.FrameType)})
+                leaks.append({'room': list(coords), 'part': part, 'referrers': referrers})
+        return leaks
+
+    def subsystem_totals(self):
+        """
+        Groups the traced Python heap by the subsystem of the allocating source file.
+
+        Returns:
+            Dict[str, int]: Bytes per subsystem; allocations from other files are 'other'.
+        """
+        totals = {}
+        for statistic in tracemalloc.take_snapshot().statistics('filename'):
+            filename = os.path.basename(statistic.traceback[0].filename)
+            subsystem = SUBSYSTEM_FILES.get(filename, 'other')
+            totals[subsystem] = totals.get(subsystem, 0) + statistic.size
+        return totals
+
+    def report(self):
+        """
+        Builds the session report.
+
+        Returns:
+            Dict: Per-room records and their mean, heap by subsystem, growth samples and leaks.
+        """
+        self.sample(force=True)
+        mean = {}
+        if self.rooms:
+            keys = sorted({key for record in self.rooms.values() for key in record})
+            mean = {key: sum(record.get(key, 0) for record in self.rooms.values()) // len(self.rooms) for key in keys}
+        return {
+            'rooms': [dict(record, room=list(coords)) for coords, record in self.rooms.items()],
+            'mean_room': mean,
+            'heap_by_subsystem': self.subsystem_totals(),
+            'growth': self.samples,
+            'leaks': self.find_leaks(),
+        }
+
+    def write_report(self, path=MEMORY_REPORT_PATH):
+        """
+        Writes the session report as JSON.
+
+        Returns:
+            Dict: The report.
+        """
+        report = self.report()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=1)
+        return report
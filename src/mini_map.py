@@ -1,5 +1,13 @@
 import pygame
 
+ROOM_COLOR = (255, 255, 255, 255)  # White color for rooms
+EXPLORED_COLOR = (170, 200, 255, 255)  # Light blue for rooms the player has visited
+FOG_COLOR = (60, 60, 60, 255)  # Dark grey for rooms hidden by fog of war
+GOAL_COLOR = (0, 255, 0, 255)  # Green color for the goal room
+CURRENT_COLOR = (255, 0, 0, 255)  # Red color for the current room
+EMPTY_COLOR = (0, 0, 0, 0)  # Transparent background
+
+
 class MiniMap:
     """
     Represents a minimap that displays the dungeon layout, current room, and goal room.
@@ -7,6 +15,11 @@ class MiniMap:
     The MiniMap class handles drawing a scaled-down version of the dungeon map onto the game surface,
     highlighting the player's current position and the goal room.
 
+    The static room layout is baked once into a base layer. The explored rooms are kept in a
+    bitmap, and the overlays (explored tint or fog of war, goal and current-room markers) are
+    composited on top by repainting only the cells that change, so a frame with an unchanged
+    current room costs a single blit.
+
     Attributes:
         noise_map (List[List[int]]): A 2D list representing the dungeon map layout.
         map_width (int): The width of the map in tiles.
@@ -14,9 +27,14 @@ class MiniMap:
         tile_size (int): The size of each tile in the minimap in pixels.
         minimap_size (Tuple[int, int]): The (width, height) size of the minimap surface in pixels.
         goal_room_coords (Tuple[int, int]): The (x, y) coordinates of the goal room.
+        origin (Tuple[int, int]): World coordinates of the room shown in the top-left corner.
+        explored (bytearray): One byte per minimap cell, 1 if the room has been visited.
+        fog_of_war (bool): Whether unexplored rooms are hidden.
+        show_explored (bool): Whether explored rooms are tinted.
     """
 
-    def __init__(self, noise_map, map_width, map_height, goal_room_coords=None, tile_size=4):
+    def __init__(self, noise_map, map_width, map_height, goal_room_coords=None, tile_size=4, origin=(0, 0),
+                 explored_rooms=(), fog_of_war=False, show_explored=False):
         """
         Initializes the MiniMap object.
 
@@ -26,6 +44,11 @@ class MiniMap:
             map_height (int): The height of the map in tiles.
             goal_room_coords (Tuple[int, int], optional): Coordinates of the goal room to highlight. Defaults to None.
             tile_size (int, optional): Size of each tile in the minimap in pixels. Defaults to 4.
+            origin (Tuple[int, int], optional): World coordinates of the room at noise_map[0][0],
+                used when the minimap shows a window of a larger world. Defaults to (0, 0).
+            explored_rooms (Iterable[Tuple[int, int]], optional): World coordinates of rooms already visited.
+            fog_of_war (bool, optional): Hide rooms that have not been visited. Defaults to False.
+            show_explored (bool, optional): Tint rooms that have been visited. Defaults to False.
         """
         self.noise_map = noise_map
         self.map_width = map_width
@@ -33,50 +56,152 @@ class MiniMap:
         self.tile_size = tile_size
         self.minimap_size = (map_width * tile_size, map_height * tile_size)
         self.goal_room_coords = goal_room_coords
+        self.origin = origin
+        self.fog_of_war = fog_of_war
+        self.show_explored = show_explored
 
-    def draw(self, surface, current_room_coords):
+        self.explored = bytearray(map_width * map_height)
+        for coords in explored_rooms:
+            if self.contains(coords):
+                self.explored[self.cell_index(coords)] = 1
+
+        self.base_layer = None  # Static room layout, baked on first draw
+        self.composite = None  # Base layer plus overlays, blitted every frame
+        self.marked_room = None  # Current room drawn in the composite
+        self.dirty_cells = set()  # Minimap cells whose overlay must be repainted
+
+    def contains(self, coords):
         """
-        Draws the minimap onto the given surface.
+        Checks whether world room coordinates fall inside the area shown by the minimap.
 
-        The minimap displays all rooms in the dungeon, highlights the goal room in green,
-        and the player's current room in red, centered on the game screen.
+        Args:
+            coords (Tuple[int, int]): The (x, y) world room coordinates.
+
+        Returns:
+            bool: True if the room is shown; False otherwise.
+        """
+        x = coords[0] - self.origin[0]
+        y = coords[1] - self.origin[1]
+        return 0 <= x < self.map_width and 0 <= y < self.map_height
+
+    def cell_index(self, coords):
+        """
+        Returns the index into the explored bitmap for world room coordinates.
+        """
+        return (coords[1] - self.origin[1]) * self.map_width + (coords[0] - self.origin[0])
+
+    def mark_explored(self, coords):
+        """
+        Records that the player visited a room. Only that cell is repainted on the next draw.
 
         Args:
-            surface (pygame.Surface): The main game surface to draw the minimap on.
-            current_room_coords (Tuple[int, int]): The (x, y) coordinates of the current room.
+            coords (Tuple[int, int]): The (x, y) world room coordinates.
         """
-        # Create a transparent surface for the minimap
-        minimap_surface = pygame.Surface(self.minimap_size, pygame.SRCALPHA)
-        minimap_surface.fill((0, 0, 0, 0))  # Transparent background
+        if self.contains(coords):
+            index = self.cell_index(coords)
+            if not self.explored[index]:
+                self.explored[index] = 1
+                self.dirty_cells.add(coords)
 
-        # Draw each room in the minimap
+    def bake_base_layer(self):
+        """
+        Draws the static room layout once. Horizontal runs of rooms are filled as one rect.
+        """
+        self.base_layer = pygame.Surface(self.minimap_size, pygame.SRCALPHA)
+        self.base_layer.fill(EMPTY_COLOR)
         for y in range(self.map_height):
-            for x in range(self.map_width):
-                if self.noise_map[y][x] == 1:
-                    color = (255, 255, 255)  # White color for rooms
-                    pygame.draw.rect(
-                        minimap_surface,
-                        color,
-                        (x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size),
+            row = self.noise_map[y]
+            x = 0
+            while x < self.map_width:
+                if row[x] == 1:
+                    run_start = x
+                    while x < self.map_width and row[x] == 1:
+                        x += 1
+                    self.base_layer.fill(
+                        ROOM_COLOR,
+                        (run_start * self.tile_size, y * self.tile_size,
+                         (x - run_start) * self.tile_size, self.tile_size),
                     )
+                else:
+                    x += 1
 
-        # Highlight the goal room in green
+    def build_composite(self):
+        """
+        Composites the overlays of every cell that differs from the base layer.
+        """
+        if self.base_layer is None:
+            self.bake_base_layer()
+        self.composite = self.base_layer.copy()
+        if self.fog_of_war or self.show_explored:
+            for y in range(self.map_height):
+                for x in range(self.map_width):
+                    if self.noise_map[y][x] == 1:
+                        self.paint_cell((self.origin[0] + x, self.origin[1] + y))
         if self.goal_room_coords:
-            goal_x, goal_y = self.goal_room_coords
-            pygame.draw.rect(
-                minimap_surface,
-                (0, 255, 0),  # Green color for the goal room
-                (goal_x * self.tile_size, goal_y * self.tile_size, self.tile_size, self.tile_size),
-            )
-
-        # Highlight the current room in red
-        room_x, room_y = current_room_coords
-        pygame.draw.rect(
-            minimap_surface,
-            (255, 0, 0),  # Red color for the current room
-            (room_x * self.tile_size, room_y * self.tile_size, self.tile_size, self.tile_size),
+            self.paint_cell(self.goal_room_coords)
+        self.marked_room = None
+        self.dirty_cells.clear()
+
+    def cell_color(self, coords):
+        """
+        Returns the color of a minimap cell with all overlays applied.
+        """
+        x = coords[0] - self.origin[0]
+        y = coords[1] - self.origin[1]
+        if coords == self.marked_room:
+            return CURRENT_COLOR
+        if coords == self.goal_room_coords:
+            return GOAL_COLOR
+        if self.noise_map[y][x] != 1:
+            return EMPTY_COLOR
+        explored = self.explored[y * self.map_width + x]
+        if self.fog_of_war and not explored:
+            return FOG_COLOR
+        if self.show_explored and explored:
+            return EXPLORED_COLOR
+        return ROOM_COLOR
+
+    def paint_cell(self, coords):
+        """
+        Repaints one cell of the composite.
+        """
+        if not self.contains(coords):
+            return
+        x = coords[0] - self.origin[0]
+        y = coords[1] - self.origin[1]
+        self.composite.fill(
+            self.cell_color(coords),
+            (x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size),
         )
 
+    def draw(self, surface, current_room_coords):
+        """
+        Draws the minimap onto the given surface.
+
+        The minimap displays all rooms in the dungeon, highlights the goal room in green,
+        and the player's current room in red, centered on the game screen. Only the overlay
+        cells that changed since the last draw are repainted.
+
+        Args:
+            surface (pygame.Surface): The main game surface to draw the minimap on.
+            current_room_coords (Tuple[int, int]): The (x, y) coordinates of the current room.
+        """
+        if self.composite is None:
+            self.build_composite()
+
+        if current_room_coords != self.marked_room:
+            previous_room = self.marked_room
+            self.marked_room = current_room_coords
+            if previous_room is not None:
+                self.dirty_cells.add(previous_room)
+            self.dirty_cells.add(current_room_coords)
+        if self.dirty_cells and hasattr(surface, 'invalidate'):
+            # Surfaces that cache scaled copies (PrescaledRenderer) must rescale the composite
+            surface.invalidate(self.composite)
+        for coords in self.dirty_cells:
+            self.paint_cell(coords)
+        self.dirty_cells.clear()
+
         # Get the size of the main surface
         surface_width, surface_height = surface.get_size()
         minimap_width, minimap_height = self.minimap_size
@@ -86,4 +211,4 @@ class MiniMap:
         blit_y = (surface_height - minimap_height) // 2
 
         # Blit the minimap surface onto the main surface
-        surface.blit(minimap_surface, (blit_x, blit_y))
+        surface.blit(self.composite, (blit_x, blit_y))
@@ -240,6 +240,29 @@ class Noise:
             connected_rooms.append(closest_room)
             rooms.remove(closest_room)
 
+    @classmethod
+    def from_noise_map(cls, noise_map, seed):
+        """
+        Creates a Noise from a noise map generated earlier, e.g. restored from a save,
+        without generating it again.
+
+        Parameters:
+        - noise_map (list): The 2D list of floor (1) and wall (0) cells.
+        - seed (int): The seed the map was generated with.
+
+        Returns:
+        - noise (Noise): The noise object.
+        """
+        noise = cls.__new__(cls)
+        noise.width = len(noise_map[0]) if noise_map else 0
+        noise.height = len(noise_map)
+        noise.density = 45
+        noise.neighbor_walls = NEIGHBOR_WALLS
+        noise.smooth_iterations = 6
+        noise.seed = seed
+        noise.noise_map = noise_map
+        return noise
+
     def get_noise_map(self):
         """
         Retrieves the generated noise map.
@@ -1,12 +1,9 @@
 import pygame
-import os
 from src.spritesheet import Spritesheet
 from src.tile import TILE_SIZE
-from src.util import TileJsonLoader
+from src.assets import get_assets
 
-DATA_PATH = os.path.join("assets", "data")
-json_loader = TileJsonLoader(DATA_PATH)
-TILESET = json_loader.load_json("tileset.json")
+TILESET = get_assets().tileset
 
 class Object:
     def __init__(self, pos_x, pos_y, object_type, tile_size=TILE_SIZE, spritesheet=None):
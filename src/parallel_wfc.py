@@ -0,0 +1,304 @@
+from concurrent.futures import ProcessPoolExecutor
+from src.cell import ENTROPY_LOG_WEIGHT
+from src.wfc import WaveFunctionCollapse, CollapseError, derive_seed
+
+TILE_SPAN = 25  # Width and height of a WFC tile in cells
+SEAM_HALF_WIDTH = 2  # Cells re-collapsed on each side of a tile border
+MAX_SEAM_HALF_WIDTH = 5  # Widest seam strip tried before re-generating the whole room
+MAX_TILE_RESTARTS = 3  # Derived sub-seeds tried per region after its own seed fails, by default
+
+_executor = None
+_executor_workers = 0
+
+
+def get_executor(workers):
+    """
+    Returns a shared process pool with the given number of workers, creating it on first use.
+    """
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+
+def collapse_region(job):
+    """
+    Collapses one rectangular region, restarting from derived sub-seeds as `WaveFunctionCollapse` does.
+
+    Runs in a worker process, so it only takes and returns plain data.
+
+    Args:
+        job (Tuple): (width, height, seed_cells, tileset, tile_constraints, random_seed,
+            entropy_heuristic, max_backtracks, max_restarts), where seed_cells maps local
+            (x, y) to a fixed tile name.
+
+    Returns:
+        List[List[str]] or None: The collapsed region, or None if every attempt failed or
+        the fixed cells contradict each other.
+    """
+    (width, height, seed_cells, tileset, tile_constraints, random_seed, entropy_heuristic,
+     max_backtracks, max_restarts) = job
+    try:
+        wfc = WaveFunctionCollapse((width, height), tileset, tile_constraints, seed=seed_cells,
+                                   random_seed=random_seed, entropy_heuristic=entropy_heuristic,
+                                   max_backtracks=max_backtracks, max_restarts=max_restarts)
+        wfc.collapse()
+    except CollapseError:
+        # Also covers SeedConflictError; any other error is a bug and is raised
+        return None
+    return wfc.get_collapsed_grid()
+
+
+class TiledWaveFunctionCollapse:
+    """
+    Collapses a large grid by domain decomposition.
+
+    The grid is split into tiles that are collapsed independently (concurrently in a process
+    pool when workers > 1). Seams are then resolved by re-collapsing regions around the tile
+    borders, with the surrounding cells fixed through `apply_seed`:
+
+    1. Vertical seams: a strip around each vertical border, one segment per tile row, with
+       the columns on both sides fixed. Segment ends lie inside the horizontal seams.
+    2. Horizontal seams: a strip around each horizontal border, split at every vertical
+       border. The segments between crossings are collapsed with the rows above and below
+       fixed, then each crossing is collapsed with all four sides fixed.
+
+    Every region is short, so contradictions are rare. A region that contradicts is retried
+    with a wider region and a new sub-seed, and as a last resort the whole grid is collapsed
+    sequentially. Every region uses a sub-seed derived from `random_seed` and its index, so
+    the result is the same for any number of workers.
+
+    Attributes:
+        width (int): The width of the grid in cells.
+        height (int): The height of the grid in cells.
+        grid (List[List[str]]): The collapsed tile names after `collapse`.
+        fallback_used (bool): Whether the whole grid had to be collapsed sequentially.
+    """
+
+    def __init__(self, grid_size, tileset, tile_constraints, random_seed=None, tile_span=TILE_SPAN, workers=1,
+                 entropy_heuristic=ENTROPY_LOG_WEIGHT, max_backtracks=None, max_restarts=MAX_TILE_RESTARTS):
+        """
+        Initializes the TiledWaveFunctionCollapse object.
+
+        Args:
+            grid_size (Tuple[int, int]): The (width, height) of the grid.
+            tileset (Dict[str, Dict]): The tileset.
+            tile_constraints (Dict[str, Dict]): The adjacency constraints.
+            random_seed (int, optional): The seed all sub-seeds are derived from.
+            tile_span (int): The width and height of a tile in cells.
+            workers (int): Worker processes to use; 1 or less collapses in-process.
+            entropy_heuristic (int): The entropy heuristic version, as passed to `WaveFunctionCollapse`.
+            max_backtracks (int, optional): Backtracks per attempt of every region and of the
+                sequential fallback, as passed to `WaveFunctionCollapse`.
+            max_restarts (int): Restarts of every region and of the sequential fallback.
+        """
+        self.width, self.height = grid_size
+        self.tileset = tileset
+        self.tile_constraints = tile_constraints
+        self.random_seed = random_seed or 0
+        self.tile_span = tile_span
+        self.workers = workers
+        self.entropy_heuristic = entropy_heuristic
+        self.max_backtracks = max_backtracks
+        self.max_restarts = max_restarts
+        self.max_half_width = max(SEAM_HALF_WIDTH, min(MAX_SEAM_HALF_WIDTH, (tile_span - 2) // 2 - 1))
+        self.grid = None
+        self.fallback_used = False
+
+    def run_jobs(self, jobs):
+        """
+        Runs collapse jobs in the process pool or in-process, keeping the job order.
+        """
+        if self.workers > 1 and len(jobs) > 1:
+            return list(get_executor(self.workers).map(collapse_region, jobs))
+        return [collapse_region(job) for job in jobs]
+
+    def collapse(self):
+        """
+        Collapses the grid: tiles first, then vertical seams, then horizontal seams.
+        """
+        self.column_edges = list(range(0, self.width, self.tile_span))
+        self.row_edges = list(range(0, self.height, self.tile_span))
+
+        tiles = []
+        jobs = []
+        for row_index, top in enumerate(self.row_edges):
+            for column_index, left in enumerate(self.column_edges):
+                right = min(left + self.tile_span, self.width)
+                bottom = min(top + self.tile_span, self.height)
+                tiles.append((left, top))
+                jobs.append(self.region_job((left, top, right, bottom), (), (0, row_index, column_index)))
+
+        self.grid = [[None] * self.width for _ in range(self.height)]
+        for (left, top), result in zip(tiles, self.run_jobs(jobs)):
+            if result is None:
+                self.collapse_sequentially()
+                return
+            self.write_region(result, left, top)
+
+        if not self.resolve_vertical_seams() or not self.resolve_horizontal_seams():
+            self.collapse_sequentially()
+
+    def resolve_vertical_seams(self):
+        """
+        Re-collapses one strip segment per vertical border and tile row.
+
+        Returns:
+            bool: True if every segment was resolved; False otherwise.
+        """
+        def segment(index, half_width):
+            column, top, bottom = segments[index]
+            region = (max(0, column - half_width - 1), top, min(self.width, column + half_width + 1), bottom)
+            return region, self.fixed_sides(region, ('left', 'right'))
+
+        segments = [
+            (column, top, min(top + self.tile_span, self.height))
+            for column in self.column_edges[1:]
+            for top in self.row_edges
+        ]
+        return self.resolve_regions(segment, len(segments), 1) is not None
+
+    def resolve_horizontal_seams(self):
+        """
+        Re-collapses the horizontal borders: the segments between crossings first, then the crossings.
+
+        Returns:
+            bool: True if every region was resolved; False otherwise.
+        """
+        junction = SEAM_HALF_WIDTH + 1
+        bounds = [0 - junction] + self.column_edges[1:] + [self.width + junction]
+
+        def segment(index, half_width):
+            row, left, right = segments[index]
+            region = (left, max(0, row - half_width - 1), right, min(self.height, row + half_width + 1))
+            return region, self.fixed_sides(region, ('top', 'bottom'))
+
+        segments = [
+            (row, max(0, bounds[k] + junction), min(self.width, bounds[k + 1] - junction))
+            for row in self.row_edges[1:]
+            for k in range(len(bounds) - 1)
+        ]
+        segment_widths = self.resolve_regions(segment, len(segments), 2)
+        if segment_widths is None:
+            return False
+
+        # A crossing must cover every row changed by the segments on either side of it
+        per_row = len(bounds) - 1
+        crossings = []
+        for row_index, row in enumerate(self.row_edges[1:]):
+            for k, column in enumerate(self.column_edges[1:]):
+                vertical_half_width = max(segment_widths[row_index * per_row + k],
+                                          segment_widths[row_index * per_row + k + 1])
+                crossings.append((row, column, vertical_half_width))
+
+        def crossing(index, widening):
+            row, column, vertical_half_width = crossings[index]
+            half_width = vertical_half_width + widening - SEAM_HALF_WIDTH
+            horizontal_half_width = junction + widening - SEAM_HALF_WIDTH
+            region = (max(0, column - horizontal_half_width - 1), max(0, row - half_width - 1),
+                      min(self.width, column + horizontal_half_width + 1), min(self.height, row + half_width + 1))
+            return region, self.fixed_sides(region, ('left', 'right', 'top', 'bottom'))
+
+        return self.resolve_regions(crossing, len(crossings), 3) is not None
+
+    def resolve_regions(self, make_region, count, stage):
+        """
+        Collapses non-overlapping regions concurrently, widening any that fail.
+
+        Args:
+            make_region (Callable[[int, int], Tuple]): Builds (region, fixed_sides) for a region
+                index and a half width.
+            count (int): The number of regions.
+            stage (int): The stage number used when deriving sub-seeds.
+
+        Returns:
+            List[int] or None: The half width each region was resolved with, or None if one failed.
+        """
+        jobs = []
+        for index in range(count):
+            region, fixed = make_region(index, SEAM_HALF_WIDTH)
+            jobs.append(self.region_job(region, fixed, (stage, index)))
+        results = self.run_jobs(jobs)
+
+        half_widths = []
+        for index, result in enumerate(results):
+            half_width = SEAM_HALF_WIDTH
+            region, _ = make_region(index, half_width)
+            while result is None and half_width < self.max_half_width:
+                # Local re-generation: widen the region and try a fresh sub-seed
+                half_width += 1
+                region, fixed = make_region(index, half_width)
+                result = collapse_region(self.region_job(region, fixed, (stage, index, half_width)))
+            if result is None:
+                return None
+            self.write_region(result, region[0], region[1])
+            half_widths.append(half_width)
+        return half_widths
+
+    def fixed_sides(self, region, sides):
+        """
+        Keeps only the sides of a region that lie inside the grid; the others are grid borders.
+        """
+        left, top, right, bottom = region
+        inside = {
+            'left': left > 0,
+            'right': right < self.width,
+            'top': top > 0,
+            'bottom': bottom < self.height,
+        }
+        return tuple(side for side in sides if inside[side])
+
+    def region_job(self, region, fixed_sides, seed_parts):
+        """
+        Builds the collapse job for a region, fixing the cells on the given sides of its
+        perimeter to their current values.
+
+        Args:
+            region (Tuple[int, int, int, int]): (left, top, right, bottom) in grid cells, exclusive.
+            fixed_sides (Iterable[str]): Perimeter sides to fix: 'left', 'right', 'top', 'bottom'.
+            seed_parts (Tuple[int, ...]): Identifies the region when deriving its sub-seed.
+
+        Returns:
+            Tuple: The job for `collapse_region`.
+        """
+        left, top, right, bottom = region
+        seed_cells = {}
+        for side in fixed_sides:
+            if side in ('left', 'right'):
+                x = left if side == 'left' else right - 1
+                for y in range(top, bottom):
+                    seed_cells[(x - left, y - top)] = self.grid[y][x]
+            else:
+                y = top if side == 'top' else bottom - 1
+                for x in range(left, right):
+                    seed_cells[(x - left, y - top)] = self.grid[y][x]
+        random_seed = derive_seed(self.random_seed, *seed_parts)
+        return (right - left, bottom - top, seed_cells, self.tileset, self.tile_constraints, random_seed,
+                self.entropy_heuristic, self.max_backtracks, self.max_restarts)
+
+    def write_region(self, result, left, top):
+        """
+        Copies a collapsed region back into the grid.
+        """
+        for y, row in enumerate(result):
+            self.grid[top + y][left:left + len(row)] = row
+
+    def collapse_sequentially(self):
+        """
+        Falls back to collapsing the whole grid in one deterministic sequential pass.
+        """
+        self.fallback_used = True
+        wfc = WaveFunctionCollapse((self.width, self.height), self.tileset, self.tile_constraints,
+                                   random_seed=self.random_seed, entropy_heuristic=self.entropy_heuristic,
+                                   max_backtracks=self.max_backtracks, max_restarts=self.max_restarts)
+        wfc.collapse()
+        self.grid = wfc.get_collapsed_grid()
+
+    def get_collapsed_grid(self):
+        """
+        Returns the collapsed grid as rows of tile names.
+        """
+        return [row[:] for row in self.grid]
@@ -0,0 +1,168 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+from collections import deque
+from src.telemetry import StageTimer
+
+PROFILE_DIR = "profiles"
+SPIKE_HISTORY = 120  # Recent frames kept in the ring buffer and written with each spike
+PROFILE_ENV = "THORNWOOD_PROFILE"  # Session profile path, like --profile=<path>
+SPIKE_ENV = "THORNWOOD_SPIKE_MS"  # Spike threshold in milliseconds, like --spike-ms=<ms>
+
+
+def parse_profiling_options(argv, environ):
+    """
+    Reads the profiling options from the command line, falling back to the environment.
+
+    `--profile[=path]` profiles the whole session to a .pstats file, and `--spike-ms=<ms>`
+    records frames slower than the threshold.
+
+    Args:
+        argv (List[str]): The command-line arguments, without the program name.
+        environ (Mapping[str, str]): The environment variables.
+
+    Returns:
+        Tuple[Optional[str], Optional[float]]: (session profile path, spike threshold in ms).
+    """
+    profile_path = environ.get(PROFILE_ENV) or None
+    spike_ms = float(environ[SPIKE_ENV]) if environ.get(SPIKE_ENV) else None
+    for argument in argv:
+        if argument == "--profile":
+            profile_path = os.path.join(PROFILE_DIR, "session.pstats")
+        elif argument.startswith("--profile="):
+            profile_path = argument.split("=", 1)[1]
+        elif argument.startswith("--spike-ms="):
+            spike_ms = float(argument.split("=", 1)[1])
+    return profile_path, spike_ms
+
+
+class SessionProfiler:
+    """
+    Profiles a whole session with cProfile and writes the stats when stopped.
+
+    Attributes:
+        path (str): The .pstats file to write.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """
+        Stops profiling and writes the stats.
+        """
+        self.profile.disable()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.profile.dump_stats(self.path)
+
+
+class SpikeRecorder:
+    """
+    Records the stages of every frame and writes a report for frames over a time threshold.
+
+    The timings of the last SPIKE_HISTORY frames are kept in a ring buffer. When a frame
+    exceeds the threshold, its stage breakdown and the ring buffer are written as JSON, and
+    if each frame is profiled, the frame's call-stack profile as .pstats with a text summary
+    of the slowest calls. Without a threshold the recorder is disabled and costs nothing.
+
+    Attributes:
+        threshold (float or None): Frame time in milliseconds above which a frame is a spike.
+        profile_frames (bool): Whether every frame runs under cProfile. Not possible while a
+            session profile is running, as only one profiler can be active.
+        history (deque): (frame, total milliseconds, stages) of the recent frames.
+        spikes (int): The number of spikes written.
+    """
+
+    def __init__(self, threshold=None, profile_frames=True, output_dir=PROFILE_DIR, history=SPIKE_HISTORY):
+        """
+        Initializes the SpikeRecorder.
+
+        Args:
+            threshold (float, optional): The spike threshold in milliseconds. None disables the recorder.
+            profile_frames (bool): Whether to profile every frame to capture the spikes' call stacks.
+            output_dir (str): The directory the reports are written to.
+            history (int): The number of frames kept in the ring buffer.
+        """
+        self.threshold = threshold
+        self.profile_frames = profile_frames
+        self.output_dir = output_dir
+        self.history = deque(maxlen=history)
+        self.frame = 0
+        self.spikes = 0
+        self.timer = None
+        self.profile = None
+
+    @property
+    def enabled(self):
+        return self.threshold is not None
+
+    def begin_frame(self):
+        """
+        Starts timing, and profiling, a frame.
+        """
+        if self.threshold is None:
+            return
+        self.frame += 1
+        if self.profile_frames:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.timer = StageTimer()
+
+    def lap(self, stage):
+        """
+        Ends a stage of the current frame.
+        """
+        if self.timer is not None:
+            self.timer.lap(stage)
+
+    def end_frame(self):
+        """
+        Ends the current frame and writes a report if it was a spike.
+
+        Returns:
+            bool: True if the frame was a spike.
+        """
+        if self.timer is None:
+            return False
+        if self.profile is not None:
+            self.profile.disable()
+        total = self.timer.total()
+        self.history.append((self.frame, total, self.timer.stages))
+        self.timer = None
+        spike = total > self.threshold
+        if spike:
+            self.write_spike(total)
+        self.profile = None
+        return spike
+
+    def write_spike(self, total):
+        """
+        Writes the report of the current frame: stages and ring buffer as JSON, plus its profile.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = os.path.join(self.output_dir, f"spike_{self.frame:06d}_{int(total)}ms")
+        report = {
+            'frame': self.frame,
+            'time': round(time.time(), 3),
+            'total_ms': total,
+            'threshold_ms': self.threshold,
+            'stages': self.history[-1][2],
+            'recent_frames': [{'frame': frame, 'total_ms': frame_total, 'stages': stages}
+                              for frame, frame_total, stages in self.history],
+        }
+        with open(f"{name}.json", 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=1)
+        if self.profile is not None:
+            self.profile.dump_stats(f"{name}.pstats")
+            summary = io.StringIO()
+            pstats.Stats(self.profile, stream=summary).sort_stats('cumulative').print_stats(30)
+            with open(f"{name}.txt", 'w', encoding='utf-8') as file:
+                file.write(summary.getvalue())
+        self.spikes += 1
@@ -0,0 +1,395 @@
+import math
+import pygame
+
+ATLAS_LIMIT = 4096  # Scaled surfaces kept before the atlas is cleared
+
+
+def present_scaled(screen, surface):
+    """
+    Scales a surface to fit the screen while keeping its aspect ratio, letterboxes it and flips.
+
+    Args:
+        screen (pygame.Surface): The display surface.
+        surface (pygame.Surface): The rendered frame at base resolution.
+    """
+    scale, offset = get_scale_and_offset(screen, surface)
+
+    # Calculate the size of the scaled surface
+    scaled_width = int(surface.get_width() * scale)
+    scaled_height = int(surface.get_height() * scale)
+
+    # Scale the off-screen surface
+    scaled_surface = pygame.transform.scale(surface, (scaled_width, scaled_height))
+
+    # Fill the screen with black to handle letterboxing
+    screen.fill((0, 0, 0))
+
+    # Blit the scaled surface to the screen
+    screen.blit(scaled_surface, offset)
+
+    pygame.display.flip()
+
+
+def get_scale_and_offset(screen, surface):
+    """
+    Computes how a base-resolution surface maps onto the screen.
+
+    Args:
+        screen (pygame.Surface): The display surface.
+        surface (pygame.Surface): The rendered frame at base resolution.
+
+    Returns:
+        Tuple[float, Tuple[int, int]]: The scale factor and the top-left offset of the
+        letterboxed image on the screen.
+    """
+    # Get the current screen size
+    screen_width, screen_height = screen.get_size()
+    base_width, base_height = surface.get_size()
+
+    # Calculate scale factor while maintaining aspect ratio
+    scale = min(screen_width / base_width, screen_height / base_height)
+
+    # Calculate the position to center the scaled surface on the screen
+    x = (screen_width - int(base_width * scale)) // 2
+    y = (screen_height - int(base_height * scale)) // 2
+    return scale, (x, y)
+
+
+class DirtyRectRenderer:
+    """
+    Renders into a persistent back buffer and only redraws the regions that changed.
+
+    Each frame the caller tracks the screen rect and visual state of every moving entity and
+    HUD element. A region is dirty when a tracked item moves, changes state, appears or
+    disappears; both the old and the new rect are redrawn. Static content is identified by a
+    scene key (e.g. the room and its entity registry version). When the camera scrolls, the
+    scene key changes or the window is resized, the whole frame is redrawn instead.
+
+    Dirty regions are presented with `pygame.display.update(rects)`. At a scale factor of 1
+    they are copied as-is; otherwise each region is scaled separately, which can differ from
+    a full-frame scale by one pixel at region edges.
+
+    Attributes:
+        back_buffer (pygame.Surface): The persistent frame at base resolution.
+        full_redraw (bool): Whether the next render redraws the whole frame.
+        dirty_rects (List[pygame.Rect]): Regions of the back buffer to redraw this frame.
+    """
+
+    def __init__(self, resolution):
+        """
+        Initializes the DirtyRectRenderer.
+
+        Args:
+            resolution (Tuple[int, int]): The base resolution of the back buffer.
+        """
+        self.back_buffer = pygame.Surface(resolution)
+        self.buffer_rect = self.back_buffer.get_rect()
+        self.full_redraw = True
+        self.dirty_rects = []
+        self.tracked = {}  # Key -> (rect, state) drawn last frame
+        self.current = {}  # Key -> (rect, state) tracked this frame
+        self.last_camera = None
+        self.last_screen_size = None
+        self.last_scene_key = None
+
+    def begin_frame(self, camera, screen, scene_key):
+        """
+        Starts a frame and decides whether a full redraw is needed.
+
+        Args:
+            camera (Camera): The camera; any scroll forces a full redraw.
+            screen (pygame.Surface): The display surface; a resize forces a full redraw.
+            scene_key (object): Identifies the static content; a change forces a full redraw.
+        """
+        camera_position = (camera.x, camera.y)
+        screen_size = screen.get_size()
+        if camera_position != self.last_camera or screen_size != self.last_screen_size or \
+                scene_key != self.last_scene_key:
+            self.full_redraw = True
+        self.last_camera = camera_position
+        self.last_screen_size = screen_size
+        self.last_scene_key = scene_key
+        self.current = {}
+        self.dirty_rects = []
+
+    def track(self, key, rect, state=None):
+        """
+        Tracks an item drawn this frame.
+
+        Args:
+            key (Hashable): Identifies the item across frames.
+            rect (pygame.Rect): The screen rect the item covers at base resolution.
+            state (object, optional): Anything whose change means the item looks different,
+                such as its current image.
+        """
+        rect = pygame.Rect(rect)
+        self.current[key] = (rect, state)
+        previous = self.tracked.get(key)
+        if previous is None:
+            self.invalidate(rect)
+        elif previous[0] != rect or previous[1] != state:
+            self.invalidate(previous[0])
+            self.invalidate(rect)
+
+    def invalidate(self, rect=None):
+        """
+        Marks a region dirty, or the whole frame if no rect is given.
+        """
+        if rect is None:
+            self.full_redraw = True
+            return
+        # Inflate to cover sprites drawn at fractional positions
+        rect = pygame.Rect(rect).inflate(2, 2).clip(self.buffer_rect)
+        if rect.width > 0 and rect.height > 0:
+            self.dirty_rects.append(rect)
+
+    def merge_dirty_rects(self):
+        """
+        Merges overlapping dirty rects so that no region is drawn twice.
+        """
+        merged = []
+        for rect in self.dirty_rects:
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def render(self, draw_scene):
+        """
+        Redraws the dirty regions of the back buffer.
+
+        Args:
+            draw_scene (Callable[[pygame.Surface, Optional[pygame.Rect]], None]): Draws the scene
+                onto the surface. When a region is given, the surface is clipped to it and the
+                callback may skip anything outside it.
+        """
+        # Items that were drawn last frame but not this frame leave a hole to repaint
+        for key, (rect, _) in self.tracked.items():
+            if key not in self.current:
+                self.invalidate(rect)
+        self.tracked = self.current
+
+        if self.full_redraw:
+            self.dirty_rects = [self.buffer_rect.copy()]
+            draw_scene(self.back_buffer, None)
+            return
+
+        self.dirty_rects = self.merge_dirty_rects()
+        for rect in self.dirty_rects:
+            self.back_buffer.set_clip(rect)
+            draw_scene(self.back_buffer, rect)
+        self.back_buffer.set_clip(None)
+
+    def present(self, screen):
+        """
+        Presents the frame: a full scaled flip after a full redraw, otherwise only the dirty rects.
+
+        Args:
+            screen (pygame.Surface): The display surface.
+        """
+        if self.full_redraw:
+            present_scaled(screen, self.back_buffer)
+            self.full_redraw = False
+            return
+        if not self.dirty_rects:
+            return
+
+        scale, (offset_x, offset_y) = get_scale_and_offset(screen, self.back_buffer)
+        screen_rects = []
+        for rect in self.dirty_rects:
+            if scale == 1:
+                destination = rect.move(offset_x, offset_y)
+                screen.blit(self.back_buffer, destination, rect)
+            else:
+                left = offset_x + math.floor(rect.left * scale)
+                top = offset_y + math.floor(rect.top * scale)
+                right = offset_x + math.ceil(rect.right * scale)
+                bottom = offset_y + math.ceil(rect.bottom * scale)
+                destination = pygame.Rect(left, top, right - left, bottom - top)
+                scaled = pygame.transform.scale(self.back_buffer.subsurface(rect), destination.size)
+                screen.blit(scaled, destination)
+            screen_rects.append(destination)
+        pygame.display.update(screen_rects)
+
+
+class PrescaledRenderer:
+    """
+    Draws the scene directly at output resolution instead of scaling a finished frame.
+
+    The zoom factor is chosen so that a tile covers a whole number of screen pixels
+    (`TILE_SIZE * zoom` is an integer), which keeps tiles seamless at fractional zooms. Every
+    sprite blitted through the renderer is scaled once and kept in an atlas of pre-scaled
+    surfaces, so a frame costs one small blit per sprite rather than a full-screen
+    `pygame.transform.scale`. The zoom, letterbox and atlas are only rebuilt when the window
+    size changes.
+
+    The renderer stands in for the base-resolution surface: it offers `blit`, `fill`,
+    `get_size` and `get_rect` in base-resolution coordinates and maps them to the screen.
+
+    Attributes:
+        resolution (Tuple[int, int]): The base resolution the scene is laid out in.
+        zoom (float): Screen pixels per base-resolution pixel.
+        offset (Tuple[int, int]): The top-left of the letterboxed viewport on the screen.
+        viewport (pygame.Rect): The screen area the scene is drawn into.
+        atlas (Dict[pygame.Surface, pygame.Surface]): Source surface to its scaled copy for the
+            current zoom. Sprites are shared per spritesheet position, so it stays small; it is
+            cleared if one-off surfaces such as rendered text ever fill it past ATLAS_LIMIT.
+    """
+
+    def __init__(self, resolution, tile_size):
+        """
+        Initializes the PrescaledRenderer.
+
+        Args:
+            resolution (Tuple[int, int]): The base resolution the scene is laid out in.
+            tile_size (int): The size of a tile in base-resolution pixels.
+        """
+        self.resolution = resolution
+        self.tile_size = tile_size
+        self.rect = pygame.Rect((0, 0), resolution)
+        self.screen = None
+        self.screen_size = None
+        self.zoom = 1
+        self.offset = (0, 0)
+        self.viewport = self.rect.copy()
+        self.atlas = {}
+
+    def begin_frame(self, screen):
+        """
+        Starts a frame, rebuilding the zoom and the atlas if the window changed.
+
+        Args:
+            screen (pygame.Surface): The display surface.
+
+        Returns:
+            PrescaledRenderer: The renderer itself, to be drawn on like a surface.
+        """
+        if screen is not self.screen or screen.get_size() != self.screen_size:
+            self.rebuild(screen)
+        return self
+
+    def rebuild(self, screen):
+        """
+        Picks the zoom for the current window size, clears the atlas and the letterbox.
+        """
+        self.screen = screen
+        self.screen_size = screen.get_size()
+        scale, _ = get_scale_and_offset(screen, pygame.Surface(self.resolution))
+
+        # Round down to whole screen pixels per tile so the scene still fits the window
+        self.zoom = max(1, math.floor(self.tile_size * scale)) / self.tile_size
+        width = int(self.resolution[0] * self.zoom)
+        height = int(self.resolution[1] * self.zoom)
+        self.offset = ((self.screen_size[0] - width) // 2, (self.screen_size[1] - height) // 2)
+        self.viewport = pygame.Rect(self.offset, (width, height))
+        self.atlas = {}
+
+        # Fill the screen with black to handle letterboxing; the scene never draws outside the viewport
+        screen.set_clip(None)
+        screen.fill((0, 0, 0))
+        screen.set_clip(self.viewport)
+
+    def scaled(self, image):
+        """
+        Returns the pre-scaled copy of a surface, scaling it on first use.
+        """
+        scaled_image = self.atlas.get(image)
+        if scaled_image is None:
+            if len(self.atlas) >= ATLAS_LIMIT:
+                self.atlas.clear()
+            width, height = image.get_size()
+            scaled_image = pygame.transform.scale(image, (round(width * self.zoom), round(height * self.zoom)))
+            if not image.get_flags() & pygame.SRCALPHA or pygame.mask.from_surface(image, 254).count() == width * height:
+                # Fully opaque sprites (most terrain tiles) are copied instead of alpha-blended. They
+                # live in a surface one pixel wider than the sprite: with a row pitch SDL cannot use
+                # its streaming-store copy, which is several times slower for small adjacent blits.
+                padded = pygame.Surface((scaled_image.get_width() + 1, scaled_image.get_height())).convert()
+                padded.blit(scaled_image, (0, 0))
+                scaled_image = padded.subsurface((0, 0) + scaled_image.get_size())
+            else:
+                scaled_image = scaled_image.convert_alpha()
+            self.atlas[image] = scaled_image
+        return scaled_image
+
+    def invalidate(self, image):
+        """
+        Drops the scaled copy of a surface that was modified in place, such as the minimap.
+        """
+        self.atlas.pop(image, None)
+
+    def to_screen(self, x, y):
+        """
+        Maps a base-resolution position to screen pixels.
+
+        Positions are truncated to whole base pixels first, as a normal blit would, so an
+        integer zoom gives the same image as scaling the finished frame.
+        """
+        return (self.offset[0] + math.floor(int(x) * self.zoom), self.offset[1] + math.floor(int(y) * self.zoom))
+
+    def blit(self, image, dest):
+        """
+        Draws a surface at a base-resolution position using its pre-scaled copy.
+
+        Args:
+            image (pygame.Surface): The source surface at base resolution.
+            dest (Tuple[float, float] or pygame.Rect): The top-left position at base resolution.
+
+        Returns:
+            pygame.Rect: The screen area drawn.
+        """
+        if isinstance(dest, pygame.Rect):
+            dest = dest.topleft
+        return self.screen.blit(self.scaled(image), self.to_screen(dest[0], dest[1]))
+
+    def blits(self, blit_sequence, doreturn=True):
+        """
+        Draws a sequence of (surface, position) pairs using their pre-scaled copies.
+
+        Args:
+            blit_sequence (Iterable[Tuple[pygame.Surface, Tuple[float, float]]]): The blits at base resolution.
+            doreturn (bool): Whether to return the screen areas drawn.
+
+        Returns:
+            List[pygame.Rect] or None: The screen areas drawn, if requested.
+        """
+        # Inlined lookups and position mapping; this runs for every visible tile each frame
+        atlas_get = self.atlas.get
+        scaled = self.scaled
+        floor = math.floor
+        zoom = self.zoom
+        offset_x, offset_y = self.offset
+        return self.screen.blits([
+            (atlas_get(image) or scaled(image), (offset_x + floor(int(dest[0]) * zoom), offset_y + floor(int(dest[1]) * zoom)))
+            for image, dest in blit_sequence
+        ], doreturn)
+
+    def fill(self, color, rect=None):
+        """
+        Fills a base-resolution rect, or the whole viewport if no rect is given.
+        """
+        if rect is None:
+            return self.screen.fill(color, self.viewport)
+        rect = pygame.Rect(rect)
+        left, top = self.to_screen(rect.left, rect.top)
+        right, bottom = self.to_screen(rect.right, rect.bottom)
+        return self.screen.fill(color, (left, top, right - left, bottom - top))
+
+    def get_size(self):
+        """
+        Returns the base resolution, so that callers lay out the scene as usual.
+        """
+        return self.resolution
+
+    def get_rect(self):
+        """
+        Returns the base-resolution rect of the scene.
+        """
+        return self.rect.copy()
+
+    def present(self):
+        """
+        Presents the frame.
+        """
+        pygame.display.flip()
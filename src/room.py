@@ -2,148 +2,417 @@
 
 import os
 import pygame
-from src.wfc import WaveFunctionCollapse
+from src.cell import ENTROPY_LOG_WEIGHT
+from src.parallel_wfc import TiledWaveFunctionCollapse, TILE_SPAN
+from src.seed_race import race_collapse
+from src.batch_wfc import BatchWaveFunctionCollapse, BATCH_SIZE
+from src.constraint_compiler import get_compiled_constraints
+from src.autotile import autotile_grid
 from src.tilemap import TileMap
-from src.util import TileJsonLoader
+from src.assets import get_assets
 from src.spritesheet import Spritesheet
 from src.object import Object
 from src.enemy import Enemy
+from src.enemy_manager import EnemyManager
+from src.entity_registry import EntityRegistry, OBJECT, ENEMY
+from src.telemetry import get_telemetry, StageTimer
 import random  # Import random module to create Random instances
 
-DATA_PATH = os.path.join("assets", "data")
-json_loader = TileJsonLoader(DATA_PATH)
-TILESET = json_loader.load_json("tileset.json")
-TILE_CONSTRAINTS = json_loader.load_json("tile_constraints.json")
+ASSETS = get_assets()
+TILESET = ASSETS.tileset
+TILE_CONSTRAINTS = ASSETS.tile_constraints
 
 ROOM_DIMENSIONS = (50, 50)  # Adjust room dimensions as needed
 TILE_SIZE = 16
+PARALLEL_WFC_WORKERS = 0  # Processes for tiled WFC on rooms larger than TILE_SPAN; 0 collapses the room in one pass
+ENTROPY_HEURISTIC = ENTROPY_LOG_WEIGHT  # Versioned WFC cell-selection heuristic; changing it changes every room of a seed
+COMPILED_CONSTRAINTS = False  # Collapse rooms with the compiled, consistent constraints; changes every room of a seed
+WFC_MAX_BACKTRACKS = 16  # Backtracks before a room's collapse restarts from a derived sub-seed; None for no limit
+WFC_MAX_RESTARTS = 3  # Restarts before a room's collapse gives up
+WFC_RACE_WORKERS = 0  # Processes racing a room's seed and its WFC_MAX_RESTARTS sub-seeds at once; 0 tries them in turn
+TILE_GENERATOR_WFC = 'wfc'  # Wave function collapse with backtracking
+TILE_GENERATOR_AUTOTILE = 'autotile'  # One pass over a noise terrain field, see src.autotile
+TILE_GENERATOR = TILE_GENERATOR_WFC  # Default room tile generator; worlds of the two generators differ
+
+
+def get_room_seed(base_seed, position):
+    """
+    Returns the unique seed of the room at a position, derived from the world's base seed.
+    """
+    return (base_seed * 73856093 + position[0] * 19349663 + position[1] * 83492791) % (2**32)
+
+
+def get_generation_rules():
+    """
+    Returns the tileset and constraints rooms are collapsed with.
+
+    Returns:
+        Tuple[Dict, Dict, Optional[List[Dict[int, int]]]]: (tileset, tile_constraints, supports),
+        where supports are the precomputed support sets of the compiled constraints, if used.
+    """
+    if COMPILED_CONSTRAINTS:
+        compiled = get_compiled_constraints()
+        return compiled.tileset, compiled.tile_constraints, compiled.supports
+    return TILESET, TILE_CONSTRAINTS, None
+
+
+def generate_room_grids(positions, base_seed=0, batch_size=BATCH_SIZE, tile_generator=TILE_GENERATOR):
+    """
+    Collapses the tile grids of many rooms in batches, e.g. to pre-generate a world.
+
+    Each grid is identical to the one the room would collapse on its own in one pass.
+
+    Args:
+        positions (Iterable[Tuple[int, int]]): The (x, y) positions of the rooms.
+        base_seed (int): The base seed of the world.
+        batch_size (int): The number of rooms collapsed together.
+        tile_generator (str): TILE_GENERATOR_WFC or TILE_GENERATOR_AUTOTILE.
+
+    Returns:
+        Dict[Tuple[int, int], List[List[str]]]: The collapsed grid of each room.
+    """
+    positions = list(positions)
+    if tile_generator == TILE_GENERATOR_AUTOTILE:
+        return {position: autotile_grid(get_room_seed(base_seed, position), ROOM_DIMENSIONS) for position in positions}
+    grids = {}
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        wfc = create_room_collapse(batch, base_seed)
+        wfc.collapse()
+        grids.update(zip(batch, wfc.get_collapsed_grids()))
+    return grids
+
+
+def create_room_collapse(positions, base_seed=0):
+    """
+    Prepares the collapse of the tile grids of rooms, to run at once or in time slices.
+
+    Args:
+        positions (List[Tuple[int, int]]): The (x, y) positions of the rooms.
+        base_seed (int): The base seed of the world.
+
+    Returns:
+        BatchWaveFunctionCollapse: The collapse, with one grid per position.
+    """
+    return create_seed_collapse([get_room_seed(base_seed, position) for position in positions])
+
+
+def create_seed_collapse(room_seeds):
+    """
+    Prepares the collapse of the tile grids of rooms given their seeds, as `create_room_collapse`.
+
+    Args:
+        room_seeds (List[int]): The seeds of the rooms.
+
+    Returns:
+        BatchWaveFunctionCollapse: The collapse, with one grid per seed.
+    """
+    tileset, tile_constraints, supports = get_generation_rules()
+    return BatchWaveFunctionCollapse(ROOM_DIMENSIONS, tileset, tile_constraints, room_seeds,
+                                     entropy_heuristic=ENTROPY_HEURISTIC, supports=supports,
+                                     max_backtracks=WFC_MAX_BACKTRACKS, max_restarts=WFC_MAX_RESTARTS)
+
+
+def plan_objects(room_seed, tile_names):
+    """
+    Chooses the objects of a room from its seed and tile grid, without creating them.
+
+    Args:
+        room_seed (int): The room's seed.
+        tile_names (List[List[str]]): The room's collapsed tile grid.
+
+    Returns:
+        List[Tuple[str, str, int, int]]: (OBJECT, object type, x, y) per object, in generation order.
+    """
+    # Create a local random generator for objects
+    object_seed = (room_seed * 31 + 1) % (2**32)
+    rand_gen = random.Random(object_seed)
+
+    objects = []
+    tile_ids, generatable_mask = ASSETS.tile_ids, ASSETS.generatable_mask
+    for y, row in enumerate(tile_names):
+        for x, tile_name in enumerate(row):
+            tile_id = tile_ids.get(tile_name)
+            if tile_id is not None and generatable_mask >> tile_id & 1:
+                # Decide whether to generate an object here
+                chance = 0.1  # 10% chance to generate an object (adjust as needed)
+                if rand_gen.random() < chance:
+                    # Randomly choose an object type (e.g., "rock1" or "rock2")
+                    objects.append((OBJECT, rand_gen.choice(['rock1', 'rock2']), x, y))
+    return objects
+
+
+def plan_enemies(room_seed, tile_names, occupied):
+    """
+    Chooses the enemy spawn tiles of a room from its seed and tile grid.
+
+    Args:
+        room_seed (int): The room's seed.
+        tile_names (List[List[str]]): The room's collapsed tile grid.
+        occupied (Iterable[Tuple[int, int]]): The tiles taken by objects.
+
+    Returns:
+        List[Tuple[str, None, int, int]]: (ENEMY, None, x, y) per enemy, in spawn order.
+    """
+    # Create a local random generator for enemies
+    enemy_seed = (room_seed * 41 + 3) % (2**32)
+    rand_gen = random.Random(enemy_seed)
+
+    enemies = []
+    # Decide whether to spawn enemies in this room
+    spawn_chance = 0.5  # 50% chance to spawn enemies
+    if rand_gen.random() < spawn_chance:
+        num_enemies = rand_gen.randint(1, 4)  # Spawn between 1 and 4 enemies
+
+        # Find suitable spawn positions; enemies never share a tile because chosen
+        # spawn tiles are removed from the list below
+        occupied = set(occupied)
+        tile_ids, collidable_mask = ASSETS.tile_ids, ASSETS.collidable_mask
+        suitable_tiles = [
+            (x, y)
+            for y, row in enumerate(tile_names)
+            for x, tile_name in enumerate(row)
+            if not (tile_name in tile_ids and collidable_mask >> tile_ids[tile_name] & 1) and (x, y) not in occupied
+        ]
+
+        # Spawn enemies at random suitable positions
+        for _ in range(num_enemies):
+            if suitable_tiles:
+                spawn_pos = rand_gen.choice(suitable_tiles)
+                enemies.append((ENEMY, None) + spawn_pos)
+                suitable_tiles.remove(spawn_pos)
+            else:
+                break  # No more suitable positions
+    return enemies
+
+
+def plan_goal(room_seed, tile_names, occupied):
+    """
+    Chooses the tile of the goal flower from the room's seed and tile grid.
+
+    Args:
+        room_seed (int): The room's seed.
+        tile_names (List[List[str]]): The room's collapsed tile grid.
+        occupied (Iterable[Tuple[int, int]]): The tiles taken by objects.
+
+    Returns:
+        List[Tuple[str, str, int, int]]: [(OBJECT, 'flower', x, y)], or [] if no tile is suitable.
+    """
+    # Create a local random generator for the goal object
+    goal_seed = (room_seed * 37 + 2) % (2**32)
+    rand_gen = random.Random(goal_seed)
+
+    # Find all free tiles that are 'grass_plain' or 'grass_small'
+    occupied = set(occupied)
+    suitable_tiles = [
+        (x, y)
+        for y, row in enumerate(tile_names)
+        for x, tile_name in enumerate(row)
+        if tile_name in ['grass_plain', 'grass_small'] and (x, y) not in occupied
+    ]
+    if not suitable_tiles:
+        return []
+    # Randomly select one of the suitable tiles
+    return [(OBJECT, 'flower') + rand_gen.choice(suitable_tiles)]
+
+
+def plan_room_entities(room_seed, tile_names, is_goal_room=False, is_spawn_room=False):
+    """
+    Chooses every entity of a room in the order `Room` creates them, which is also the order
+    of their ids: objects, enemies (except in the spawn room), then the goal flower.
+
+    Returns:
+        List[Tuple[str, Optional[str], int, int]]: (kind, object type, x, y) per entity.
+    """
+    entities = plan_objects(room_seed, tile_names)
+    occupied = [(x, y) for _, _, x, y in entities]
+    if not is_spawn_room:
+        entities += plan_enemies(room_seed, tile_names, occupied)
+    if is_goal_room:
+        entities += plan_goal(room_seed, tile_names, occupied)
+    return entities
+
 
 class Room:
-    def __init__(self, position, base_seed=0, is_goal_room=False, is_spawn_room=False):
+    def __init__(self, position, base_seed=0, is_goal_room=False, is_spawn_room=False, wfc_workers=PARALLEL_WFC_WORKERS,
+                 collapsed_map=None, entities=None, tile_generator=TILE_GENERATOR, race_workers=WFC_RACE_WORKERS):
         self.position = position  # Tuple of (x, y)
         self.base_seed = base_seed
         self.is_goal_room = is_goal_room
         self.is_spawn_room = is_spawn_room
+        self.wfc_workers = wfc_workers
+        self.tile_generator = tile_generator
+        self.race_workers = race_workers
 
         # Generate a unique seed for this room based on base seed and room position
-        self.room_seed = (self.base_seed * 73856093 + self.position[0] * 19349663 + self.position[1] * 83492791) % (2**32)
-
-        self.tile_map = self.generate_tile_map()
-        self.objects = []
-        self.enemies = []
-        self.generate_objects()
-        if not self.is_spawn_room:
-            self.generate_enemies()
-        if self.is_goal_room:
-            self.create_goal_object()
-
-    def generate_tile_map(self):
-        # Use the room's seed for the tile map
-        wfc = WaveFunctionCollapse(ROOM_DIMENSIONS, TILESET, TILE_CONSTRAINTS, random_seed=self.room_seed)
+        self.room_seed = get_room_seed(self.base_seed, self.position)
+
+        # Each stage is timed for the generation telemetry
+        timer = StageTimer()
+        self.wfc_source = 'precollapsed'  # Grids passed in were collapsed ahead of time, by a batch or a bake
+        self.wfc_counts = {}
+        self.seed_index = None  # Which of the room's seed (0) and fallback sub-seeds the grid was collapsed from
+        if collapsed_map is None:
+            collapsed_map = self.collapse_tile_grid()
+            timer.lap('wfc')
+        self.tile_map = self.generate_tile_map(collapsed_map)
+        timer.lap('tile_map')
+        # Objects and enemies live in an id-indexed registry with a tile-occupancy grid
+        self.entities = EntityRegistry(self.tile_map.width, self.tile_map.height)
+        self.tile_map.entities = self.entities
+        # Enemy state is stored in arrays and updated in one pass; removing an enemy frees its slot
+        self.enemy_manager = EnemyManager(TILE_SIZE)
+        self.entities.removal_listeners.append(self.enemy_manager.on_entity_removed)
+        if entities is not None:
+            # Baked ahead of time, e.g. read from a world archive
+            self.add_entities(entities)
+            timer.lap('entities')
+        else:
+            self.generate_objects(collapsed_map)
+            timer.lap('objects')
+            if not self.is_spawn_room:
+                self.generate_enemies(collapsed_map)
+                timer.lap('enemies')
+            if self.is_goal_room:
+                self.create_goal_object(collapsed_map)
+                timer.lap('goal')
+        self.report_generation(timer)
+
+    def collapse_tile_grid(self):
+        """
+        Collapses the room's tile grid from its seed and records the collapse counts.
+
+        Returns:
+            List[List[str]]: The collapsed tile names.
+        """
+        if self.tile_generator == TILE_GENERATOR_AUTOTILE:
+            self.wfc_source = 'autotile'
+            return autotile_grid(self.room_seed, ROOM_DIMENSIONS)
+        tileset, tile_constraints, supports = get_generation_rules()
+        if self.race_workers > 0 and WFC_MAX_BACKTRACKS is not None and WFC_MAX_RESTARTS > 0:
+            # Rooms whose seed backtracks heavily do not wait for it to fail before trying the
+            # next sub-seed; the grid is the same as when they are tried in turn
+            self.seed_index, grid = race_collapse(ROOM_DIMENSIONS, tileset, tile_constraints, self.room_seed,
+                                                  WFC_MAX_BACKTRACKS, WFC_MAX_RESTARTS, self.race_workers,
+                                                  entropy_heuristic=ENTROPY_HEURISTIC, supports=supports)
+            self.wfc_source = 'raced'
+            self.wfc_counts = {'wfc_seed_index': self.seed_index}
+            return grid
+        if self.wfc_workers > 0 and max(ROOM_DIMENSIONS) > TILE_SPAN:
+            # Large rooms are collapsed as tiles in a process pool; the result does not
+            # depend on the number of workers
+            wfc = TiledWaveFunctionCollapse(ROOM_DIMENSIONS, tileset, tile_constraints,
+                                            random_seed=self.room_seed, workers=self.wfc_workers,
+                                            entropy_heuristic=ENTROPY_HEURISTIC, max_backtracks=WFC_MAX_BACKTRACKS,
+                                            max_restarts=WFC_MAX_RESTARTS)
+            wfc.collapse()
+            self.wfc_source = 'tiled'
+            self.wfc_counts = {'wfc_fallbacks': int(wfc.fallback_used)}
+            return wfc.get_collapsed_grid()
+        # A batch of one room gives the grid of the sequential collapse, with the batch's
+        # bitmask propagation and cached supports
+        wfc = create_seed_collapse([self.room_seed])
         wfc.collapse()
-        collapsed_map = wfc.get_collapsed_grid()
+        self.wfc_source = 'single'
+        self.seed_index = wfc.seed_indices[0]
+        self.wfc_counts = {'wfc_seed_index': self.seed_index}
+        self.wfc_counts.update((f'wfc_{name}', count) for name, count in wfc.room_counts(0).items())
+        return wfc.grids[0]
+
+    def report_generation(self, timer):
+        """
+        Emits the room's generation telemetry: stage timings in milliseconds and counts.
+        """
+        telemetry = get_telemetry()
+        if not telemetry.enabled:
+            return
+        stages = dict(timer.stages)
+        stages['total'] = timer.total()
+        counts = {
+            'tiles': self.tile_map.width * self.tile_map.height,
+            'objects': len(self.entities.by_kind[OBJECT]),
+            'enemies': len(self.entities.by_kind[ENEMY]),
+        }
+        counts.update(self.wfc_counts)
+        telemetry.emit('room_generated', position=list(self.position), seed=self.room_seed,
+                       wfc_source=self.wfc_source, stages=stages, counts=counts)
+
+    def generate_tile_map(self, collapsed_map=None):
+        # Use the room's seed for the tile map, unless the grid was collapsed ahead of time
+        if collapsed_map is None:
+            collapsed_map = self.collapse_tile_grid()
 
         # Generate the TileMap for this room
         spritesheet = Spritesheet(os.path.join('assets', 'tileset', 'tileset.png'))
         tile_map = TileMap(collapsed_map, spritesheet)
         return tile_map
 
-    def generate_objects(self):
+    @property
+    def objects(self):
+        """
+        List of the objects in the room, in generation order.
+        """
+        return list(self.entities.objects())
+
+    @property
+    def enemies(self):
+        """
+        List of the enemies in the room, in spawn order.
+        """
+        return list(self.entities.enemies())
+
+    def generate_objects(self, tile_names):
         """
         Generates objects in the room on tiles that are marked as generatable.
         """
-        # Create a local random generator for objects
-        object_seed = (self.room_seed * 31 + 1) % (2**32)
-        rand_gen = random.Random(object_seed)
-
-        # Iterate over tiles in the tile_map
-        for y, row in enumerate(self.tile_map.tile_map):
-            for x, tile in enumerate(row):
-                tile_info = self.tile_map.TILESET.get(tile.tile_type, {})
-                if tile_info.get('generatable', False):
-                    # Decide whether to generate an object here
-                    chance = 0.1  # 10% chance to generate an object (adjust as needed)
-                    if rand_gen.random() < chance:
-                        # Randomly choose an object type (e.g., "rock1" or "rock2")
-                        object_type = rand_gen.choice(['rock1', 'rock2'])
-                        # Create an object and add it to the objects list
-                        obj = Object(x, y, object_type, spritesheet=self.tile_map.spritesheet)
-                        self.objects.append(obj)
-                        # Add the object's rect to collidable tiles for collision detection
-                        self.tile_map.collidable_tiles.append(obj)
-
-    def create_goal_object(self):
+        self.add_entities(plan_objects(self.room_seed, tile_names))
+
+    def create_goal_object(self, tile_names):
         """
         Places the flower object on a random 'grass_plain' or 'grass_small' tile in the room.
         """
-        # Create a local random generator for the goal object
-        goal_seed = (self.room_seed * 37 + 2) % (2**32)
-        rand_gen = random.Random(goal_seed)
-
-        # Find all tiles that are 'grass_plain' or 'grass_small'
-        suitable_tiles = []
-        for y, row in enumerate(self.tile_map.tile_map):
-            for x, tile in enumerate(row):
-                if tile.tile_type in ['grass_plain', 'grass_small']:
-                    # Check if there is already an object here
-                    object_here = any(obj.pos_x == x and obj.pos_y == y for obj in self.objects)
-                    if not object_here:
-                        suitable_tiles.append((x, y))
-
-        if suitable_tiles:
-            # Randomly select one of the suitable tiles
-            flower_x, flower_y = rand_gen.choice(suitable_tiles)
-            # Create the flower object
-            flower_obj = Object(flower_x, flower_y, 'flower', spritesheet=self.tile_map.spritesheet)
-            self.objects.append(flower_obj)
-            # The flower is not collidable, so we don't add it to collidable_tiles
+        goal = plan_goal(self.room_seed, tile_names, self.entities.tile_positions.values())
+        if goal:
+            self.add_entities(goal)
         else:
             # If no suitable tile is found, log a warning (optional)
             print(f"No suitable tile found for goal object in room {self.position}")
 
-    def generate_enemies(self):
+    def generate_enemies(self, tile_names):
         """
         Generates enemies in the room.
         """
-        # Create a local random generator for enemies
-        enemy_seed = (self.room_seed * 41 + 3) % (2**32)
-        rand_gen = random.Random(enemy_seed)
-
-        # Decide whether to spawn enemies in this room
-        spawn_chance = 0.5  # 50% chance to spawn enemies
-        if rand_gen.random() < spawn_chance:
-            num_enemies = rand_gen.randint(1, 4)  # Spawn between 1 and 4 enemies
-
-            # Find suitable spawn positions
-            suitable_tiles = []
-            for y, row in enumerate(self.tile_map.tile_map):
-                for x, tile in enumerate(row):
-                    if not tile.collidable:
-                        # Check for objects or enemies at this position
-                        occupied = any(obj.pos_x == x and obj.pos_y == y for obj in self.objects)
-                        occupied |= any(
-                            int(enemy.position.x) // TILE_SIZE == x and int(enemy.position.y) // TILE_SIZE == y
-                            for enemy in self.enemies
-                        )
-                        if not occupied:
-                            suitable_tiles.append((x, y))
-
-            # Spawn enemies at random suitable positions
-            spritesheet = self.tile_map.spritesheet
-            for _ in range(num_enemies):
-                if suitable_tiles:
-                    spawn_pos = rand_gen.choice(suitable_tiles)
-                    x, y = spawn_pos
-                    enemy = Enemy(spritesheet, (x * TILE_SIZE, y * TILE_SIZE))
-                    self.enemies.append(enemy)
-                    suitable_tiles.remove(spawn_pos)
-                else:
-                    break  # No more suitable positions
-
-    def draw_objects(self, surface, camera):
-        for obj in self.objects:
+        self.add_entities(plan_enemies(self.room_seed, tile_names, self.entities.tile_positions.values()))
+
+    def add_entities(self, entities):
+        """
+        Creates and registers planned entities, in order.
+
+        Args:
+            entities (Iterable[Tuple[str, Optional[str], int, int]]): (kind, object type, x, y)
+                per entity, as returned by `plan_room_entities`.
+        """
+        spritesheet = self.tile_map.spritesheet
+        for kind, object_type, x, y in entities:
+            if kind == OBJECT:
+                # Objects are registered on their tile; the tile map consults the registry
+                # for collision detection
+                obj = Object(x, y, object_type, spritesheet=spritesheet)
+                # The flower is not collidable, so it never blocks movement
+                obj.collidable = object_type != 'flower'
+                self.entities.add(obj, OBJECT, (x, y))
+            else:
+                enemy = Enemy(spritesheet, (x * TILE_SIZE, y * TILE_SIZE), manager=self.enemy_manager)
+                self.entities.add(enemy, ENEMY)
+
+    def draw_objects(self, surface, camera, region=None):
+        if region is None:
+            objects = self.entities.objects()
+        else:
+            # Only the objects on tiles under the region (in screen pixels)
+            objects = self.entities.query_rect(region.move(camera.x, camera.y), TILE_SIZE)
+        for obj in objects:
             obj.draw(surface, camera)
 
-    def draw_enemies(self, surface, camera):
-        for enemy in self.enemies:
-            enemy.draw(surface, camera)
+    def draw_enemies(self, surface, camera, alpha=1.0):
+        self.enemy_manager.draw(surface, camera, alpha)
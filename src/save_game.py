@@ -0,0 +1,252 @@
+import os
+import sys
+import struct
+from array import array
+from src.map import Map
+from src.room import TILE_GENERATOR_WFC, TILE_GENERATOR_AUTOTILE
+from src.noise import Noise
+from src.world_chunks import CHUNK_SIZE
+
+SAVE_PATH = os.path.join("saves", "world.sav")
+SAVE_MAGIC = b"THWS"
+SAVE_VERSION = 3
+FLAG_CHUNKED = 1
+FLAG_PLAYER = 2
+FLAG_AUTOTILE = 4  # The world's rooms are autotiled instead of collapsed
+
+# magic, version, flags, base seed, map width and height (0 if unbounded), current, spawn and
+# goal room, player x, y and health, noise bitmap bytes, visited rooms (bitmap bytes in a bounded
+# world, visited chunks in an unbounded one), rooms with a diff, removed entity ids
+HEADER = struct.Struct('<4sHHq2i2i2i2i3f4I')
+
+
+def pack_noise_map(noise_map):
+    """
+    Packs a noise map into a bitmap, one bit per cell in row-major order.
+    """
+    bits = bytearray((sum(len(row) for row in noise_map) + 7) // 8)
+    index = 0
+    for row in noise_map:
+        for value in row:
+            if value:
+                bits[index >> 3] |= 1 << (index & 7)
+            index += 1
+    return bytes(bits)
+
+
+def unpack_noise_map(bits, width, height):
+    """
+    Unpacks a bitmap from `pack_noise_map` into a noise map.
+    """
+    return [[(bits[index >> 3] >> (index & 7)) & 1 for index in range(y * width, (y + 1) * width)]
+            for y in range(height)]
+
+
+def pack_rooms(rooms, width, height):
+    """
+    Packs a set of room coordinates into a bitmap over the world, one bit per room in row-major order.
+    """
+    bits = bytearray((width * height + 7) // 8)
+    for x, y in rooms:
+        index = y * width + x
+        bits[index >> 3] |= 1 << (index & 7)
+    return bytes(bits)
+
+
+def unpack_rooms(bits, width):
+    """
+    Unpacks a bitmap from `pack_rooms` into a set of room coordinates.
+    """
+    rooms = set()
+    for byte_index, byte in enumerate(bits):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    rooms.add(divmod(byte_index * 8 + bit, width)[::-1])
+    return rooms
+
+
+def pack_chunked_rooms(rooms, chunk_size=CHUNK_SIZE):
+    """
+    Packs a set of room coordinates of an unbounded world into one `pack_rooms` bitmap per chunk.
+
+    Returns:
+        Tuple[array, bytes]: The coordinates of the chunks with a visited room, as (x, y) pairs,
+        and their bitmaps in the same order.
+    """
+    chunks = {}
+    for x, y in rooms:
+        chunks.setdefault((x // chunk_size, y // chunk_size), []).append((x % chunk_size, y % chunk_size))
+    chunk_coords = sorted(chunks)
+    return (array('i', [value for coords in chunk_coords for value in coords]),
+            b"".join(pack_rooms(chunks[coords], chunk_size, chunk_size) for coords in chunk_coords))
+
+
+def unpack_chunked_rooms(chunk_coords, bits, chunk_size=CHUNK_SIZE):
+    """
+    Unpacks the chunk coordinates and bitmaps from `pack_chunked_rooms` into a set of room coordinates.
+    """
+    rooms = set()
+    length = (chunk_size * chunk_size + 7) // 8
+    for index in range(len(chunk_coords) // 2):
+        chunk_x, chunk_y = chunk_coords[2 * index] * chunk_size, chunk_coords[2 * index + 1] * chunk_size
+        rooms.update((chunk_x + x, chunk_y + y)
+                     for x, y in unpack_rooms(bits[index * length:(index + 1) * length], chunk_size))
+    return rooms
+
+
+def to_little_endian(values):
+    # Arrays are written little-endian whatever the platform
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def save_game(game_map, path=SAVE_PATH, character=None):
+    """
+    Saves the world and the player's progress in a compact binary file.
+
+    Nothing generated from the seed is stored: rooms are regenerated on demand and only
+    their diffs (the ids of the entities removed from them) are written, as packed arrays.
+    The cost of saving depends on the number of rooms the player changed, not on how many
+    rooms have been generated.
+
+    Args:
+        game_map (Map): The world.
+        path (str): The file to write.
+        character (Character, optional): The player, whose position and health are saved.
+    """
+    write_save(encode_save(game_map, character), path)
+
+
+def encode_save(game_map, character=None):
+    """
+    Encodes the world and the player's progress in the format of `save_game`.
+
+    Returns:
+        List[bytes]: The parts of the file, for `write_save`.
+    """
+    flags = FLAG_CHUNKED if game_map.chunked else 0
+    if game_map.tile_generator == TILE_GENERATOR_AUTOTILE:
+        flags |= FLAG_AUTOTILE
+    player = (0.0, 0.0, 0.0)
+    if character is not None:
+        flags |= FLAG_PLAYER
+        player = (character.position.x, character.position.y, character.health)
+
+    if game_map.chunked:
+        # Chunks are regenerated from the seed; only the bounds are stored
+        width, height = game_map.noise.bounds or (0, 0)
+        noise_bits = b""
+    else:
+        width, height = game_map.noise.width, game_map.noise.height
+        noise_bits = pack_noise_map(game_map.noise.get_noise_map())
+
+    if width and height:
+        # A fixed size whatever the number of rooms visited, as WorldGraph's room bitmap
+        visited = pack_rooms(game_map.visited_rooms, width, height)
+        visited_count = len(visited)
+    else:
+        # Unbounded: one bitmap per chunk touched, so the size depends on how far the player roamed
+        chunk_coords, chunk_bits = pack_chunked_rooms(game_map.visited_rooms)
+        visited = to_little_endian(chunk_coords).tobytes() + chunk_bits
+        visited_count = len(chunk_coords) // 2
+    diff_rooms = sorted(coords for coords, removed in game_map.room_diffs.items() if removed)
+    diff_coords = array('i', [value for coords in diff_rooms for value in coords])
+    diff_lengths = array('I', [len(game_map.room_diffs[coords]) for coords in diff_rooms])
+    removed_ids = array('I', [entity_id for coords in diff_rooms for entity_id in sorted(game_map.room_diffs[coords])])
+
+    header = HEADER.pack(SAVE_MAGIC, SAVE_VERSION, flags, game_map.base_seed, width, height,
+                         *game_map.current_room_coords, *game_map.spawn_room_coords, *game_map.goal_room_coords,
+                         *player, len(noise_bits), visited_count, len(diff_rooms), len(removed_ids))
+
+    return [header, noise_bits, visited] + [to_little_endian(values).tobytes()
+                                            for values in (diff_coords, diff_lengths, removed_ids)]
+
+
+def write_save(parts, path=SAVE_PATH):
+    """
+    Writes a save encoded by `encode_save`, replacing the previous one only once it is complete.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        for part in parts:
+            file.write(part)
+    os.replace(temp_path, path)
+
+
+def load_game(path=SAVE_PATH):
+    """
+    Loads a world saved by `save_game`.
+
+    No room is generated while loading; each room is generated from its seed when it is first
+    entered and its diff is applied then.
+
+    Args:
+        path (str): The file to read.
+
+    Returns:
+        Tuple[Map, Optional[Dict]]: The world, and the player's 'position' and 'health' if they
+        were saved.
+
+    Raises:
+        ValueError: If the file is not a save or was written by another version.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < HEADER.size or data[:len(SAVE_MAGIC)] != SAVE_MAGIC:
+        raise ValueError(f"{path} is not a saved game.")
+    (_, version, flags, base_seed, width, height, current_x, current_y, spawn_x, spawn_y, goal_x, goal_y,
+     player_x, player_y, health, noise_length, visited_count, diff_count, removed_count) = HEADER.unpack_from(data)
+    if version != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version {version}; expected {SAVE_VERSION}.")
+
+    offset = HEADER.size
+    noise_bits = data[offset:offset + noise_length]
+    offset += noise_length
+
+    def read_array(typecode, count):
+        nonlocal offset
+        values = array(typecode)
+        values.frombytes(data[offset:offset + count * values.itemsize])
+        offset += count * values.itemsize
+        return to_little_endian(values)
+
+    if width and height:
+        visited = unpack_rooms(data[offset:offset + visited_count], width)
+        offset += visited_count
+    else:
+        chunk_coords = read_array('i', visited_count * 2)
+        length = visited_count * ((CHUNK_SIZE * CHUNK_SIZE + 7) // 8)
+        visited = unpack_chunked_rooms(chunk_coords, data[offset:offset + length])
+        offset += length
+    diff_coords = read_array('i', diff_count * 2)
+    diff_lengths = read_array('I', diff_count)
+    removed_ids = read_array('I', removed_count)
+
+    tile_generator = TILE_GENERATOR_AUTOTILE if flags & FLAG_AUTOTILE else TILE_GENERATOR_WFC
+    if flags & FLAG_CHUNKED:
+        game_map = Map(width or None, height or None, base_seed=base_seed, chunked=True, tile_generator=tile_generator)
+    else:
+        noise = Noise.from_noise_map(unpack_noise_map(noise_bits, width, height), base_seed)
+        game_map = Map(width, height, base_seed=base_seed, noise=noise, tile_generator=tile_generator)
+    game_map.spawn_room_coords = (spawn_x, spawn_y)
+    game_map.goal_room_coords = (goal_x, goal_y)
+    game_map.current_room_coords = (current_x, current_y)
+    if game_map.chunked:
+        game_map.noise.update_resident(game_map.current_room_coords)
+    game_map.visited_rooms = visited
+
+    start = 0
+    for index, length in enumerate(diff_lengths):
+        coords = (diff_coords[2 * index], diff_coords[2 * index + 1])
+        game_map.room_diffs[coords] = set(removed_ids[start:start + length])
+        start += length
+
+    player = None
+    if flags & FLAG_PLAYER:
+        player = {'position': (player_x, player_y), 'health': health}
+    return game_map, player
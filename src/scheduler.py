@@ -0,0 +1,179 @@
+import heapq
+import time
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+SAFETY_MARGIN = 0.001  # Seconds of each frame left unused, for the clock's own overhead
+DEFAULT_STEP_ESTIMATE = 0.001  # Seconds assumed for a task's first step
+ESTIMATE_DECAY = 0.75  # Factor a skipped task's estimate shrinks by each frame, so it is measured again
+
+
+class Task:
+    """
+    A unit of background work, run one generator step at a time.
+
+    The generator may yield the estimated seconds its next step will take, e.g. before a step
+    that is much larger than the previous ones; yielding None uses the task's measured average.
+
+    Attributes:
+        name (str): A name for debugging.
+        priority (int): PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW.
+        deadline (float or None): `time.perf_counter()` time by which the task should be done.
+        tag (object): Groups tasks, e.g. by owner, for `TaskScheduler.cancel` and `finish`.
+        estimate (float): The expected seconds of the next step.
+        done (bool): Whether the generator is exhausted or the task was cancelled.
+    """
+
+    def __init__(self, name, steps, priority=PRIORITY_NORMAL, deadline=None, tag=None,
+                 estimate=DEFAULT_STEP_ESTIMATE, sequence=0):
+        self.name = name
+        self.steps = steps
+        self.priority = priority
+        self.deadline = deadline
+        self.tag = tag
+        self.estimate = estimate
+        self.sequence = sequence  # Submission order, the last tie-breaker
+        self.average = None
+        self.done = False
+
+    def step(self):
+        """
+        Runs one step and updates the estimate of the next one.
+        """
+        start = time.perf_counter()
+        try:
+            hint = next(self.steps)
+        except StopIteration:
+            self.done = True
+            return
+        duration = time.perf_counter() - start
+        self.average = duration if self.average is None else 0.8 * self.average + 0.2 * duration
+        self.estimate = hint if hint is not None else self.average
+
+
+def call_steps(function, *args):
+    """
+    Wraps a function call as a single-step task.
+    """
+    function(*args)
+    yield from ()
+
+
+class TaskScheduler:
+    """
+    Runs background tasks cooperatively in the time left over at the end of each frame.
+
+    Tasks run in order of overdue first, then priority, deadline and submission. A step is
+    only started if its estimated duration fits before the end of the frame's target time,
+    so background work does not make a frame late, with one exception that guarantees
+    progress: the first task of a frame in which nothing else ran is stepped anyway if its
+    deadline has passed. The estimate of a task that is skipped shrinks every frame, so a
+    stale estimate is measured again rather than keeping the task waiting forever.
+
+    Attributes:
+        frame_time (float): The target seconds per frame.
+        tasks (List[Task]): The pending tasks.
+        steps_run (int): Steps run since the scheduler was created.
+    """
+
+    def __init__(self, frame_time, safety_margin=SAFETY_MARGIN):
+        """
+        Initializes the TaskScheduler.
+
+        Args:
+            frame_time (float): The target seconds per frame.
+            safety_margin (float): Seconds of every frame that are never used.
+        """
+        self.frame_time = frame_time
+        self.safety_margin = safety_margin
+        self.tasks = []
+        self.sequence = 0
+        self.steps_run = 0
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def add(self, name, steps, priority=PRIORITY_NORMAL, deadline=None, tag=None, estimate=DEFAULT_STEP_ESTIMATE):
+        """
+        Registers a task.
+
+        Args:
+            name (str): A name for debugging.
+            steps (Generator): The task's work; each `next` runs one step.
+            priority (int): PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW.
+            deadline (float, optional): Seconds from now by which the task should be done.
+            tag (object, optional): Groups tasks for `cancel` and `finish`.
+            estimate (float): The expected seconds of the first step.
+
+        Returns:
+            Task: The task.
+        """
+        absolute_deadline = None if deadline is None else time.perf_counter() + deadline
+        task = Task(name, steps, priority, absolute_deadline, tag, estimate, self.sequence)
+        self.sequence += 1
+        self.tasks.append(task)
+        return task
+
+    def cancel(self, tag):
+        """
+        Removes the tasks with a tag without running them further.
+
+        Returns:
+            int: The number of tasks removed.
+        """
+        cancelled = [task for task in self.tasks if task.tag == tag]
+        for task in cancelled:
+            task.done = True
+            task.steps.close()
+        self.tasks = [task for task in self.tasks if not task.done]
+        return len(cancelled)
+
+    def finish(self, tag):
+        """
+        Runs the tasks with a tag to completion now, whatever the time left in the frame.
+
+        Returns:
+            int: The number of steps run.
+        """
+        steps = 0
+        for task in [task for task in self.tasks if task.tag == tag]:
+            while not task.done:
+                task.step()
+                steps += 1
+        self.steps_run += steps
+        self.tasks = [task for task in self.tasks if not task.done]
+        return steps
+
+    def run(self, frame_start):
+        """
+        Runs task steps until the frame that started at `frame_start` has no time left.
+
+        Args:
+            frame_start (float): The `time.perf_counter()` time at which the frame started.
+
+        Returns:
+            int: The number of steps run.
+        """
+        end = frame_start + self.frame_time - self.safety_margin
+        now = time.perf_counter()
+        queue = [(task.deadline is None or task.deadline > now, task.priority,
+                  task.deadline if task.deadline is not None else float('inf'), task.sequence, task)
+                 for task in self.tasks]
+        heapq.heapify(queue)
+        steps = 0
+        while queue:
+            entry = heapq.heappop(queue)
+            task = entry[-1]
+            overdue = not entry[0]
+            if time.perf_counter() + task.estimate > end and not (overdue and steps == 0):
+                # This step does not fit; a smaller one of a later task still might
+                task.estimate *= ESTIMATE_DECAY
+                continue
+            task.step()
+            steps += 1
+            if not task.done:
+                heapq.heappush(queue, entry)
+        self.steps_run += steps
+        self.tasks = [task for task in self.tasks if not task.done]
+        return steps
@@ -0,0 +1,116 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from src.cell import ENTROPY_LOG_WEIGHT
+from src.wfc import CollapseError, attempt_seed
+from src.batch_wfc import BatchWaveFunctionCollapse
+
+CANCEL_CHECK_STEPS = 64  # Collapse steps between a worker's checks of whether its race is over
+
+_executor = None
+_executor_workers = 0
+_race_counter = None  # Shared with the workers: the race currently running; older races stop
+_worker_race_counter = None
+
+
+def init_race_worker(race_counter):
+    # Runs in each worker process when it starts
+    global _worker_race_counter
+    _worker_race_counter = race_counter
+
+
+def get_race_executor(workers):
+    """
+    Returns the shared process pool that races run in, creating it on first use.
+    """
+    global _executor, _executor_workers, _race_counter
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+        _race_counter = multiprocessing.Value('i', 0)
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=init_race_worker, initargs=(_race_counter,))
+        _executor_workers = workers
+    return _executor
+
+
+def collapse_attempt(job):
+    """
+    Runs one attempt of a collapse from its seed, without restarts.
+
+    The attempt is a one-room `BatchWaveFunctionCollapse`, which gives the grid of the
+    sequential collapse much faster. Runs in a worker process, so it only takes and returns
+    plain data. The attempt stops early once its race is over.
+
+    Args:
+        job (Tuple): (grid_size, tileset, tile_constraints, supports, random_seed,
+            max_backtracks, entropy_heuristic, race).
+
+    Returns:
+        List[List[str]] or None: The collapsed grid, or None if the attempt exceeded its
+        backtrack limit or was cancelled.
+    """
+    grid_size, tileset, tile_constraints, supports, random_seed, max_backtracks, entropy_heuristic, race = job
+    wfc = BatchWaveFunctionCollapse(grid_size, tileset, tile_constraints, [random_seed],
+                                    entropy_heuristic=entropy_heuristic, supports=supports,
+                                    max_backtracks=max_backtracks, max_restarts=0)
+    try:
+        while not wfc.run(max_steps=CANCEL_CHECK_STEPS):
+            if _worker_race_counter is not None and _worker_race_counter.value != race:
+                return None
+    except CollapseError:
+        # Past the backtrack limit: the batch raises rather than falling back, as there are no restarts
+        return None
+    return wfc.grids[0]
+
+
+def race_collapse(grid_size, tileset, tile_constraints, random_seed, max_backtracks, max_restarts, workers,
+                  entropy_heuristic=ENTROPY_LOG_WEIGHT, supports=None):
+    """
+    Collapses a grid by racing its seed and its fallback sub-seeds in worker processes.
+
+    Attempt i uses the seed of the i-th restart of `WaveFunctionCollapse`, and an attempt fails
+    when it backtracks more than max_backtracks times. That limit is the race's deadline: it
+    counts work rather than time, so which attempts succeed does not depend on the machine.
+    The lowest-index attempt that succeeds is accepted, and the attempts after it are
+    cancelled. The result is therefore exactly the grid, and the index exactly the restart
+    count, of a sequential collapse with the same limits; the race only saves the time of
+    the failed attempts before it.
+
+    Args:
+        grid_size (Tuple[int, int]): The (width, height) of the grid.
+        tileset (Dict[str, Dict]): The tileset.
+        tile_constraints (Dict[str, Dict]): The adjacency constraints.
+        random_seed (int): The seed of the first attempt, which the sub-seeds are derived from.
+        max_backtracks (int): Backtracks after which an attempt fails.
+        max_restarts (int): Fallback sub-seeds raced besides the seed.
+        workers (int): Worker processes.
+        entropy_heuristic (int): The entropy heuristic version, as passed to `WaveFunctionCollapse`.
+        supports (List[Dict[int, int]], optional): Support sets of the constraints, as passed to
+            `BatchWaveFunctionCollapse`.
+
+    Returns:
+        Tuple[int, List[List[str]]]: (index of the accepted attempt, collapsed grid).
+
+    Raises:
+        CollapseError: If every attempt fails.
+    """
+    executor = get_race_executor(workers)
+    with _race_counter.get_lock():
+        _race_counter.value += 1
+        race = _race_counter.value
+    futures = [executor.submit(collapse_attempt, (grid_size, tileset, tile_constraints, supports,
+                                                  attempt_seed(random_seed, index), max_backtracks,
+                                                  entropy_heuristic, race))
+               for index in range(max_restarts + 1)]
+    try:
+        # A later attempt only wins once every earlier one is known to have failed
+        for index, future in enumerate(futures):
+            grid = future.result()
+            if grid is not None:
+                return index, grid
+    finally:
+        with _race_counter.get_lock():
+            if _race_counter.value == race:
+                _race_counter.value += 1
+        for future in futures:
+            future.cancel()
+    raise CollapseError(f"Every one of {max_restarts + 1} raced attempts exceeded {max_backtracks} backtracks")
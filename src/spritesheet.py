@@ -5,8 +5,13 @@ TILE_SIZE = 16
 class Spritesheet:
     def __init__(self, filename):
         self.sheet = pygame.image.load(filename).convert_alpha()  # Convert with alpha channel support
+        self.images = {}  # (x, y, width, height) -> image, shared by every tile of the same type
 
     def get_image(self, x, y, width, height):
-        image = pygame.Surface((width, height), pygame.SRCALPHA)  # Use SRCALPHA for transparency
-        image.blit(self.sheet, (0, 0), (x * TILE_SIZE, y * TILE_SIZE, width, height))
+        key = (x, y, width, height)
+        image = self.images.get(key)
+        if image is None:
+            image = pygame.Surface((width, height), pygame.SRCALPHA)  # Use SRCALPHA for transparency
+            image.blit(self.sheet, (0, 0), (x * TILE_SIZE, y * TILE_SIZE, width, height))
+            self.images[key] = image
         return image
\ No newline at end of file
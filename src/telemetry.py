@@ -0,0 +1,189 @@
+import json
+import math
+import sys
+import time
+
+TELEMETRY_PERCENTILES = (50, 95, 99)
+
+
+class Telemetry:
+    """
+    Writes structured events as JSON lines to a sink.
+
+    Each event is one JSON object per line with an 'event' name and a wall-clock 'time', so a
+    session can be appended to a file and summarised afterwards with `summarize_telemetry`.
+    Without a sink telemetry is disabled and `emit` does nothing.
+
+    Attributes:
+        sink (file-like or None): Where the lines are written; anything with `write`.
+        enabled (bool): Whether events are written.
+    """
+
+    def __init__(self, sink=None):
+        """
+        Initializes the Telemetry.
+
+        Args:
+            sink (file-like, optional): The stream receiving the JSON lines. Defaults to None,
+                which disables telemetry.
+        """
+        self.sink = sink
+        self.owns_sink = False
+
+    @property
+    def enabled(self):
+        return self.sink is not None
+
+    def emit(self, event, **fields):
+        """
+        Writes an event if telemetry is enabled.
+
+        Args:
+            event (str): The event name.
+            **fields: JSON-serialisable event data.
+        """
+        if self.sink is None:
+            return
+        record = {'event': event, 'time': round(time.time(), 3)}
+        record.update(fields)
+        self.sink.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def close(self):
+        """
+        Flushes the sink, closing it if it was opened by `configure_telemetry`.
+        """
+        if self.sink is None:
+            return
+        if self.owns_sink:
+            self.sink.close()
+        else:
+            self.sink.flush()
+        self.sink = None
+
+
+class StageTimer:
+    """
+    Measures consecutive stages of some work, in milliseconds.
+
+    Attributes:
+        stages (Dict[str, float]): Stage name to elapsed milliseconds, in completion order.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def lap(self, stage):
+        """
+        Ends a stage that started when the previous stage ended.
+
+        Args:
+            stage (str): The stage name.
+        """
+        now = time.perf_counter()
+        self.stages[stage] = round((now - self.last) * 1000.0, 3)
+        self.last = now
+
+    def total(self):
+        """
+        Returns the milliseconds since the timer was created.
+        """
+        return round((self.last - self.start) * 1000.0, 3)
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry():
+    """
+    Returns the telemetry that generation reports to.
+    """
+    return _telemetry
+
+
+def configure_telemetry(path):
+    """
+    Sends telemetry to a JSON-lines file, appending to it, or disables telemetry.
+
+    Args:
+        path (str or None): The file to append to; '-' writes to standard output and None
+            disables telemetry.
+
+    Returns:
+        Telemetry: The configured telemetry.
+    """
+    global _telemetry
+    _telemetry.close()
+    if path is None:
+        _telemetry = Telemetry()
+    elif path == '-':
+        _telemetry = Telemetry(sys.stdout)
+    else:
+        _telemetry = Telemetry(open(path, 'a', encoding='utf-8', buffering=1))
+        _telemetry.owns_sink = True
+    return _telemetry
+
+
+def percentile(sorted_values, percent):
+    """
+    Returns the nearest-rank percentile of sorted values.
+    """
+    rank = max(1, math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_telemetry(lines, event='room_generated'):
+    """
+    Computes percentiles per stage and per count over the events of a session.
+
+    Args:
+        lines (Iterable[str]): JSON lines as written by `Telemetry`.
+        event (str): The event to summarise.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Metric name ('stage.<name>' in milliseconds, or a count)
+        to its 'count', 'p50', 'p95', 'p99' and 'max'.
+    """
+    samples = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if record.get('event') != event:
+            continue
+        for stage, milliseconds in record.get('stages', {}).items():
+            samples.setdefault(f"stage.{stage}", []).append(milliseconds)
+        for name, value in record.get('counts', {}).items():
+            samples.setdefault(name, []).append(value)
+
+    summary = {}
+    for name, values in samples.items():
+        values.sort()
+        summary[name] = {'count': len(values), 'max': values[-1]}
+        for percent in TELEMETRY_PERCENTILES:
+            summary[name][f"p{percent}"] = percentile(values, percent)
+    return summary
+
+
+def format_summary(summary):
+    """
+    Formats a summary from `summarize_telemetry` as a table.
+
+    Returns:
+        List[str]: The table lines.
+    """
+    columns = ['count'] + [f"p{percent}" for percent in TELEMETRY_PERCENTILES] + ['max']
+    width = max([len(name) for name in summary] + [6])
+    lines = [f"{'metric':<{width}}" + ''.join(f"{column:>12}" for column in columns)]
+    for name in sorted(summary):
+        lines.append(f"{name:<{width}}" + ''.join(f"{summary[name][column]:>12g}" for column in columns))
+    return lines
+
+
+if __name__ == "__main__":
+    # Summarise a telemetry file, e.g. `python -m src.telemetry telemetry.jsonl [batch_collapse]`
+    with open(sys.argv[1], encoding='utf-8') as file:
+        event = sys.argv[2] if len(sys.argv) > 2 else 'room_generated'
+        print("\n".join(format_summary(summarize_telemetry(file, event))))
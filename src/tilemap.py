@@ -1,16 +1,14 @@
 from src.tile import Tile
 from src.spritesheet import Spritesheet
 from src.camera import Camera
-from src.util import TileJsonLoader
-import os
+from src.assets import get_assets
 
-DATA_PATH = os.path.join("assets", "data")
-json_loader = TileJsonLoader(DATA_PATH)
-TILESET = json_loader.load_json("tileset.json")
-TILE_CONSTRAINTS = json_loader.load_json("tile_constraints.json")
-DIRECTIONS = json_loader.load_json("directions.json")
-REVERSE_DIRECTIONS = json_loader.load_json("reverse_directions.json")
-CHARACTER_TILESET = json_loader.load_json("character_tileset.json")
+ASSETS = get_assets()
+TILESET = ASSETS.tileset
+TILE_CONSTRAINTS = ASSETS.tile_constraints
+DIRECTIONS = ASSETS.directions
+REVERSE_DIRECTIONS = ASSETS.reverse_directions
+CHARACTER_TILESET = ASSETS.character_tileset
 
 TILE_SIZE = 16
 
@@ -18,22 +16,27 @@ class TileMap:
     def __init__(self, tile_names, spritesheet, tile_size=TILE_SIZE):
         self.tile_map = []
         self.collidable_tiles = []  # List to hold collidable tiles
+        self.collidable_grid = []  # Per-tile collidable flags for O(1) lookups
+        self.entities = None  # EntityRegistry of the owning room, if any
         self.width = len(tile_names[0]) if tile_names else 0
         self.height = len(tile_names)
         self.tile_size = tile_size
         self.spritesheet = spritesheet
 
-        # Load TILESET
-        self.TILESET = json_loader.load_json("tileset.json")
+        # Shared TILESET from the asset registry; parsed once per process
+        self.TILESET = TILESET
 
+        # The registry's compiled tables: spritesheet position and collidable bit per tile id
+        tile_ids, positions, collidable_mask = ASSETS.tile_ids, ASSETS.positions, ASSETS.collidable_mask
         for y, row in enumerate(tile_names):
             tile_row = []
+            collidable_row = []
             for x, tile_name in enumerate(row):
-                if tile_name in self.TILESET:
-                    tile_info = self.TILESET[tile_name]
-                    tile_coords = tile_info['position']
+                tile_id = tile_ids.get(tile_name)
+                if tile_id is not None:
+                    tile_coords = positions[tile_id]
                     image = spritesheet.get_image(tile_coords[0], tile_coords[1], tile_size, tile_size)
-                    collidable = tile_info.get('collidable', False)  # Get collidable property
+                    collidable = bool(collidable_mask >> tile_id & 1)
                 else:
                     # Fallback image for unknown tile types
                     image = spritesheet.get_image(10, 1, tile_size, tile_size)
@@ -41,12 +44,66 @@ class TileMap:
 
                 tile = Tile(x, y, tile_name, tile_size, image, collidable)
                 tile_row.append(tile)
+                collidable_row.append(collidable)
                 if collidable:
                     self.collidable_tiles.append(tile)  # Add to collidable tiles list
             self.tile_map.append(tile_row)
+            self.collidable_grid.append(collidable_row)
 
-    def draw(self, surface, camera):
-        # Only draw the tiles visible within the camera
-        for row in self.tile_map:
-            for tile in row:
-                tile.draw(surface, camera)
\ No newline at end of file
+    def is_blocked(self, x, y):
+        """
+        Checks whether a tile is blocked by a collidable tile or a collidable entity.
+
+        Args:
+            x (int): The x-coordinate of the tile.
+            y (int): The y-coordinate of the tile.
+
+        Returns:
+            bool: True if the tile is blocked; False otherwise (including out of bounds).
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        if self.collidable_grid[y][x]:
+            return True
+        return self.entities is not None and self.entities.is_collidable_at(x, y)
+
+    def collides(self, rect):
+        """
+        Checks whether a rectangle overlaps any blocked tile.
+
+        Only the tiles covered by the rectangle are tested, which gives the same result as
+        testing the rectangle against every collidable tile rect.
+
+        Args:
+            rect (pygame.Rect): The rectangle in world pixels.
+
+        Returns:
+            bool: True if a collision is detected; False otherwise.
+        """
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        x0 = rect.left // self.tile_size
+        y0 = rect.top // self.tile_size
+        x1 = (rect.right - 1) // self.tile_size
+        y1 = (rect.bottom - 1) // self.tile_size
+        for y in range(y0, y1 + 1):
+            for x in range(x0, x1 + 1):
+                if self.is_blocked(x, y):
+                    return True
+        return False
+
+    def draw(self, surface, camera, region=None):
+        # Only draw the tiles visible within the camera (or within region, in screen pixels)
+        if region is None:
+            region = surface.get_rect()
+        x0 = max(0, (region.left + camera.x) // self.tile_size)
+        y0 = max(0, (region.top + camera.y) // self.tile_size)
+        x1 = min(self.width, (region.right + camera.x - 1) // self.tile_size + 1)
+        y1 = min(self.height, (region.bottom + camera.y - 1) // self.tile_size + 1)
+        # Submit the visible tiles as one batch instead of one blit call per tile
+        tile_size = self.tile_size
+        surface.blits([
+            (tile.image, (tile.pos_x * tile_size - camera.x, tile.pos_y * tile_size - camera.y))
+            for row in self.tile_map[y0:y1]
+            for tile in row[x0:x1]
+        ], False)
\ No newline at end of file
@@ -1,37 +1,99 @@
 # wfc.py
-from src.cell import Cell
-from src.util import TileJsonLoader
+from src.cell import Cell, EntropyTable, ENTROPY_LOG_WEIGHT, ENTROPY_SHANNON
+from src.assets import get_assets
 import random
-import os
+import time
 from collections import OrderedDict
 
-DATA_PATH = os.path.join("assets", "data")
-json_loader = TileJsonLoader(DATA_PATH)
-TILESET = json_loader.load_json("tileset.json")
-TILE_CONSTRAINTS = json_loader.load_json("tile_constraints.json")
-DIRECTIONS = json_loader.load_json("directions.json")
-REVERSE_DIRECTIONS = json_loader.load_json("reverse_directions.json")
-CHARACTER_TILESET = json_loader.load_json("character_tileset.json")
+ASSETS = get_assets()
+TILESET = ASSETS.tileset
+TILE_CONSTRAINTS = ASSETS.tile_constraints
+DIRECTIONS = ASSETS.directions
+REVERSE_DIRECTIONS = ASSETS.reverse_directions
+CHARACTER_TILESET = ASSETS.character_tileset
 
 # Convert to OrderedDict to maintain consistent ordering
 TILESET = OrderedDict(sorted(TILESET.items()))
 TILE_CONSTRAINTS = OrderedDict(sorted(TILE_CONSTRAINTS.items()))
 
+
+class CollapseError(Exception):
+    # Raised when a grid cannot be collapsed, or an attempt exceeds its backtrack or time limit
+    pass
+
+
+class SeedConflictError(CollapseError):
+    # Raised when the fixed cells of a seed contradict each other; no sub-seed can help
+    pass
+
+
+def derive_seed(random_seed, *parts):
+    """
+    Derives a deterministic 32-bit sub-seed from a seed and a sequence of integers.
+
+    Args:
+        random_seed (int): The parent seed.
+        *parts (int): Values identifying the sub-task (stage, index, attempt).
+
+    Returns:
+        int: The derived seed.
+    """
+    seed = random_seed % (2**32)
+    for part in parts:
+        seed = (seed * 73856093 + (part + 1) * 19349663 + 83492791) % (2**32)
+    return seed
+
+
+def attempt_seed(random_seed, attempt):
+    """
+    Returns the seed of a collapse attempt: the seed itself first, then sub-seeds derived from it.
+    """
+    return random_seed if attempt == 0 else derive_seed(random_seed or 0, attempt)
+
+
 class WaveFunctionCollapse:
-    def __init__(self, grid_size, tileset, tile_constraints, seed=None, random_seed=None):
+    def __init__(self, grid_size, tileset, tile_constraints, seed=None, random_seed=None,
+                 entropy_heuristic=ENTROPY_LOG_WEIGHT, max_backtracks=None, time_limit=None, max_restarts=0):
         self.width, self.height = grid_size
         self.tileset = tileset
         self.tile_constraints = tile_constraints
         self.seed = seed
         self.random_seed = random_seed
+        self.entropy_heuristic = entropy_heuristic  # Versioned; a seed only reproduces with its version
+        self.pending_steps = None  # Generator of an ongoing resumable collapse
+        self.finished = False
+
+        # An attempt that backtracks more than max_backtracks times or runs longer than time_limit
+        # seconds restarts from a derived sub-seed, at most max_restarts times. Backtrack limits
+        # are reproducible; time limits depend on the machine
+        self.max_backtracks = max_backtracks
+        self.time_limit = time_limit
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.backtracks = 0  # Steps undone after conflicts, over all attempts
+        self.attempt_backtracks = 0
+        self.backtrack_depth = 0  # Steps undone since the last successful collapse
+        self.max_backtrack_depth = 0
+        self.time_to_solution = None  # Seconds from the first step to the collapsed grid
+        self.iterations = 0  # Cells collapsed or rejected, over all attempts
+        self.propagations = 0  # Cells whose neighbors were filtered, over all attempts
+
+        self.reset(random_seed)
+
+    def reset(self, random_seed):
+        # Start an attempt from scratch with the given seed
         self.random_gen = random.Random(random_seed)  # Initialize deterministic random generator
+        self.attempt_backtracks = 0
+        self.backtrack_depth = 0
 
-        # Initialize grid with all possible tiles in each cell
-        self.grid = [[Cell(x, y, tileset) for x in range(self.width)] for y in range(self.height)]
+        # Initialize grid with all possible tiles in each cell; the per-tile entropy terms are shared
+        entropy_table = EntropyTable(self.tileset) if self.entropy_heuristic == ENTROPY_SHANNON else None
+        self.grid = [[Cell(x, y, self.tileset, self.entropy_heuristic, entropy_table) for x in range(self.width)]
+                     for y in range(self.height)]
 
         # Apply initial seed if provided
-        if seed:
-            self.apply_seed(seed)
+        if self.seed:
+            self.apply_seed(self.seed)
 
     def apply_seed(self, seed):
         # Deterministically apply the initial seed configuration
@@ -45,18 +107,78 @@ class WaveFunctionCollapse:
             cell.entropy = 0
             success = self.propagate_constraints(cell, [])
             if not success:
-                raise Exception("Conflict occurred during seed propagation.")
+                raise SeedConflictError("Conflict occurred during seed propagation.")
 
     def collapse(self):
+        # Run the resumable collapse to completion
+        self.run()
+
+    def run(self, max_steps=None, time_budget=None):
+        # Advance the collapse until max_steps steps are done or time_budget seconds have
+        # passed; the next call resumes where this one stopped. Returns True once every cell
+        # is collapsed
+        if self.finished:
+            return True
+        if self.pending_steps is None:
+            self.pending_steps = self.collapse_steps()
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        done_steps = 0
+        while max_steps is None or done_steps < max_steps:
+            try:
+                next(self.pending_steps)
+            except StopIteration:
+                self.finished = True
+                return True
+            done_steps += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return False
+
+    def progress(self):
+        # Returns (collapsed cells, total cells)
+        collapsed = sum(cell.collapsed for row in self.grid for cell in row)
+        return collapsed, self.width * self.height
+
+    def collapse_steps(self):
+        # Generator form of the collapse; each resumption performs one collapse or
+        # backtracking step, with all state kept in the generator and the grid. A failed
+        # attempt restarts from a sub-seed derived from random_seed and the restart count
+        start_time = time.perf_counter()
+        while True:
+            try:
+                yield from self.attempt_steps()
+                break
+            except CollapseError:
+                if self.restarts >= self.max_restarts:
+                    raise
+                self.restarts += 1
+                self.reset(attempt_seed(self.random_seed, self.restarts))
+        self.time_to_solution = time.perf_counter() - start_time
+
+    def attempt_steps(self):
+        # One attempt at collapsing the grid from its current state
+        # Only the time spent in the attempt's steps counts towards time_limit, not the time
+        # between the slices of a resumable collapse
+        attempt_time = 0.0
+        resumed = time.perf_counter()
         # Initialize the stack for backtracking
         stack = []
 
         while True:
+            if self.max_backtracks is not None and self.attempt_backtracks > self.max_backtracks:
+                raise CollapseError(f"Backtrack limit of {self.max_backtracks} exceeded")
+            if self.time_limit is not None and attempt_time + time.perf_counter() - resumed > self.time_limit:
+                raise CollapseError(f"Time limit of {self.time_limit}s exceeded")
+
             # Find the cell with the lowest non-zero entropy (excluding collapsed cells)
             cells = [cell for row in self.grid for cell in row if not cell.collapsed]
             if not cells:
                 # All cells are collapsed
                 break
+            attempt_time += time.perf_counter() - resumed
+            yield
+            resumed = time.perf_counter()
+            self.iterations += 1
 
             # Get minimum entropy cells
             min_entropy = min(cell.entropy for cell in cells)
@@ -72,7 +194,7 @@ class WaveFunctionCollapse:
             if tile_name is None:
                 # Need to backtrack
                 if not stack:
-                    raise Exception("Failed to collapse the grid, no solution possible")
+                    raise CollapseError("Failed to collapse the grid, no solution possible")
                 else:
                     last_action_stack = stack.pop()
                     self.undo_actions(last_action_stack)
@@ -82,7 +204,7 @@ class WaveFunctionCollapse:
             action_stack = []
 
             # Record the change in the cell
-            action_stack.append((cell, cell.possible_tiles.copy(), cell.collapsed, cell.tile, cell.entropy))
+            action_stack.append((cell, cell.snapshot()))
 
             # Collapse the cell
             cell.possible_tiles = [tile_name]
@@ -96,6 +218,7 @@ class WaveFunctionCollapse:
             if success:
                 # Push the action stack onto the main stack
                 stack.append(action_stack)
+                self.backtrack_depth = 0
             else:
                 # Conflict occurred, undo the actions
                 self.undo_actions(action_stack)
@@ -104,16 +227,16 @@ class WaveFunctionCollapse:
                     cell.possible_tiles.remove(tile_name)
                 cell.collapsed = False
                 cell.tile = None
-                cell.entropy = cell.calculate_entropy(self.tileset)
 
                 if not cell.possible_tiles:
                     # Need to backtrack further
                     if not stack:
-                        raise Exception("Failed to collapse the grid, no solution possible")
+                        raise CollapseError("Failed to collapse the grid, no solution possible")
                     else:
                         last_action_stack = stack.pop()
                         self.undo_actions(last_action_stack)
                         continue
+                cell.entropy = cell.calculate_entropy(self.tileset)
 
     def select_tile(self, cell):
         # Tiles are already sorted in cell.possible_tiles
@@ -132,6 +255,7 @@ class WaveFunctionCollapse:
             # Sort the queue to ensure consistent processing order
             queue.sort(key=lambda c: (c.y, c.x))
             current_cell = queue.pop(0)
+            self.propagations += 1
             x, y = current_cell.x, current_cell.y
             for direction in sorted(DIRECTIONS.keys()):
                 dx, dy = DIRECTIONS[direction]
@@ -142,6 +266,7 @@ class WaveFunctionCollapse:
                         continue
                     neighbor_possible_tiles = neighbor.possible_tiles.copy()
                     new_possible_tiles = []
+                    removed_tiles = []
                     reverse_direction = REVERSE_DIRECTIONS[direction]
                     for neighbor_tile in neighbor_possible_tiles:
                         compatible = False
@@ -153,6 +278,8 @@ class WaveFunctionCollapse:
                                 break
                         if compatible:
                             new_possible_tiles.append(neighbor_tile)
+                        else:
+                            removed_tiles.append(neighbor_tile)
                     # Remove duplicates and sort
                     new_possible_tiles = sorted(set(new_possible_tiles))
                     if new_possible_tiles != neighbor.possible_tiles:
@@ -160,9 +287,8 @@ class WaveFunctionCollapse:
                             # Conflict occurred
                             return False
                         # Record the change
-                        action_stack.append((neighbor, neighbor.possible_tiles.copy(), neighbor.collapsed, neighbor.tile, neighbor.entropy))
-                        neighbor.possible_tiles = new_possible_tiles
-                        neighbor.entropy = neighbor.calculate_entropy(self.tileset)
+                        action_stack.append((neighbor, neighbor.snapshot()))
+                        neighbor.remove_tiles(new_possible_tiles, removed_tiles, self.tileset)
                         # Add neighbor to the queue if not already in it
                         if neighbor not in queue:
                             queue.append(neighbor)
@@ -171,11 +297,43 @@ class WaveFunctionCollapse:
 
     def undo_actions(self, action_stack):
         # Undo the actions in reverse order
-        for cell, possible_tiles, collapsed, tile, entropy in reversed(action_stack):
-            cell.possible_tiles = possible_tiles
-            cell.collapsed = collapsed
-            cell.tile = tile
-            cell.entropy = entropy
+        self.backtracks += 1
+        self.attempt_backtracks += 1
+        self.backtrack_depth += 1
+        self.max_backtrack_depth = max(self.max_backtrack_depth, self.backtrack_depth)
+        for cell, state in reversed(action_stack):
+            cell.restore(state)
 
     def get_collapsed_grid(self):
         return [[self.grid[y][x].tile for x in range(self.width)] for y in range(self.height)]
+
+
+def benchmark_entropy_heuristics(grid_size=(50, 50), count=8):
+    # Collapses the same seeds with every entropy heuristic and reports, per heuristic, the
+    # mean seconds per grid, the total backtracks and the number of grids that failed
+    random_seeds = [(index * 2654435761 + 17) % (2**32) for index in range(count)]  # Spread like room seeds
+    results = {}
+    for heuristic in (ENTROPY_LOG_WEIGHT, ENTROPY_SHANNON):
+        elapsed = 0.0
+        backtracks = 0
+        failures = 0
+        for random_seed in random_seeds:
+            wfc = WaveFunctionCollapse(grid_size, TILESET, TILE_CONSTRAINTS, random_seed=random_seed,
+                                       entropy_heuristic=heuristic)
+            start_time = time.perf_counter()
+            try:
+                wfc.collapse()
+            except Exception:
+                failures += 1
+            elapsed += time.perf_counter() - start_time
+            backtracks += wfc.backtracks
+        results[heuristic] = (elapsed / len(random_seeds), backtracks, failures)
+    return results
+
+
+if __name__ == "__main__":
+    # Compare the entropy heuristics, e.g. `python -m src.wfc`
+    names = {ENTROPY_LOG_WEIGHT: 'log-weight (v1)', ENTROPY_SHANNON: 'shannon (v2)'}
+    print(f"{'heuristic':<20}{'s/grid':>10}{'backtracks':>12}{'failures':>10}")
+    for heuristic, (seconds, backtracks, failures) in benchmark_entropy_heuristics(count=48).items():
+        print(f"{names[heuristic]:<20}{seconds:>10.3f}{backtracks:>12}{failures:>10}")
@@ -0,0 +1,172 @@
+import mmap
+import struct
+from src.entity_registry import OBJECT, ENEMY
+
+ARCHIVE_MAGIC = b"THWA"
+ARCHIVE_VERSION = 2
+FLAG_COMPILED_CONSTRAINTS = 1
+FLAG_AUTOTILE = 2  # The rooms' tile grids were autotiled instead of collapsed
+ENTITY_TYPES = ('enemy', 'flower', 'rock1', 'rock2')  # Type index 0 is an enemy, the others objects
+
+# magic, version, flags, entropy heuristic, base seed, map width and height, room width and
+# height, spawn room, goal room, asset content hash, max backtracks (-1 if unlimited) and
+# restarts, room count, tile name table bytes, index offset
+HEADER = struct.Struct('<4sHHHq2i2i2i2i32s2iIIQ')
+INDEX_ENTRY = struct.Struct('<2iQI')  # room x, y, block offset, entity count
+ENTITY = struct.Struct('<B2H')  # type index, tile x, y
+
+
+def write_world_archive(file, header_fields, tile_names, rooms):
+    """
+    Writes a world archive: the header, the tile name table, one block per room and the
+    index of the blocks. Each block holds the room's tile ids (one byte per cell, row-major)
+    followed by its entities in id order.
+
+    Args:
+        file (file-like): A binary file opened for writing, positioned at its start.
+        header_fields (Dict): 'flags', 'entropy_heuristic', 'base_seed', 'map_size',
+            'room_size', 'spawn', 'goal', 'asset_hash', 'max_backtracks' (None if unlimited)
+            and 'max_restarts'.
+        tile_names (List[str]): The tile names; the index is the tile id.
+        rooms (Iterable[Tuple[Tuple[int, int], bytes, List[Tuple]]]): (coordinates, tile ids,
+            entities as (kind, object type, x, y)) per room.
+
+    Returns:
+        int: The number of rooms written.
+    """
+    if len(tile_names) > 256:
+        raise ValueError("World archives store tile ids in one byte; the tileset has too many tiles.")
+    name_table = b"\0".join(name.encode('utf-8') for name in tile_names)
+    type_ids = {name: index for index, name in enumerate(ENTITY_TYPES)}
+
+    file.write(b"\0" * HEADER.size)
+    file.write(name_table)
+    index = []
+    for coords, tile_ids, entities in rooms:
+        offset = file.tell()
+        file.write(tile_ids)
+        for kind, object_type, x, y in entities:
+            file.write(ENTITY.pack(type_ids['enemy' if kind == ENEMY else object_type], x, y))
+        index.append(INDEX_ENTRY.pack(coords[0], coords[1], offset, len(entities)))
+    index_offset = file.tell()
+    file.write(b"".join(index))
+
+    file.seek(0)
+    file.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, header_fields['flags'], header_fields['entropy_heuristic'],
+                           header_fields['base_seed'], *header_fields['map_size'], *header_fields['room_size'],
+                           *header_fields['spawn'], *header_fields['goal'], header_fields['asset_hash'],
+                           -1 if header_fields['max_backtracks'] is None else header_fields['max_backtracks'],
+                           header_fields['max_restarts'], len(index), len(name_table), index_offset))
+    return len(index)
+
+
+class WorldArchive:
+    """
+    Serves baked rooms from a world archive through a read-only memory map.
+
+    Opening an archive only reads its header and index; room blocks are read straight from
+    the mapped file when a room is requested, through memoryview slices that do not copy.
+
+    Attributes:
+        base_seed (int): The seed the world was baked from.
+        map_size (Tuple[int, int]): The (width, height) of the world in rooms.
+        room_size (Tuple[int, int]): The (width, height) of every room in tiles.
+        spawn_room_coords (Tuple[int, int]): The spawn room the world was baked with.
+        goal_room_coords (Tuple[int, int]): The goal room the world was baked with.
+        flags (int): FLAG_COMPILED_CONSTRAINTS if the rooms used the compiled constraints,
+            FLAG_AUTOTILE if they were autotiled.
+        entropy_heuristic (int): The entropy heuristic the rooms were collapsed with.
+        asset_hash (bytes): The content hash of the assets the rooms were generated from, as
+            `AssetRegistry.content_hash`.
+        max_backtracks (int or None): The backtrack limit per attempt the rooms were collapsed with.
+        max_restarts (int): The restart limit the rooms were collapsed with.
+        tile_names (List[str]): The tile names; the index is the tile id.
+        index (Dict[Tuple[int, int], Tuple[int, int]]): Room coordinates to (block offset,
+            entity count).
+    """
+
+    def __init__(self, path):
+        """
+        Opens and maps a world archive.
+
+        Args:
+            path (str): The archive file.
+
+        Raises:
+            ValueError: If the file is not a world archive or was written by another version.
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.data)
+        if len(self.data) < HEADER.size or self.data[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a world archive.")
+        (_, version, self.flags, self.entropy_heuristic, self.base_seed, map_width, map_height, room_width,
+         room_height, spawn_x, spawn_y, goal_x, goal_y, self.asset_hash, max_backtracks, self.max_restarts,
+         room_count, names_length, index_offset) = HEADER.unpack_from(self.view)
+        if version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported world archive version {version}; expected {ARCHIVE_VERSION}.")
+        self.max_backtracks = None if max_backtracks < 0 else max_backtracks
+        self.map_size = (map_width, map_height)
+        self.room_size = (room_width, room_height)
+        self.cells = room_width * room_height
+        self.spawn_room_coords = (spawn_x, spawn_y)
+        self.goal_room_coords = (goal_x, goal_y)
+        self.tile_names = bytes(self.view[HEADER.size:HEADER.size + names_length]).decode('utf-8').split("\0")
+
+        index_view = self.view[index_offset:index_offset + room_count * INDEX_ENTRY.size]
+        self.index = {(x, y): (offset, count) for x, y, offset, count in INDEX_ENTRY.iter_unpack(index_view)}
+
+    def __contains__(self, coords):
+        return coords in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def tile_ids(self, coords):
+        """
+        Returns a room's tile ids, one byte per cell in row-major order, without copying.
+
+        Returns:
+            memoryview: The tile ids, valid until the archive is closed.
+        """
+        offset, _ = self.index[coords]
+        return self.view[offset:offset + self.cells]
+
+    def get_tile_grid(self, coords):
+        """
+        Returns a room's tile grid as tile names, as `WaveFunctionCollapse.get_collapsed_grid` does.
+        """
+        tile_ids = self.tile_ids(coords)
+        names = self.tile_names
+        width = self.room_size[0]
+        return [[names[tile_id] for tile_id in tile_ids[y * width:(y + 1) * width]]
+                for y in range(self.room_size[1])]
+
+    def get_entities(self, coords):
+        """
+        Returns a room's entities in id order.
+
+        Returns:
+            List[Tuple[str, Optional[str], int, int]]: (kind, object type, x, y) per entity,
+            as `src.room.plan_room_entities` returns them.
+        """
+        offset, count = self.index[coords]
+        start = offset + self.cells
+        entities = []
+        for type_index, x, y in ENTITY.iter_unpack(self.view[start:start + count * ENTITY.size]):
+            if type_index == 0:
+                entities.append((ENEMY, None, x, y))
+            else:
+                entities.append((OBJECT, ENTITY_TYPES[type_index], x, y))
+        return entities
+
+    def close(self):
+        """
+        Unmaps and closes the archive.
+        """
+        self.view.release()
+        self.data.close()
+        self.file.close()
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.map import Map
+from src.room import (generate_room_grids, plan_room_entities, get_room_seed, ROOM_DIMENSIONS, ENTROPY_HEURISTIC,
+                      COMPILED_CONSTRAINTS, TILE_GENERATOR, TILE_GENERATOR_AUTOTILE, WFC_MAX_BACKTRACKS, WFC_MAX_RESTARTS)
+from src.assets import get_assets
+from src.batch_wfc import BATCH_SIZE
+from src.world_archive import write_world_archive, FLAG_COMPILED_CONSTRAINTS, FLAG_AUTOTILE
+
+WORLD_ARCHIVE_PATH = os.path.join("worlds", "world.thwa")
+
+
+def bake_rooms(job):
+    """
+    Generates the tile grids and entities of a group of rooms.
+
+    Runs in a worker process, so it only takes and returns plain data.
+
+    Args:
+        job (Tuple): (positions, base_seed, spawn room, goal room, tile generator).
+
+    Returns:
+        List[Tuple[Tuple[int, int], bytes, List[Tuple]]]: (coordinates, tile ids, entities) per room.
+    """
+    positions, base_seed, spawn_room_coords, goal_room_coords, tile_generator = job
+    # The archive's tile ids are the asset registry's, which every process loads from the same cache
+    tile_ids = get_assets().tile_ids
+    grids = generate_room_grids(positions, base_seed, len(positions), tile_generator)
+    rooms = []
+    for coords in positions:
+        grid = grids[coords]
+        entities = plan_room_entities(get_room_seed(base_seed, coords), grid, is_goal_room=(coords == goal_room_coords),
+                                      is_spawn_room=(coords == spawn_room_coords))
+        rooms.append((coords, bytes(tile_ids[tile_name] for row in grid for tile_name in row), entities))
+    return rooms
+
+
+def bake_world(base_seed, map_dimensions, path=WORLD_ARCHIVE_PATH, workers=None, batch_size=BATCH_SIZE, log=None,
+               tile_generator=TILE_GENERATOR):
+    """
+    Generates every room of a world and writes them to a world archive.
+
+    The rooms are the ones `Map` would generate with the same seed and settings: groups of
+    `batch_size` rooms are collapsed together in a process pool, and objects and enemies are
+    placed from each room's seed.
+
+    Args:
+        base_seed (int): The world seed.
+        map_dimensions (Tuple[int, int]): The (width, height) of the world in rooms.
+        path (str): The archive to write.
+        workers (int, optional): Worker processes. Defaults to the number of CPUs.
+        batch_size (int): Rooms generated per job.
+        log (Callable[[str], None], optional): Receives progress messages.
+        tile_generator (str): How the rooms' tile grids are generated, as for `Map`.
+
+    Returns:
+        int: The number of rooms baked.
+    """
+    game_map = Map(map_dimensions[0], map_dimensions[1], base_seed=base_seed, tile_generator=tile_generator)
+    assets = get_assets()
+    tile_names = assets.tile_names
+    positions = game_map.rooms_coordinates
+    jobs = [(positions[start:start + batch_size], base_seed, game_map.spawn_room_coords, game_map.goal_room_coords,
+             tile_generator) for start in range(0, len(positions), batch_size)]
+    header_fields = {
+        'flags': ((FLAG_COMPILED_CONSTRAINTS if COMPILED_CONSTRAINTS else 0)
+                  | (FLAG_AUTOTILE if tile_generator == TILE_GENERATOR_AUTOTILE else 0)),
+        'entropy_heuristic': ENTROPY_HEURISTIC,
+        'base_seed': base_seed,
+        'map_size': map_dimensions,
+        'room_size': ROOM_DIMENSIONS,
+        'spawn': game_map.spawn_room_coords,
+        'goal': game_map.goal_room_coords,
+        'asset_hash': assets.content_hash,
+        'max_backtracks': WFC_MAX_BACKTRACKS,
+        'max_restarts': WFC_MAX_RESTARTS,
+    }
+
+    workers = workers or os.cpu_count() or 1
+    start_time = time.perf_counter()
+
+    def baked_rooms(results):
+        # Streams the rooms to the writer as the jobs finish, in job order
+        done = 0
+        for rooms in results:
+            yield from rooms
+            done += len(rooms)
+            if log:
+                elapsed = time.perf_counter() - start_time
+                log(f"{done}/{len(positions)} rooms, {done / elapsed:.1f} rooms/s")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        if workers == 1:
+            count = write_world_archive(file, header_fields, tile_names, baked_rooms(map(bake_rooms, jobs)))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                count = write_world_archive(file, header_fields, tile_names,
+                                            baked_rooms(executor.map(bake_rooms, jobs)))
+    os.replace(temp_path, path)
+    return count
+
+
+if __name__ == "__main__":
+    # Bake a world, e.g. `python -m src.world_baker 91231 100 100 worlds/world.thwa [workers] [wfc|autotile]`
+    if len(sys.argv) < 4:
+        print("usage: python -m src.world_baker <base_seed> <width> <height> [output] [workers] [tile generator]")
+        sys.exit(1)
+    seed, width, height = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+    output = sys.argv[4] if len(sys.argv) > 4 else WORLD_ARCHIVE_PATH
+    worker_count = int(sys.argv[5]) if len(sys.argv) > 5 else None
+    generator = sys.argv[6] if len(sys.argv) > 6 else TILE_GENERATOR
+    baked = bake_world(seed, (width, height), output, worker_count, log=print, tile_generator=generator)
+    print(f"Baked {baked} rooms to {output}")
@@ -0,0 +1,302 @@
+from collections import OrderedDict, deque
+
+CHUNK_SIZE = 32  # Width and height of a world chunk in rooms
+RESIDENT_RADIUS = 1  # Chunks kept in memory around the player's chunk (Chebyshev distance)
+DEFAULT_ROOM_VALUE = 1
+DEFAULT_WALL_VALUE = 0
+
+
+class ChunkedNoise:
+    """
+    Generates the world map in deterministic chunks on demand.
+
+    Unlike Noise, nothing is generated up front. The initial noise of every cell is a hash of
+    the seed and the cell's world coordinates, so any chunk can be generated on its own. Each
+    chunk runs the cellular automaton over its core plus a halo of `smooth_iterations` cells,
+    which gives exactly the same result at the chunk border as a global pass would.
+
+    Connectivity is guaranteed locally: every chunk opens a portal at the middle of each of
+    its edges, and all floor regions inside a chunk are joined by corridors carved within the
+    chunk. Portals on both sides of a border line up, so neighbouring chunks always connect.
+
+    Attributes:
+        seed (int): The world seed.
+        chunk_size (int): The width and height of a chunk in rooms.
+        bounds (Optional[Tuple[int, int]]): The (width, height) of a bounded world, or None
+            for an unbounded world.
+        chunks (OrderedDict): Generated chunks keyed by (chunk_x, chunk_y), each a bytearray
+            of chunk_size * chunk_size cells.
+    """
+
+    def __init__(self, seed, chunk_size=CHUNK_SIZE, bounds=None, density=45, neighbor_walls=4,
+                 smooth_iterations=6, resident_radius=RESIDENT_RADIUS):
+        """
+        Initializes the ChunkedNoise object. No chunk is generated yet.
+
+        Args:
+            seed (int): The world seed.
+            chunk_size (int): The width and height of a chunk in rooms.
+            bounds (Tuple[int, int], optional): The (width, height) of the world. None makes it unbounded.
+            density (int): Initial fill percentage (0-100) for the map.
+            neighbor_walls (int): Threshold of wall neighbors to consider a cell as a wall.
+            smooth_iterations (int): Number of smoothing iterations; also the halo width.
+            resident_radius (int): Chunks kept in memory around the player's chunk.
+        """
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.bounds = bounds
+        self.density = density
+        self.neighbor_walls = neighbor_walls
+        self.smooth_iterations = smooth_iterations
+        self.resident_radius = resident_radius
+        self.chunks = OrderedDict()
+
+    def in_bounds(self, x, y):
+        """
+        Checks whether a cell lies inside the world.
+        """
+        if self.bounds is None:
+            return True
+        return 0 <= x < self.bounds[0] and 0 <= y < self.bounds[1]
+
+    def cell_noise(self, x, y):
+        """
+        Returns the initial noise value of a cell as a pure function of the seed and its coordinates.
+
+        Args:
+            x (int): The world x-coordinate.
+            y (int): The world y-coordinate.
+
+        Returns:
+            int: 1 for floor, 0 for wall.
+        """
+        if not self.in_bounds(x, y):
+            return DEFAULT_WALL_VALUE
+        h = (x * 0x9E3779B1 + y * 0x85EBCA77 + self.seed * 0xC2B2AE3D) & 0xFFFFFFFF
+        h ^= h >> 15
+        h = (h * 0x2C1B3C6D) & 0xFFFFFFFF
+        h ^= h >> 12
+        h = (h * 0x297A2D39) & 0xFFFFFFFF
+        h ^= h >> 15
+        # Same threshold as Noise: randint(1, 100) < density
+        return DEFAULT_ROOM_VALUE if h % 100 + 1 < self.density else DEFAULT_WALL_VALUE
+
+    def chunk_coords(self, x, y):
+        """
+        Returns the (chunk_x, chunk_y) of the chunk containing a world cell.
+        """
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def is_room(self, x, y):
+        """
+        Checks whether a room exists at a world cell, generating its chunk if needed.
+
+        Args:
+            x (int): The world x-coordinate.
+            y (int): The world y-coordinate.
+
+        Returns:
+            bool: True if the cell is a room; False otherwise.
+        """
+        if not self.in_bounds(x, y):
+            return False
+        chunk = self.get_chunk(*self.chunk_coords(x, y))
+        local_x = x - (x // self.chunk_size) * self.chunk_size
+        local_y = y - (y // self.chunk_size) * self.chunk_size
+        return chunk[local_y * self.chunk_size + local_x] == DEFAULT_ROOM_VALUE
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """
+        Retrieves a chunk, generating it if it is not resident.
+
+        Args:
+            chunk_x (int): The chunk x-coordinate.
+            chunk_y (int): The chunk y-coordinate.
+
+        Returns:
+            bytearray: The chunk cells in row-major order.
+        """
+        key = (chunk_x, chunk_y)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.generate_chunk(chunk_x, chunk_y)
+            self.chunks[key] = chunk
+        return chunk
+
+    def update_resident(self, room_coords):
+        """
+        Evicts chunks farther than `resident_radius` from the chunk containing a room.
+
+        Args:
+            room_coords (Tuple[int, int]): The player's current room coordinates.
+        """
+        center_x, center_y = self.chunk_coords(*room_coords)
+        for key in list(self.chunks):
+            if max(abs(key[0] - center_x), abs(key[1] - center_y)) > self.resident_radius:
+                del self.chunks[key]
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        """
+        Generates one chunk: halo-padded cellular automaton, portals and local corridors.
+
+        Args:
+            chunk_x (int): The chunk x-coordinate.
+            chunk_y (int): The chunk y-coordinate.
+
+        Returns:
+            bytearray: The chunk cells in row-major order.
+        """
+        size = self.chunk_size
+        halo = self.smooth_iterations
+        origin_x = chunk_x * size - halo
+        origin_y = chunk_y * size - halo
+        span = size + 2 * halo
+
+        grid = [[self.cell_noise(origin_x + x, origin_y + y) for x in range(span)] for y in range(span)]
+        in_world = [[self.in_bounds(origin_x + x, origin_y + y) for x in range(span)] for y in range(span)]
+
+        # Each smoothing pass is only valid one cell further inside the halo than the last
+        for iteration in range(1, self.smooth_iterations + 1):
+            new_grid = [row[:] for row in grid]
+            for y in range(iteration, span - iteration):
+                for x in range(iteration, span - iteration):
+                    if not in_world[y][x]:
+                        continue
+                    walls = 0
+                    for dy in (-1, 0, 1):
+                        row = grid[y + dy]
+                        for dx in (-1, 0, 1):
+                            if (dx or dy) and row[x + dx] == DEFAULT_WALL_VALUE:
+                                walls += 1
+                    new_grid[y][x] = DEFAULT_WALL_VALUE if walls > self.neighbor_walls else DEFAULT_ROOM_VALUE
+            grid = new_grid
+
+        cells = bytearray(size * size)
+        for y in range(size):
+            cells[y * size:(y + 1) * size] = bytes(grid[y + halo][halo:halo + size])
+
+        self.open_portals(cells, chunk_x, chunk_y)
+        self.connect_regions(cells, chunk_x, chunk_y)
+        return cells
+
+    def open_portals(self, cells, chunk_x, chunk_y):
+        """
+        Forces a floor cell at the middle of each chunk edge that borders another in-world chunk.
+        """
+        size = self.chunk_size
+        middle = size // 2
+        base_x = chunk_x * size
+        base_y = chunk_y * size
+        portals = [
+            ((middle, 0), (base_x + middle, base_y - 1)),
+            ((middle, size - 1), (base_x + middle, base_y + size)),
+            ((0, middle), (base_x - 1, base_y + middle)),
+            ((size - 1, middle), (base_x + size, base_y + middle)),
+        ]
+        for (local_x, local_y), (outside_x, outside_y) in portals:
+            if self.in_bounds(base_x + local_x, base_y + local_y) and self.in_bounds(outside_x, outside_y):
+                cells[local_y * size + local_x] = DEFAULT_ROOM_VALUE
+
+    def connect_regions(self, cells, chunk_x, chunk_y):
+        """
+        Joins all floor regions of a chunk with corridors carved inside the chunk.
+
+        A breadth-first search grows outwards from the connected regions until it reaches
+        another region, and the path it took is carved as a corridor. This repeats until every
+        region is connected, so each join costs O(chunk_size^2).
+        """
+        size = self.chunk_size
+        region_of = [-1] * (size * size)
+        region_count = 0
+        for start in range(size * size):
+            if cells[start] != DEFAULT_ROOM_VALUE or region_of[start] != -1:
+                continue
+            region_of[start] = region_count
+            stack = [start]
+            while stack:
+                index = stack.pop()
+                for neighbor in self.neighbors(index):
+                    if cells[neighbor] == DEFAULT_ROOM_VALUE and region_of[neighbor] == -1:
+                        region_of[neighbor] = region_count
+                        stack.append(neighbor)
+            region_count += 1
+
+        connected = {0}
+        while len(connected) < region_count:
+            parents = {index: None for index in range(size * size) if region_of[index] in connected}
+            queue = deque(parents)
+            while queue:
+                index = queue.popleft()
+                region = region_of[index]
+                if region != -1 and region not in connected:
+                    # Carve the path back to the connected set and absorb the region
+                    step = parents[index]
+                    while step is not None and region_of[step] not in connected:
+                        cells[step] = DEFAULT_ROOM_VALUE
+                        step = parents[step]
+                    connected.add(region)
+                    break
+                for neighbor in self.neighbors(index):
+                    if neighbor not in parents and \
+                            self.in_bounds(chunk_x * size + neighbor % size, chunk_y * size + neighbor // size):
+                        parents[neighbor] = index
+                        queue.append(neighbor)
+            else:
+                # Remaining regions are unreachable inside the world bounds
+                break
+
+    def neighbors(self, index):
+        """
+        Returns the 4-connected neighbour indices of a chunk cell.
+        """
+        size = self.chunk_size
+        x, y = index % size, index // size
+        result = []
+        if x > 0:
+            result.append(index - 1)
+        if x < size - 1:
+            result.append(index + 1)
+        if y > 0:
+            result.append(index - size)
+        if y < size - 1:
+            result.append(index + size)
+        return result
+
+    def find_floor_cell(self, chunk_x, chunk_y, random_gen):
+        """
+        Picks a random room inside a chunk.
+
+        Args:
+            chunk_x (int): The chunk x-coordinate.
+            chunk_y (int): The chunk y-coordinate.
+            random_gen (random.Random): The generator used for the choice.
+
+        Returns:
+            Tuple[int, int] or None: World coordinates of a room, or None if the chunk is empty.
+        """
+        chunk = self.get_chunk(chunk_x, chunk_y)
+        size = self.chunk_size
+        floor_cells = [
+            (chunk_x * size + index % size, chunk_y * size + index // size)
+            for index in range(size * size) if chunk[index] == DEFAULT_ROOM_VALUE
+        ]
+        return random_gen.choice(floor_cells) if floor_cells else None
+
+    def get_noise_window(self, origin_x, origin_y, width, height):
+        """
+        Builds a 2D noise map for a window of the world, e.g. for the minimap.
+
+        Args:
+            origin_x (int): The world x-coordinate of the window's left edge.
+            origin_y (int): The world y-coordinate of the window's top edge.
+            width (int): The window width in rooms.
+            height (int): The window height in rooms.
+
+        Returns:
+            List[List[int]]: The window, indexed [y][x], with 1 for rooms and 0 for walls.
+        """
+        return [
+            [DEFAULT_ROOM_VALUE if self.is_room(origin_x + x, origin_y + y) else DEFAULT_WALL_VALUE
+             for x in range(width)]
+            for y in range(height)
+        ]
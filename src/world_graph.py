@@ -0,0 +1,105 @@
+from array import array
+from collections import deque
+
+NEIGHBOR_OFFSETS = ((0, -1), (-1, 0), (1, 0), (0, 1))  # 4-neighbourhood, in (y, x) order
+UNREACHABLE = -1
+
+
+class WorldGraph:
+    """
+    Indexes the rooms of a bounded world as a graph.
+
+    Room membership is a bitmap over the world, so checking whether a room exists is O(1)
+    instead of a scan of the room list. The 4-neighbour adjacency of every room is computed
+    once, and BFS distance fields (in room transitions) from any room are cached.
+
+    Attributes:
+        width (int): The width of the world in rooms.
+        height (int): The height of the world in rooms.
+        rooms (List[Tuple[int, int]]): The room coordinates, sorted by (x, y).
+        adjacency (Dict[Tuple[int, int], Tuple[Tuple[int, int], ...]]): Each room's neighboring rooms.
+    """
+
+    def __init__(self, noise_map):
+        """
+        Initializes the WorldGraph.
+
+        Args:
+            noise_map (List[List[int]]): The world map, 1 where a room exists.
+        """
+        self.height = len(noise_map)
+        self.width = len(noise_map[0]) if noise_map else 0
+        self.bitmap = bytearray(value == 1 for row in noise_map for value in row)
+        self.rooms = sorted((x, y) for y, row in enumerate(noise_map) for x, value in enumerate(row) if value == 1)
+        self.adjacency = {
+            (x, y): tuple((x + dx, y + dy) for dx, dy in NEIGHBOR_OFFSETS if self.has_room((x + dx, y + dy)))
+            for x, y in self.rooms
+        }
+        self.distance_fields = {}
+
+    def __contains__(self, coords):
+        return self.has_room(coords)
+
+    def has_room(self, coords):
+        """
+        Checks whether a room exists at the given coordinates in O(1).
+        """
+        x, y = coords
+        return 0 <= x < self.width and 0 <= y < self.height and self.bitmap[y * self.width + x] == 1
+
+    def neighbors(self, coords):
+        """
+        Returns the rooms next to a room.
+        """
+        return self.adjacency.get(coords, ())
+
+    def distance_field(self, origin):
+        """
+        Computes, or returns the cached, BFS distance from a room to every cell of the world.
+
+        Args:
+            origin (Tuple[int, int]): The room to measure from.
+
+        Returns:
+            array: Room transitions from origin per cell, row-major; UNREACHABLE for walls
+            and rooms that cannot be reached.
+        """
+        field = self.distance_fields.get(origin)
+        if field is not None:
+            return field
+        field = array('i', [UNREACHABLE]) * (self.width * self.height)
+        if self.has_room(origin):
+            field[origin[1] * self.width + origin[0]] = 0
+            queue = deque([origin])
+            while queue:
+                coords = queue.popleft()
+                distance = field[coords[1] * self.width + coords[0]] + 1
+                for x, y in self.adjacency[coords]:
+                    index = y * self.width + x
+                    if field[index] == UNREACHABLE:
+                        field[index] = distance
+                        queue.append((x, y))
+        self.distance_fields[origin] = field
+        return field
+
+    def distance(self, origin, coords):
+        """
+        Returns the number of room transitions from origin to coords, or UNREACHABLE.
+        """
+        if not self.has_room(coords):
+            return UNREACHABLE
+        return self.distance_field(origin)[coords[1] * self.width + coords[0]]
+
+    def rooms_at_least(self, origin, min_distance):
+        """
+        Lists the rooms reachable from origin in at least min_distance transitions, sorted by (x, y).
+        """
+        field = self.distance_field(origin)
+        return [coords for coords in self.rooms if field[coords[1] * self.width + coords[0]] >= min_distance]
+
+    def farthest_room(self, origin):
+        """
+        Returns the reachable room farthest from origin, the first in (x, y) order on ties.
+        """
+        field = self.distance_field(origin)
+        return max(self.rooms, key=lambda coords: (field[coords[1] * self.width + coords[0]], -coords[0], -coords[1]))